@@ -0,0 +1,343 @@
+"""
+Benchmark suite for the PyKonal FMM solver and the Monte Carlo drivers.
+
+Sections:
+    solver     EikonalSolver.solve on 2D/3D grids (64^2 ... 256^3) for
+               uniform, random and obstacle speed fields, with the
+               source in a corner or at the center, by fast marching
+               and fast sweeping.
+    speed_map  The SDF -> speed maps of sdf_fmm/core/speed_mapping.py.
+    obstacles  Solve time versus obstacle density of
+               generate_world_with_uncertainty.
+    mc         End-to-end monte_carlo_traveltime throughput in
+               samples/second.
+
+Results are written as JSON (one record per case, with all repeat
+timings) so runs can be compared for regression tracking:
+
+    python benchmarks/bench_fmm.py --quick -o quick.json
+    python benchmarks/bench_fmm.py --quick --compare quick.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# The packages under monte_carlo_fmm/ are imported as namespace
+# packages, so sdf_fmm.core and mc_fmm_3d.core do not collide.
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+import pykonal
+from sdf_fmm.core import speed_mapping
+from sdf_fmm.core.mc_driver import monte_carlo_traveltime
+from sdf_fmm.core.solver import setup_solver_from_speed
+from sdf_fmm.sdf_gen.random_world import generate_world_with_uncertainty
+from mc_fmm_3d.core.mc_driver import monte_carlo_traveltime as monte_carlo_traveltime_3d
+from mc_fmm_3d.sdf_gen.random_world_3d import generate_world_with_uncertainty_3d
+
+SECTIONS = ("solver", "speed_map", "obstacles", "mc")
+
+FULL = {
+    "grids":          [(64, 64), (128, 128), (256, 256), (64, 64, 64), (128, 128, 128), (256, 256, 256)],
+    "contrasts":      ("uniform", "random", "obstacles"),
+    "sources":        ("corner", "center"),
+    "methods":        ("fmm", "fsm"),
+    "obstacle_grid":  (256, 256),
+    "n_obstacles":    (1, 5, 20, 50),
+    "mc_grids":       [(128, 128), (48, 48, 48)],
+    "mc_samples":     32,
+    "repeat":         5,
+}
+
+QUICK = {
+    "grids":          [(64, 64), (128, 128), (32, 32, 32)],
+    "contrasts":      ("uniform", "obstacles"),
+    "sources":        ("corner", "center"),
+    "methods":        ("fmm", "fsm"),
+    "obstacle_grid":  (128, 128),
+    "n_obstacles":    (1, 10),
+    "mc_grids":       [(64, 64), (24, 24, 24)],
+    "mc_samples":     8,
+    "repeat":         3,
+}
+
+
+def parse_args():
+    """
+    Parse and return command line arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default="bench_results.json",
+        help="Output JSON file."
+    )
+    parser.add_argument(
+        "-q",
+        "--quick",
+        action="store_true",
+        help="Run a reduced set of small cases (smoke test / CI)."
+    )
+    parser.add_argument(
+        "-s",
+        "--sections",
+        nargs="+",
+        choices=SECTIONS,
+        default=list(SECTIONS),
+        help="Sections to run."
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        help="Timing repeats per case (default: 5, or 3 with --quick)."
+    )
+    parser.add_argument(
+        "-c",
+        "--compare",
+        type=str,
+        help="Previous results file to compare against."
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed for the random worlds and speed fields."
+    )
+    return parser.parse_args()
+
+
+def timeit(fn, setup=None, repeat=3):
+    """
+    Wall-clock times of `repeat` calls of fn(*setup()), excluding setup.
+    """
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup is not None else ()
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def record(section, name, params, times, **derived):
+    rec = {
+        "section": section,
+        "name": name,
+        "params": params,
+        "times": times,
+        "min": min(times),
+        "median": float(np.median(times)),
+    }
+    rec.update(derived)
+    print(f"{name:<60s} min {rec['min']:9.4f} s  median {rec['median']:9.4f} s", flush=True)
+    return rec
+
+
+def world(shape, n_obstacles, seed):
+    """
+    Mean / std SDF of a random obstacle world on a 2D or 3D grid.
+    """
+    np.random.seed(seed)
+    if len(shape) == 2:
+        return generate_world_with_uncertainty(*shape, n_obstacles=n_obstacles)
+    return generate_world_with_uncertainty_3d(*shape, n_obstacles=n_obstacles)
+
+
+def speed_field(shape, contrast, seed):
+    if contrast == "uniform":
+        return np.ones(shape)
+    if contrast == "random":
+        return np.random.default_rng(seed).uniform(0.5, 2.0, shape)
+    if contrast == "obstacles":
+        mean_sdf, _ = world(shape, 5, seed)
+        return speed_mapping.sdf_to_speed(mean_sdf)
+    raise ValueError(f"Unknown contrast: {contrast!r}")
+
+
+def source_index(shape, source):
+    if source == "corner":
+        return (0, 0, 0)
+    idx = tuple(n // 2 for n in shape)
+    return idx + (0,) if len(shape) == 2 else idx
+
+
+def bench_solver(cfg, repeat, seed):
+    results = []
+    for shape in cfg["grids"]:
+        for contrast in cfg["contrasts"]:
+            speed = speed_field(shape, contrast, seed)
+            for source in cfg["sources"]:
+                src_idx = source_index(shape, source)
+                for method in cfg["methods"]:
+                    times = timeit(
+                        lambda solver: solver.solve(),
+                        setup=lambda: (setup_solver_from_speed(
+                            speed, src_idx=src_idx, method=method
+                        ),),
+                        repeat=repeat,
+                    )
+                    name = f"solver/{'x'.join(map(str, shape))}/{contrast}/{source}"
+                    if method != "fmm":
+                        name += f"/{method}"
+                    results.append(record(
+                        "solver", name,
+                        {"grid": list(shape), "contrast": contrast,
+                         "source": source, "method": method},
+                        times,
+                        nodes_per_s=int(np.prod(shape)) / min(times),
+                    ))
+    return results
+
+
+def bench_speed_map(cfg, repeat, seed):
+    maps = {
+        "sdf_to_speed": speed_mapping.sdf_to_speed,
+        "sdf_to_speed_smooth": speed_mapping.sdf_to_speed_smooth,
+        "sdf_to_speed_uncertainty_aware": speed_mapping.sdf_to_speed_uncertainty_aware,
+        "sdf_to_speed_long_tail": speed_mapping.sdf_to_speed_long_tail,
+    }
+    results = []
+    for shape in cfg["grids"]:
+        mean_sdf, std_sdf = world(shape, 5, seed)
+        out = np.empty(shape)
+        for map_name, fn in maps.items():
+            args = (mean_sdf, std_sdf) if map_name.endswith("uncertainty_aware") else (mean_sdf,)
+            times = timeit(lambda: fn(*args, out=out), repeat=repeat)
+            name = f"speed_map/{'x'.join(map(str, shape))}/{map_name}"
+            results.append(record(
+                "speed_map", name,
+                {"grid": list(shape), "map": map_name},
+                times,
+                nodes_per_s=int(np.prod(shape)) / min(times),
+            ))
+    return results
+
+
+def bench_obstacles(cfg, repeat, seed):
+    results = []
+    shape = cfg["obstacle_grid"]
+    for n_obstacles in cfg["n_obstacles"]:
+        mean_sdf, _ = world(shape, n_obstacles, seed)
+        speed = speed_mapping.sdf_to_speed(mean_sdf)
+        times = timeit(
+            lambda solver: solver.solve(),
+            setup=lambda: (setup_solver_from_speed(speed),),
+            repeat=repeat,
+        )
+        name = f"obstacles/{'x'.join(map(str, shape))}/n={n_obstacles}"
+        results.append(record(
+            "obstacles", name,
+            {"grid": list(shape), "n_obstacles": n_obstacles},
+            times,
+        ))
+    return results
+
+
+def bench_mc(cfg, repeat, seed):
+    results = []
+    n_cpu = os.cpu_count() or 1
+    configs = [
+        {"batch_size": 1, "n_workers": 1},
+        {"batch_size": 8, "n_workers": 1},
+    ]
+    if n_cpu > 1:
+        configs.append({"batch_size": 4, "n_workers": n_cpu, "executor": "thread"})
+
+    num_samples = cfg["mc_samples"]
+    for shape in cfg["mc_grids"]:
+        mean_sdf, std_sdf = world(shape, 5, seed)
+        driver = monte_carlo_traveltime if len(shape) == 2 else monte_carlo_traveltime_3d
+        for kwargs in configs:
+            times = timeit(
+                lambda: driver(mean_sdf, std_sdf, num_samples, rng_seed=seed, **kwargs),
+                repeat=max(1, repeat // 2),
+            )
+            params = {"grid": list(shape), "num_samples": num_samples, **kwargs}
+            name = f"mc/{'x'.join(map(str, shape))}/" \
+                + ",".join(f"{k}={v}" for k, v in kwargs.items())
+            results.append(record(
+                "mc", name, params, times,
+                samples_per_s=num_samples / min(times),
+            ))
+    return results
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pykonal": getattr(pykonal, "__version__", None),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "quick": args.quick,
+        "seed": args.seed,
+    }
+
+
+def compare(results, baseline_file, threshold=1.10):
+    """
+    Print min-time ratios against a previous run; flag slowdowns.
+    """
+    with open(baseline_file) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    print(f"\n=== Comparison with {baseline_file} (ratio = new / old) ===")
+    n_slower = 0
+    for rec in results:
+        old = baseline.get(rec["name"])
+        if old is None:
+            continue
+        ratio = rec["min"] / old["min"]
+        flag = "  SLOWER" if ratio > threshold else ""
+        n_slower += bool(flag)
+        print(f"{rec['name']:<60s} {ratio:6.2f}{flag}")
+    print(f"{n_slower} case(s) more than {100 * (threshold - 1):.0f}% slower.")
+
+
+def main():
+    args = parse_args()
+    cfg = QUICK if args.quick else FULL
+    repeat = args.repeat or cfg["repeat"]
+
+    benches = {
+        "solver": bench_solver,
+        "speed_map": bench_speed_map,
+        "obstacles": bench_obstacles,
+        "mc": bench_mc,
+    }
+
+    results = []
+    for section in args.sections:
+        print(f"\n=== {section} ===")
+        results.extend(benches[section](cfg, repeat, args.seed))
+
+    with open(args.output, "w") as f:
+        json.dump({"metadata": metadata(args), "results": results}, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.compare is not None:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Accuracy of a float32 PyKonal build against a float64 one.
+
+Solves the worlds of bench_fmm.py (and the Monte Carlo mean / variance
+of a few of them) with the PyKonal build on the path, and either saves
+the results or compares them with results saved from the other build:
+
+    python benchmarks/bench_precision.py --save float64.npz
+    # rebuild PyKonal with PYKONAL_REAL=float32, then
+    python benchmarks/bench_precision.py --compare float64.npz
+
+Errors are reported over the nodes the front reaches, relative to the
+value of each node; nodes below 0.1% of the largest value (next to the
+source, or with next to no spread) are left out of the relative error.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pykonal
+from bench_fmm import monte_carlo_traveltime, monte_carlo_traveltime_3d
+from bench_fmm import setup_solver_from_speed, source_index, speed_field, world
+
+CASES = {
+    "grids":      [(256, 256), (512, 512), (64, 64, 64), (128, 128, 128)],
+    "contrasts":  ("uniform", "random", "obstacles"),
+    "sources":    ("corner", "center"),
+    "methods":    ("fmm", "fsm"),
+    "mc_grids":   [(128, 128), (48, 48, 48)],
+    "mc_samples": 32,
+}
+
+
+def parse_args():
+    """
+    Parse and return command line arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument(
+        "--save",
+        type=str,
+        help="Save the results of this build to an .npz file."
+    )
+    group.add_argument(
+        "--compare",
+        type=str,
+        help="Compare this build with results saved by --save."
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed for the random worlds and speed fields."
+    )
+    return parser.parse_args()
+
+
+def solve_cases(seed):
+    """
+    Traveltime fields (and solve times) keyed by case name.
+    """
+    results = {}
+    for shape in CASES["grids"]:
+        for contrast in CASES["contrasts"]:
+            speed = speed_field(shape, contrast, seed)
+            for source in CASES["sources"]:
+                src_idx = source_index(shape, source)
+                for method in CASES["methods"]:
+                    solver = setup_solver_from_speed(speed, src_idx=src_idx, method=method)
+                    t0 = time.perf_counter()
+                    solver.solve()
+                    elapsed = time.perf_counter() - t0
+                    name = f"solver/{'x'.join(map(str, shape))}/{contrast}/{source}/{method}"
+                    results[name] = (solver.traveltime.values, elapsed)
+    for shape in CASES["mc_grids"]:
+        mean_sdf, std_sdf = world(shape, 5, seed)
+        driver = monte_carlo_traveltime if len(shape) == 2 else monte_carlo_traveltime_3d
+        t0 = time.perf_counter()
+        mean_T, var_T = driver(mean_sdf, std_sdf, CASES["mc_samples"], rng_seed=seed)
+        elapsed = time.perf_counter() - t0
+        name = f"mc/{'x'.join(map(str, shape))}"
+        results[name + "/mean"] = (mean_T, elapsed)
+        results[name + "/std"] = (np.sqrt(var_T), elapsed)
+    return results
+
+
+def errors(values, reference):
+    """
+    Max absolute, max relative and RMS relative error of `values`.
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    reached = np.isfinite(reference)
+    if not np.array_equal(reached, np.isfinite(values)):
+        raise ValueError("The builds reach different nodes.")
+    diff = np.abs(values[reached] - reference[reached])
+    scale = np.abs(reference[reached])
+    keep = scale >= 1e-3 * scale.max()
+    rel = diff[keep] / scale[keep]
+    return diff.max(), rel.max(), np.sqrt(np.mean(rel ** 2))
+
+
+def main():
+    args = parse_args()
+    dtype = np.dtype(pykonal.constants.DTYPE_REAL).name
+    print(f"PyKonal build: {dtype}", flush=True)
+    results = solve_cases(args.seed)
+
+    if args.save is not None:
+        np.savez(
+            args.save,
+            __dtype__=np.array(dtype),
+            **{f"{name}|values": v for name, (v, _) in results.items()},
+            **{f"{name}|time": t for name, (_, t) in results.items()},
+        )
+        print(f"Wrote {len(results)} results to {args.save}")
+        return
+
+    with np.load(args.compare) as ref:
+        print(f"Reference build: {ref['__dtype__']}\n")
+        print(f"{'case':<48s} {'max abs':>10s} {'max rel':>10s} {'rms rel':>10s} {'time':>7s}")
+        for name, (values, elapsed) in results.items():
+            max_abs, max_rel, rms_rel = errors(values, ref[f"{name}|values"])
+            ratio = elapsed / float(ref[f"{name}|time"])
+            print(f"{name:<48s} {max_abs:10.2e} {max_rel:10.2e} {rms_rel:10.2e} {ratio:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import hashlib
+import inspect
+import os
+import tempfile
+import warnings
+
+import numpy as np
+
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mc_fmm")
+
+
+def _hash_update(h, obj):
+    """
+    Feed a canonical encoding of `obj` to the hash `h`.
+    """
+    if isinstance(obj, np.ndarray):
+        obj = np.ascontiguousarray(obj)
+        h.update(f"ndarray:{obj.dtype.str}:{obj.shape}:".encode())
+        h.update(obj.view(np.uint8).reshape(-1).data)
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}:{len(obj)}:".encode())
+        for item in obj:
+            _hash_update(h, item)
+    elif isinstance(obj, dict):
+        h.update(f"dict:{len(obj)}:".encode())
+        for key in sorted(obj, key=repr):
+            _hash_update(h, key)
+            _hash_update(h, obj[key])
+    elif obj is None or isinstance(obj, (bool, int, float, complex, str, bytes, np.generic)):
+        h.update(f"{type(obj).__name__}:{obj!r};".encode())
+    elif callable(obj):
+        h.update(f"callable:{obj.__module__}.{obj.__qualname__};".encode())
+    else:
+        raise TypeError(f"Cannot hash cache key argument of type {type(obj).__name__}.")
+
+
+def _bind(fn, args, kwargs) -> dict:
+    bound = inspect.signature(fn).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def _key(fn, arguments, seed=None):
+    h = hashlib.blake2b(digest_size=20)
+    _hash_update(h, fn)
+    _hash_update(h, arguments)
+    _hash_update(h, seed)
+    return h.hexdigest()
+
+
+def _unseeded(arguments):
+    """
+    Name of the first seed argument (`seed` or `*_seed`) that is None,
+    or None if there is none.
+    """
+    for name, value in arguments.items():
+        if value is None and (name == "seed" or name.endswith("_seed")):
+            return name
+    return None
+
+
+def _same_random_state(a, b) -> bool:
+    return a[0] == b[0] and np.array_equal(a[1], b[1]) and a[2:] == b[2:]
+
+
+def cache_key(fn, *args, **kwargs) -> str:
+    """
+    Hex digest identifying the call fn(*args, **kwargs).
+
+    Arguments are bound to fn's signature with defaults applied, so
+    equivalent calls share a key; arrays are hashed by content.
+    """
+    return _key(fn, _bind(fn, args, kwargs))
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of array results.
+
+    `cached(fn, *args, **kwargs)` returns fn(*args, **kwargs), computed
+    once and then loaded from `directory` (default: $MC_FMM_CACHE_DIR
+    or ~/.cache/mc_fmm) for any later call with the same function and
+    arguments, array arguments included, so e.g. the Monte Carlo
+    statistics of a world are reused as long as the world itself is
+    unchanged. Results must be arrays or tuples of arrays/scalars.
+
+    Entries are .npz files written atomically; the least recently used
+    ones are deleted once the cache grows beyond `max_bytes`. Keys do
+    not cover the code itself: clear the cache after changing the
+    functions being cached.
+    """
+
+    def __init__(self, directory=None, max_bytes: int = 2**31, enabled: bool = True):
+        if directory is None:
+            directory = os.environ.get("MC_FMM_CACHE_DIR", DEFAULT_DIR)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".npz")
+
+    def get(self, key):
+        """
+        Cached result for `key`, or None.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as npz:
+                kind = str(npz["__kind__"])
+                items = [npz[f"arr_{i}"] for i in range(len(npz.files) - 1)]
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            return None
+        # Mark as recently used.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        items = [item[()] if item.ndim == 0 else item for item in items]
+        return items[0] if kind == "array" else tuple(items)
+
+    def put(self, key, result):
+        """
+        Store `result` under `key` and evict old entries if needed.
+        """
+        if isinstance(result, np.ndarray):
+            kind, items = "array", [result]
+        elif isinstance(result, tuple):
+            kind, items = "tuple", [np.asarray(item) for item in result]
+            if any(item.dtype == object for item in items):
+                raise TypeError("Only arrays and tuples of arrays can be cached.")
+        else:
+            raise TypeError("Only arrays and tuples of arrays can be cached.")
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, *items, __kind__=np.array(kind))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.evict()
+
+    def cached(self, fn, *args, np_random_seed=None, **kwargs):
+        """
+        fn(*args, **kwargs), from the cache if possible.
+
+        `np_random_seed`, if given, seeds NumPy's global random state
+        before calling fn (for generators such as the random worlds
+        that draw from it) and is part of the key.
+
+        Random calls are computed but not cached, with a warning: calls
+        with a seed argument (`seed` or `*_seed`, e.g. `rng_seed`) that
+        is None, and calls without `np_random_seed` that draw from
+        NumPy's global random state.
+        """
+        if not self.enabled:
+            if np_random_seed is not None:
+                np.random.seed(np_random_seed)
+            return fn(*args, **kwargs)
+
+        arguments = _bind(fn, args, kwargs)
+        unseeded = _unseeded(arguments)
+        if unseeded is not None:
+            warnings.warn(
+                f"Not caching {fn.__qualname__}: {unseeded}=None makes the result random.",
+                RuntimeWarning, stacklevel=2
+            )
+            return fn(*args, **kwargs)
+
+        key = _key(fn, arguments, np_random_seed)
+        result = self.get(key)
+        if result is None:
+            if np_random_seed is not None:
+                np.random.seed(np_random_seed)
+                result = fn(*args, **kwargs)
+            else:
+                state = np.random.get_state()
+                result = fn(*args, **kwargs)
+                if not _same_random_state(state, np.random.get_state()):
+                    warnings.warn(
+                        f"Not caching {fn.__qualname__}: it draws from NumPy's global "
+                        "random state; pass np_random_seed to cache it.",
+                        RuntimeWarning, stacklevel=2
+                    )
+                    return result
+            self.put(key, result)
+        return result
+
+    def entries(self):
+        """
+        (mtime, size, path) of every entry, least recently used first.
+        """
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".npz"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes: int = None):
+        """
+        Delete least recently used entries until at most `max_bytes`
+        (default: self.max_bytes) remain.
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        self.evict(0)
@@ -1,7 +1,126 @@
+import os
+import threading
+from statistics import NormalDist
+
 import numpy as np
-from .sdf_sampling import sample_sdf
+import pykonal
+from .sdf_sampling import narrow_band, plan_sdf_draws, sample_sdf_from_draw
 from .speed_mapping import sdf_to_speed
 from .solver import setup_solver_from_speed
+from .parallel import batched, ordered_map
+from .running_stats import RunningStats
+
+
+# Each worker thread (or process) keeps the solver of its previous
+# batch and resets it for the next one on the same grid.
+_worker = threading.local()
+
+
+def _batch_solver(speed, src_idx, min_coords, node_intervals, method,
+                  collect_stats=False):
+    """
+    Solver for one batch, reusing this worker's previous solver when
+    its grid matches.
+    """
+    grid = (speed.shape, tuple(min_coords), tuple(node_intervals))
+    solver = getattr(_worker, "solver", None)
+    if solver is not None and _worker.grid != grid:
+        solver = None
+    _worker.grid = grid
+    _worker.solver = setup_solver_from_speed(
+        speed,
+        min_coords=min_coords,
+        node_intervals=node_intervals,
+        src_idx=src_idx,
+        solver=solver,
+        method=method,
+    )
+    _worker.solver.collect_stats = collect_stats
+    return _worker.solver
+
+
+def _traveltime_batch(draws, mean_sdf, std_sdf, modes, correlation,
+                      band, base_speed, baseline, src_idx, min_coords,
+                      node_intervals, method, collect_stats=False):
+    """
+    Solve one batch of Monte Carlo samples, one planned draw per sample.
+
+    Returns the (n, nx, ny, nz) stack of travel-time fields and the
+    solver statistics of the batch (None unless `collect_stats`).
+    """
+    # Speeds are stored at the precision of the PyKonal build.
+    speeds = np.empty((len(draws),) + mean_sdf.shape,
+                      dtype=pykonal.constants.DTYPE_REAL)
+    # One scratch mask serves every sample of the batch.
+    mask = np.empty(mean_sdf.shape if band is None else band.shape, dtype=bool)
+    for k, draw in enumerate(draws):
+        sdf_k = sample_sdf_from_draw(mean_sdf, std_sdf, draw, modes,
+                                     correlation, band)
+        if band is None:
+            sdf_to_speed(sdf_k, out=speeds[k], mask=mask)
+        else:
+            # Only the band differs from the mean-SDF speed.
+            speeds[k] = base_speed
+            speeds[k].reshape(-1)[band] = sdf_to_speed(sdf_k, out=sdf_k, mask=mask)
+
+    solver = _batch_solver(speeds[0], src_idx, min_coords, node_intervals,
+                           method, collect_stats)
+    if baseline is None:
+        T_batch = solver.solve_batch(speeds)
+    else:
+        T_batch = solver.solve_batch(speeds, baseline, speeds != base_speed)
+    return T_batch, solver.stats
+
+
+def _add_solver_stats(total, stats):
+    """
+    Sum the `EikonalSolver.stats` of a batch into the dict `total`.
+    """
+    for name, value in stats.items():
+        total[name] = total.get(name, 0) + value
+
+
+def _narrow_band_speed(mean_sdf, std_sdf, band_threshold, shape):
+    """
+    Band indices and cached mean-SDF speed, or (None, None) if disabled.
+    """
+    if band_threshold is None:
+        return None, None
+    band = narrow_band(std_sdf, band_threshold)
+    base_speed = sdf_to_speed(mean_sdf).reshape(shape)
+    return band, base_speed.astype(pykonal.constants.DTYPE_REAL, copy=False)
+
+
+def _baseline_traveltime(base_speed, incremental, src_idx,
+                         min_coords, node_intervals, method):
+    """
+    Travel times of the mean-SDF speed for incremental re-solves, or None.
+    """
+    if not incremental:
+        return None
+    if base_speed is None:
+        raise ValueError("incremental requires band_threshold.")
+    if method != "fmm":
+        raise ValueError("incremental requires method='fmm'.")
+    solver = setup_solver_from_speed(
+        base_speed,
+        min_coords=min_coords,
+        node_intervals=node_intervals,
+        src_idx=src_idx,
+    )
+    solver.solve()
+    return solver.traveltime.values
+
+
+def _correlation_options(correlation, sampler, node_intervals):
+    """
+    Validate `correlation` and default its grid spacing to node_intervals.
+    """
+    if correlation is None:
+        return None
+    if sampler not in ("iid", "antithetic"):
+        raise ValueError("correlation is only supported with the iid or antithetic sampler.")
+    return {"spacing": tuple(node_intervals), **correlation}
 
 
 def monte_carlo_traveltime(mean_sdf: np.ndarray,
@@ -10,9 +129,50 @@ def monte_carlo_traveltime(mean_sdf: np.ndarray,
                            src_idx=(0, 0, 0),
                            min_coords=(0.0, 0.0, 0.0),
                            node_intervals=(1.0, 1.0, 1.0),
-                           rng_seed=None):
+                           rng_seed=None,
+                           batch_size: int = 1,
+                           n_workers: int = 1,
+                           executor: str = "thread",
+                           sampler: str = "iid",
+                           modes=None,
+                           correlation=None,
+                           band_threshold: float = None,
+                           incremental: bool = False,
+                           method: str = "fmm",
+                           quantile_edges=None,
+                           return_stats: bool = False,
+                           solver_stats: dict = None):
     """
     Monte Carlo estimation of E[T(x)] and Var[T(x)] over a 3D grid.
+
+    Sample k draws its SDF from its own `SeedSequence(rng_seed)` child
+    stream, or from the variance-reduction scheme chosen by `sampler`
+    ("antithetic", "sobol" or "lhs", optionally over `modes` low-rank
+    DCT modes per axis; see `plan_sdf_draws`). `correlation` (options
+    for `gaussian_random_field`, spacing defaulting to node_intervals)
+    swaps the per-voxel noise for a spatially correlated field. With
+    `band_threshold`, only voxels whose std exceeds it are perturbed
+    (see `narrow_band`); each sample then starts from the cached speed
+    of mean_sdf and re-maps just the band. `incremental=True` (band
+    only) additionally solves mean_sdf once and re-propagates each
+    sample only downstream of its first changed voxel
+    (`EikonalSolver.solve_incremental`).
+    `method="fsm"` uses the Fast Sweeping Method instead of the FMM
+    (see `EikonalSolver.method`); it is first-order accurate, runs on
+    OpenMP threads within each solve (so use few workers with it) and
+    cannot be combined with `incremental`.
+
+    Batches of `batch_size` samples are solved together with
+    `EikonalSolver.solve_batch` and run on `n_workers` threads
+    (`executor="thread"`) or processes (`executor="process"`);
+    `n_workers=None` uses every core. Samples are folded into a
+    `RunningStats` accumulator in sample order as they arrive, so memory
+    stays O(grid) and the estimates are bit-identical for any worker
+    count, executor and batch size. `quantile_edges` enables a per-voxel
+    quantile sketch; `return_stats=True` returns the accumulator instead
+    of (mean_T, var_T). A dict passed as `solver_stats` accumulates the
+    `EikonalSolver.stats` of every batch (heap operations, updates,
+    quadratic clamps, wall time per phase).
     """
 
     if mean_sdf.shape != std_sdf.shape:
@@ -21,29 +181,143 @@ def monte_carlo_traveltime(mean_sdf: np.ndarray,
     if mean_sdf.ndim != 3:
         raise ValueError("mean_sdf must be 3D for 3D traveltime MC.")
 
-    rng = np.random.default_rng(rng_seed)
     shape = mean_sdf.shape
 
-    sum_T = np.zeros(shape, dtype=np.float64)
-    sum_T2 = np.zeros(shape, dtype=np.float64)
+    stats = RunningStats(shape, quantile_edges=quantile_edges)
+
+    correlation = _correlation_options(correlation, sampler, node_intervals)
+    band, base_speed = _narrow_band_speed(mean_sdf, std_sdf, band_threshold, mean_sdf.shape)
+    baseline = _baseline_traveltime(base_speed, incremental, src_idx,
+                                    min_coords, node_intervals, method)
+    draws = plan_sdf_draws(mean_sdf.shape, num_samples, method=sampler,
+                           rng_seed=rng_seed, modes=modes, band=band)
+    tasks = (
+        (batch, mean_sdf, std_sdf, modes, correlation, band, base_speed,
+         baseline, src_idx, min_coords, node_intervals, method,
+         solver_stats is not None)
+        for batch in batched(draws, batch_size)
+    )
+
+    for T_batch, batch_stats in ordered_map(_traveltime_batch, tasks,
+                                            n_workers=n_workers,
+                                            executor=executor):
+        for T_k in T_batch:
+            stats.update(T_k)
+        if solver_stats is not None:
+            _add_solver_stats(solver_stats, batch_stats)
+
+    if return_stats:
+        return stats
+
+    return stats.mean, stats.var()
+
+
+def _ci_converged(stats, roi, z, tol_mean, tol_var):
+    """
+    True once z * SE of E[T] (and of Var[T], if requested) is within
+    tolerance at every ROI voxel reached by the front.
+    """
+    mask = roi & np.isfinite(stats.mean)
+    if not mask.any():
+        return True
+    if tol_mean is not None and z * stats.sem()[mask].max() > tol_mean:
+        return False
+    if tol_var is not None and z * stats.var_se()[mask].max() > tol_var:
+        return False
+    return True
+
+
+def monte_carlo_traveltime_adaptive(mean_sdf: np.ndarray,
+                                    std_sdf: np.ndarray,
+                                    tol_mean: float = None,
+                                    tol_var: float = None,
+                                    roi: np.ndarray = None,
+                                    confidence: float = 0.95,
+                                    min_samples: int = 16,
+                                    max_samples: int = 1000,
+                                    check_every: int = None,
+                                    src_idx=(0, 0, 0),
+                                    min_coords=(0.0, 0.0, 0.0),
+                                    node_intervals=(1.0, 1.0, 1.0),
+                                    rng_seed=None,
+                                    batch_size: int = 1,
+                                    n_workers: int = 1,
+                                    executor: str = "thread",
+                                    correlation=None,
+                                    band_threshold: float = None,
+                                    incremental: bool = False,
+                                    method: str = "fmm",
+                                    return_stats: bool = False,
+                                    solver_stats: dict = None):
+    """
+    Adaptive Monte Carlo estimation of E[T(x)] and Var[T(x)] over a 3D grid.
+
+    Keeps drawing rounds of `check_every` samples (default: one batch
+    per worker) until the `confidence` interval half-width of E[T] is
+    <= `tol_mean` and, if given, that of Var[T] is <= `tol_var` over
+    `roi` (default: free space, mean_sdf > 0), or `max_samples` is hit.
+    Sample k uses the same seed stream as `monte_carlo_traveltime`, and
+    `correlation`, `band_threshold`, `incremental`, `method` and
+    `solver_stats` are handled the same way.
+    Only i.i.d. sampling is supported, since the standard errors assume
+    independent samples.
+
+    Returns (mean_T, var_T, n_samples), or the RunningStats accumulator
+    if return_stats=True.
+    """
+
+    if tol_mean is None and tol_var is None:
+        raise ValueError("At least one of tol_mean or tol_var is required.")
+
+    if mean_sdf.shape != std_sdf.shape:
+        raise ValueError("mean_sdf and std_sdf must have same shape.")
+
+    if mean_sdf.ndim != 3:
+        raise ValueError("mean_sdf must be 3D for 3D traveltime MC.")
 
-    for k in range(num_samples):
-        sdf_k = sample_sdf(mean_sdf, std_sdf, rng)
-        speed_k = sdf_to_speed(sdf_k)
+    if roi is None:
+        roi = mean_sdf > 0.0
+    roi = np.asarray(roi, dtype=bool)
+    if roi.shape != mean_sdf.shape:
+        raise ValueError("roi must have the same shape as mean_sdf.")
 
-        solver = setup_solver_from_speed(
-            speed_k,
-            min_coords=min_coords,
-            node_intervals=node_intervals,
-            src_idx=src_idx,
+    if check_every is None:
+        check_every = batch_size * (
+            os.cpu_count() or 1 if n_workers is None else max(n_workers, 1)
+        )
+
+    correlation = _correlation_options(correlation, "iid", node_intervals)
+    band, base_speed = _narrow_band_speed(mean_sdf, std_sdf, band_threshold, mean_sdf.shape)
+    baseline = _baseline_traveltime(base_speed, incremental, src_idx,
+                                    min_coords, node_intervals, method)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    seq = np.random.SeedSequence(rng_seed)
+    stats = RunningStats(mean_sdf.shape, higher_moments=tol_var is not None)
+
+    while stats.count < max_samples:
+        n_new = min(
+            max(check_every, min_samples - stats.count),
+            max_samples - stats.count,
+        )
+        draws = plan_sdf_draws(mean_sdf.shape, n_new, rng_seed=seq, band=band)
+        tasks = (
+            (batch, mean_sdf, std_sdf, None, correlation, band, base_speed,
+             baseline, src_idx, min_coords, node_intervals, method,
+             solver_stats is not None)
+            for batch in batched(draws, batch_size)
         )
-        solver.solve()
+        for T_batch, batch_stats in ordered_map(_traveltime_batch, tasks,
+                                                n_workers=n_workers,
+                                                executor=executor):
+            for T_k in T_batch:
+                stats.update(T_k)
+            if solver_stats is not None:
+                _add_solver_stats(solver_stats, batch_stats)
 
-        T_k = solver.traveltime.values.copy()
-        sum_T += T_k
-        sum_T2 += T_k ** 2
+        if _ci_converged(stats, roi, z, tol_mean, tol_var):
+            break
 
-    mean_T = sum_T / num_samples
-    var_T = sum_T2 / num_samples - mean_T ** 2
+    if return_stats:
+        return stats
 
-    return mean_T, var_T
+    return stats.mean, stats.var(), stats.count
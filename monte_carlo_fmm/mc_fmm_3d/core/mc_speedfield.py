@@ -1,6 +1,7 @@
 import numpy as np
 from .sdf_sampling import sample_sdf
 from .speed_mapping import sdf_to_speed
+from .running_stats import RunningStats
 
 
 def monte_carlo_speedfield(mean_sdf: np.ndarray,
@@ -16,18 +17,12 @@ def monte_carlo_speedfield(mean_sdf: np.ndarray,
 
     rng = np.random.default_rng(rng_seed)
 
-    shape = mean_sdf.shape
-    sum_S = np.zeros(shape, dtype=np.float64)
-    sum_S2 = np.zeros(shape, dtype=np.float64)
+    stats = RunningStats(mean_sdf.shape)
 
     for k in range(num_samples):
         sdf_k = sample_sdf(mean_sdf, std_sdf, rng)
-        S_k = sdf_to_speed(sdf_k)
+        S_k = sdf_to_speed(sdf_k, out=sdf_k)
 
-        sum_S += S_k
-        sum_S2 += S_k ** 2
+        stats.update(S_k)
 
-    mean_S = sum_S / num_samples
-    var_S = sum_S2 / num_samples - mean_S ** 2
-
-    return mean_S, var_S
+    return stats.mean, stats.var()
@@ -0,0 +1,53 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def batched(items, batch_size: int):
+    """
+    Split `items` into consecutive lists of at most `batch_size`.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1.")
+
+    items = list(items)
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+
+def ordered_map(fn, tasks, n_workers=1, executor="thread", max_pending=None):
+    """
+    Apply `fn(*task)` to each task, yielding the results in task order.
+
+    With `n_workers > 1` the tasks are fanned out over a thread pool
+    (`executor="thread"`) or a process pool (`executor="process"`);
+    `n_workers=None` uses every core. At most `max_pending` tasks
+    (default 2 * n_workers) are in flight at once, so the caller can
+    reduce results as they arrive and memory stays bounded by the
+    number of workers rather than the number of tasks.
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    if n_workers <= 1:
+        for task in tasks:
+            yield fn(*task)
+        return
+
+    if executor == "thread":
+        pool_cls = ThreadPoolExecutor
+    elif executor == "process":
+        pool_cls = ProcessPoolExecutor
+    else:
+        raise ValueError(f"Unknown executor: {executor!r}")
+
+    if max_pending is None:
+        max_pending = 2 * n_workers
+
+    with pool_cls(max_workers=n_workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(fn, *task))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
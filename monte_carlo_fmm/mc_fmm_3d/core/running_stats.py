@@ -0,0 +1,248 @@
+import numpy as np
+
+
+class RunningStats:
+    """
+    Streaming per-voxel statistics of a sequence of equally shaped fields.
+
+    Tracks count, mean, M2 (sum of squared deviations), min and max with
+    Welford's update, which avoids the cancellation of
+    `sum_x2/N - mean**2` and never produces negative variances. Two
+    accumulators built from disjoint sample sets combine with `merge`
+    (Chan et al.'s pairwise formula), so chunked or distributed Monte
+    Carlo runs can be reduced into the same estimates as a single run.
+
+    If `quantile_edges` is given, a per-voxel histogram over those bin
+    edges (plus an underflow and an overflow bin) is kept as a quantile
+    sketch. Histograms merge exactly; `quantile` interpolates linearly
+    inside the bin that holds the requested rank.
+
+    With `higher_moments=True` the third and fourth central moment sums
+    (M3, M4) are tracked as well (Pebay's update and merge formulas),
+    which `var_se` needs for the standard error of the variance.
+    """
+
+    def __init__(self, shape, quantile_edges=None, higher_moments=False):
+        self.count = 0
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+        if higher_moments:
+            self.m3 = np.zeros(shape, dtype=np.float64)
+            self.m4 = np.zeros(shape, dtype=np.float64)
+        else:
+            self.m3 = None
+            self.m4 = None
+
+        if quantile_edges is None:
+            self.quantile_edges = None
+            self.hist = None
+        else:
+            edges = np.asarray(quantile_edges, dtype=np.float64)
+            if edges.ndim != 1 or np.any(np.diff(edges) <= 0):
+                raise ValueError("quantile_edges must be 1D and strictly increasing.")
+            self.quantile_edges = edges
+            self.hist = np.zeros(tuple(shape) + (edges.size + 1,), dtype=np.int64)
+
+    @property
+    def shape(self):
+        return self.mean.shape
+
+    @property
+    def higher_moments(self):
+        return self.m3 is not None
+
+    def update(self, x: np.ndarray):
+        """
+        Add one sample field.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if x.shape != self.shape:
+            raise ValueError("Sample shape does not match accumulator shape.")
+
+        self.count += 1
+        n = self.count
+        delta = x - self.mean
+        delta_n = delta / n
+
+        if self.m3 is not None:
+            # M4 and M3 are updated from the previous M2 / M3.
+            term1 = delta * delta_n * (n - 1)
+            delta_n2 = delta_n**2
+            self.m4 += term1 * delta_n2 * (n * n - 3 * n + 3) \
+                + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+            self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+
+        self.mean += delta_n
+        self.m2 += delta * (x - self.mean)
+
+        np.minimum(self.min, x, out=self.min)
+        np.maximum(self.max, x, out=self.max)
+
+        if self.hist is not None:
+            self._add_to_hist(x)
+
+        return self
+
+    def update_batch(self, xs: np.ndarray):
+        """
+        Add a stack of sample fields along axis 0.
+
+        The batch moments are computed with a two-pass formula and then
+        merged, which is faster than calling `update` per sample but
+        not bit-identical to it.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        if xs.shape[1:] != self.shape:
+            raise ValueError("Sample shape does not match accumulator shape.")
+        if xs.shape[0] == 0:
+            return self
+
+        batch = RunningStats(self.shape, quantile_edges=self.quantile_edges,
+                             higher_moments=self.higher_moments)
+        batch.count = xs.shape[0]
+        batch.mean = xs.mean(axis=0)
+        dev = xs - batch.mean
+        batch.m2 = (dev ** 2).sum(axis=0)
+        if batch.higher_moments:
+            batch.m3 = (dev ** 3).sum(axis=0)
+            batch.m4 = (dev ** 4).sum(axis=0)
+        batch.min = xs.min(axis=0)
+        batch.max = xs.max(axis=0)
+        if batch.hist is not None:
+            for x in xs:
+                batch._add_to_hist(x)
+
+        return self.merge(batch)
+
+    def merge(self, other: "RunningStats"):
+        """
+        Fold the statistics of `other` (a disjoint sample set) into self.
+        """
+        if other.shape != self.shape:
+            raise ValueError("Cannot merge accumulators of different shapes.")
+        if (self.hist is None) != (other.hist is None) or (
+            self.hist is not None
+            and not np.array_equal(self.quantile_edges, other.quantile_edges)
+        ):
+            raise ValueError("Cannot merge accumulators with different quantile edges.")
+        if self.higher_moments and not other.higher_moments:
+            raise ValueError("Cannot merge an accumulator without higher moments.")
+
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count = other.count
+            self.mean = other.mean.copy()
+            self.m2 = other.m2.copy()
+            self.min = other.min.copy()
+            self.max = other.max.copy()
+            if self.hist is not None:
+                self.hist = other.hist.copy()
+            if self.higher_moments:
+                self.m3 = other.m3.copy()
+                self.m4 = other.m4.copy()
+            return self
+
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+
+        if self.higher_moments:
+            # M4 and M3 are merged from the un-merged M2 / M3.
+            delta2 = delta**2
+            self.m4 += other.m4 \
+                + delta2**2 * (na * nb * (na * na - na * nb + nb * nb) / n**3) \
+                + 6 * delta2 * (na * na * other.m2 + nb * nb * self.m2) / n**2 \
+                + 4 * delta * (na * other.m3 - nb * self.m3) / n
+            self.m3 += other.m3 \
+                + delta2 * delta * (na * nb * (na - nb) / n**2) \
+                + 3 * delta * (na * other.m2 - nb * self.m2) / n
+
+        self.mean += delta * (nb / n)
+        self.m2 += other.m2 + delta**2 * (na * nb / n)
+        self.count = n
+
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+
+        if self.hist is not None:
+            self.hist += other.hist
+
+        return self
+
+    def var(self, ddof: int = 0) -> np.ndarray:
+        """
+        Per-voxel variance; `ddof=0` is the population (MC) estimate.
+        """
+        if self.count - ddof <= 0:
+            return np.full(self.shape, np.nan)
+        return self.m2 / (self.count - ddof)
+
+    def std(self, ddof: int = 0) -> np.ndarray:
+        return np.sqrt(self.var(ddof))
+
+    def sem(self) -> np.ndarray:
+        """
+        Per-voxel standard error of the mean estimate.
+        """
+        if self.count < 2:
+            return np.full(self.shape, np.inf)
+        return np.sqrt(self.var(ddof=1) / self.count)
+
+    def var_se(self) -> np.ndarray:
+        """
+        Per-voxel standard error of the (unbiased) variance estimate,
+        sqrt((mu4 - (n - 3) / (n - 1) * sigma**4) / n).
+        """
+        if not self.higher_moments:
+            raise ValueError("Accumulator was built without higher_moments.")
+        n = self.count
+        if n < 4:
+            return np.full(self.shape, np.inf)
+        mu4 = self.m4 / n
+        sigma2 = self.m2 / (n - 1)
+        return np.sqrt(np.maximum(mu4 - (n - 3) / (n - 1) * sigma2**2, 0.0) / n)
+
+    def quantile(self, q: float) -> np.ndarray:
+        """
+        Approximate per-voxel q-quantile from the histogram sketch.
+        """
+        if self.hist is None:
+            raise ValueError("Accumulator was built without quantile_edges.")
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("q must be in [0, 1].")
+        if self.count == 0:
+            return np.full(self.shape, np.nan)
+
+        edges = self.quantile_edges
+        rank = q * self.count
+
+        cum = np.cumsum(self.hist, axis=-1)
+        ibin = np.minimum(
+            (cum < rank).sum(axis=-1, keepdims=True),
+            edges.size,
+        )
+        below = np.take_along_axis(cum, ibin, axis=-1) \
+            - np.take_along_axis(self.hist, ibin, axis=-1)
+        in_bin = np.take_along_axis(self.hist, ibin, axis=-1)
+        ibin, below, in_bin = ibin[..., 0], below[..., 0], in_bin[..., 0]
+
+        # Bin 0 is the underflow bin and the last one the overflow bin;
+        # the observed min / max bound them.
+        lo = np.where(ibin == 0, self.min, edges[np.maximum(ibin - 1, 0)])
+        hi = np.where(ibin == edges.size, self.max, edges[np.minimum(ibin, edges.size - 1)])
+        lo = np.maximum(lo, self.min)
+        hi = np.minimum(hi, self.max)
+
+        frac = np.divide(rank - below, in_bin,
+                         out=np.zeros(self.shape), where=in_bin > 0)
+        return lo + np.clip(frac, 0.0, 1.0) * (hi - lo)
+
+    def _add_to_hist(self, x: np.ndarray):
+        nbins = self.hist.shape[-1]
+        ibin = np.searchsorted(self.quantile_edges, x.ravel(), side="right")
+        flat = np.arange(x.size) * nbins + ibin
+        self.hist.reshape(-1)[flat] += 1
@@ -1,4 +1,10 @@
+import warnings
+
 import numpy as np
+from scipy import fft, special
+from scipy.stats import qmc
+
+from .random_fields import gaussian_random_field
 
 
 def sample_sdf(mean_sdf: np.ndarray,
@@ -11,3 +17,165 @@ def sample_sdf(mean_sdf: np.ndarray,
     if mean_sdf.shape != std_sdf.shape:
         raise ValueError("mean_sdf and std_sdf must have same shape.")
     return rng.normal(loc=mean_sdf, scale=std_sdf)
+
+
+SAMPLERS = ("iid", "antithetic", "sobol", "lhs")
+
+# scipy's Sobol engine supports at most this many dimensions. Latin
+# hypercube draws are capped alike, as they materialize a
+# (num_samples, dim) matrix that must stay small next to the grid.
+_QMC_MAX_DIM = 21201
+
+
+def narrow_band(std_sdf: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Flat indices of the voxels whose std exceeds `threshold`.
+
+    Voxels outside the band are treated as deterministic (kept at the
+    mean SDF), so noise is drawn and the speed re-mapped only inside it.
+    """
+    return np.flatnonzero(std_sdf > threshold)
+
+
+def plan_sdf_draws(shape, num_samples: int, method: str = "iid",
+                   rng_seed=None, modes=None, band=None) -> list:
+    """
+    Plan the standard-normal draws of `num_samples` SDF realizations.
+
+    Returns one (seed, sign, z) tuple per sample for
+    `sample_sdf_from_draw`. Draws are planned up front and are small
+    and self-contained, so sample k is the same whichever batch or
+    worker realizes it.
+
+    method:
+        "iid"        : independent per-voxel Gaussians from the k-th
+                       `SeedSequence(rng_seed)` child (as `sample_sdf`).
+        "antithetic" : samples 2j and 2j+1 share one Gaussian field
+                       with opposite signs.
+        "sobol"      : scrambled Sobol points mapped through the
+                       inverse normal CDF.
+        "lhs"        : Latin hypercube points mapped likewise.
+
+    "sobol" and "lhs" stratify one dimension per voxel, or, if `modes`
+    is given, the coefficients of the `modes` lowest-frequency DCT
+    modes per axis (a low-rank, spatially smooth noise basis normalized
+    to unit per-voxel variance). With a `narrow_band` index set `band`
+    and no `modes`, only the band voxels are dimensions. Both support
+    at most 21201 dimensions, so large grids need `modes` or `band`.
+    `rng_seed` may also be a `SeedSequence`, in which case spawning
+    continues from it.
+    """
+    if method not in SAMPLERS:
+        raise ValueError(f"Unknown sampler: {method!r}")
+
+    if isinstance(rng_seed, np.random.SeedSequence):
+        seq = rng_seed
+    else:
+        seq = np.random.SeedSequence(rng_seed)
+
+    if method == "iid":
+        return [(seed, 1, None) for seed in seq.spawn(num_samples)]
+
+    if method == "antithetic":
+        seeds = seq.spawn((num_samples + 1) // 2)
+        return [(seeds[k // 2], 1 - 2 * (k % 2), None) for k in range(num_samples)]
+
+    if modes is None:
+        dim = int(np.prod(shape)) if band is None else len(band)
+    else:
+        dim = int(np.prod(_mode_shape(shape, modes)))
+
+    if dim > _QMC_MAX_DIM:
+        raise ValueError(
+            f"{method!r} sampling supports at most {_QMC_MAX_DIM} dimensions "
+            f"(got {dim}); pass `modes` or `band` to sample fewer dimensions."
+        )
+
+    rng = np.random.default_rng(seq)
+    if method == "sobol":
+        engine = qmc.Sobol(dim, scramble=True, seed=rng)
+        with warnings.catch_warnings():
+            # Balance is best for powers of two, but any count is valid.
+            warnings.simplefilter("ignore", UserWarning)
+            u = engine.random(num_samples)
+    else:
+        u = qmc.LatinHypercube(dim, seed=rng).random(num_samples)
+
+    eps = np.finfo(np.float64).eps
+    z = special.ndtri(np.clip(u, eps, 1.0 - eps))
+    return [(None, 1, z_k) for z_k in z]
+
+
+def sample_sdf_from_draw(mean_sdf: np.ndarray,
+                         std_sdf: np.ndarray,
+                         draw,
+                         modes=None,
+                         correlation=None,
+                         band=None) -> np.ndarray:
+    """
+    Realize one SDF sample from a `plan_sdf_draws` entry.
+
+    `modes` must match the value the draws were planned with. For
+    "iid" and "antithetic" draws, `correlation` (a dict of
+    `gaussian_random_field` options, e.g. dict(length_scale=4.0,
+    kernel="matern", nu=1.5)) replaces the per-voxel noise with a
+    spatially correlated unit-variance field.
+
+    If `band` (see `narrow_band`) is given, only those voxels are
+    sampled and their values are returned as a 1D array; `band` must
+    match the value the draws were planned with.
+    """
+    seed, sign, z = draw
+    shape = mean_sdf.shape
+    if band is not None:
+        mean_sdf = mean_sdf.reshape(-1)[band]
+        std_sdf = std_sdf.reshape(-1)[band]
+
+    if z is None:
+        rng = np.random.default_rng(seed)
+        if correlation is None:
+            z = rng.standard_normal(mean_sdf.shape)
+        else:
+            z = _restrict(gaussian_random_field(shape, rng, **correlation), band)
+        return mean_sdf + std_sdf * (sign * z)
+
+    if correlation is not None:
+        raise ValueError("correlation is only supported with iid or antithetic draws.")
+
+    if modes is None:
+        return mean_sdf + std_sdf * z.reshape(mean_sdf.shape)
+
+    return mean_sdf + std_sdf * _restrict(_dct_noise(z, shape, modes), band)
+
+
+def _restrict(field, band):
+    return field if band is None else field.reshape(-1)[band]
+
+
+def _mode_shape(shape, modes):
+    if np.isscalar(modes):
+        modes = (modes,) * len(shape)
+    if len(modes) != len(shape):
+        raise ValueError("modes must give one count per grid axis.")
+    return tuple(min(int(m), n) for m, n in zip(modes, shape))
+
+
+def _dct_noise(z, shape, modes):
+    """
+    Smooth unit-variance noise field from low-frequency DCT coefficients.
+    """
+    mshape = _mode_shape(shape, modes)
+    coeffs = np.zeros(shape)
+    coeffs[tuple(slice(0, m) for m in mshape)] = z.reshape(mshape)
+    field = fft.idctn(coeffs, norm="ortho")
+
+    # Per-voxel variance of the truncated basis is separable:
+    # prod over axes of sum_k phi_k(x)**2.
+    var = np.ones(shape)
+    for axis, (n, m) in enumerate(zip(shape, mshape)):
+        phi = fft.idct(np.eye(n)[:m], norm="ortho", axis=1)
+        view = [1] * len(shape)
+        view[axis] = n
+        var = var * (phi**2).sum(axis=0).reshape(view)
+
+    return field / np.sqrt(var)
@@ -5,21 +5,34 @@ import pykonal
 def setup_solver_from_speed(speed: np.ndarray,
                             min_coords=(0.0, 0.0, 0.0),
                             node_intervals=(1.0, 1.0, 1.0),
-                            src_idx=(0, 0, 0)) -> pykonal.EikonalSolver:
+                            src_idx=(0, 0, 0),
+                            solver=None,
+                            method: str = "fmm") -> pykonal.EikonalSolver:
     """
     Create and initialize a 3D PyKonal EikonalSolver from a speed field.
 
     speed: 3D array (nx, ny, nz)
     min_coords: (x_min, y_min, z_min)
     node_intervals: (dx, dy, dz)
-    src_idx: index tuple (ix, iy, iz)
+    src_idx: index tuple (ix, iy, iz), or an (N, 3) array of source
+             nodes solved for in a single pass
+    solver: a solver previously set up on the same grid, reset and
+            reused (EikonalSolver.reset) instead of allocating a new one
+    method: "fmm" (Fast Marching) or "fsm" (Fast Sweeping, on OpenMP
+            threads); see EikonalSolver.method
     """
     if speed.ndim != 3:
         raise ValueError("speed must be a 3D array for 3D FMM.")
 
+    if solver is not None:
+        solver.reset(speed)
+        solver.method = method
+        solver.initialize_sources(src_idx)
+        return solver
+
     nx, ny, nz = speed.shape
 
-    solver = pykonal.EikonalSolver(coord_sys="cartesian")
+    solver = pykonal.EikonalSolver(coord_sys="cartesian", method=method)
 
     solver.velocity.min_coords = tuple(min_coords)
     solver.velocity.node_intervals = tuple(node_intervals)
@@ -34,8 +47,6 @@ def setup_solver_from_speed(speed: np.ndarray,
     solver.traveltime.values[:] = np.inf
     solver.unknown[:] = True
 
-    solver.traveltime.values[src_idx] = 0.0
-    solver.unknown[src_idx] = False
-    solver.trial.push(*src_idx)
+    solver.initialize_sources(src_idx)
 
     return solver
@@ -4,7 +4,9 @@ import numpy as np
 def sdf_to_speed(sdf: np.ndarray,
                  base_speed: float = 1.0,
                  d_safe: float = 1.0,
-                 v_min: float = 1e-3) -> np.ndarray:
+                 v_min: float = 1e-3,
+                 out: np.ndarray = None,
+                 mask: np.ndarray = None) -> np.ndarray:
     """
     Example mapping from SDF d(x) -> speed S*(x), dimension-agnostic.
 
@@ -12,20 +14,33 @@ def sdf_to_speed(sdf: np.ndarray,
     - 0 < d < d_safe : smooth increase from v_min to base_speed.
     - d >= d_safe : base_speed.
 
+    Evaluated in place in `out` (a float32 or float64 buffer of sdf's
+    shape, allocated as float64 if None; may be `sdf` itself), so
+    per-sample calls with a reused buffer allocate no temporaries.
+    `mask` is an optional boolean scratch array of sdf's shape.
+
     Replace with your own S*(d) when ready.
     """
-    speed = np.empty_like(sdf, dtype=np.float64)
-
-    inside = sdf <= 0.0
-    band = (sdf > 0.0) & (sdf < d_safe)
-    outside = sdf >= d_safe
-
-    speed[inside] = v_min
-
-    if np.any(band):
-        t = np.clip(sdf[band] / d_safe, 0.0, 1.0)
-        speed[band] = v_min + (base_speed - v_min) * t**2
-
-    speed[outside] = base_speed
-
-    return speed
+    if mask is None:
+        mask = np.empty(np.shape(sdf), dtype=bool)
+    elif mask.shape != np.shape(sdf) or mask.dtype != bool:
+        raise ValueError("mask must be a boolean array with the shape of sdf.")
+    # The far region is taken before `out` may overwrite `sdf`.
+    outside = np.greater_equal(sdf, d_safe, out=mask)
+
+    if out is None:
+        out = np.empty(np.shape(sdf), dtype=np.float64)
+    elif out.shape != np.shape(sdf) or out.dtype not in (np.float32, np.float64):
+        raise ValueError("out must be a float32 or float64 array with the shape of sdf.")
+
+    # t = clip(d / d_safe, 0, 1) is 0 inside obstacles, so one expression
+    # covers the inside and the transition band. Beyond d_safe the speed
+    # is base_speed exactly, which (base_speed - v_min) + v_min need not be.
+    np.divide(sdf, d_safe, out=out)
+    np.clip(out, 0.0, 1.0, out=out)
+    np.square(out, out=out)
+    out *= base_speed - v_min
+    out += v_min
+    np.copyto(out, base_speed, where=outside)
+
+    return out
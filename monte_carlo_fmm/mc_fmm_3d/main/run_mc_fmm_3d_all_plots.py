@@ -9,6 +9,7 @@ from sdf_gen.random_world_3d import generate_world_with_uncertainty_3d
 from core.speed_mapping import sdf_to_speed
 from core.mc_speedfield import monte_carlo_speedfield
 from core.mc_driver import monte_carlo_traveltime
+from core.cache import ResultCache
 from viz3d.plot_fields_3d import (
     plot_sdf_slice,
     plot_field_slice,
@@ -22,21 +23,30 @@ from viz3d.plot_fields_3d import (
 
 if __name__ == "__main__":
 
+    # Worlds and Monte Carlo results are cached on disk
+    # ($MC_FMM_CACHE_DIR, default ~/.cache/mc_fmm) by a hash of their
+    # inputs, so reruns with unchanged parameters go straight to the
+    # plots.
+    cache = ResultCache()
+
     # Grid resolution
     nx, ny, nz = 48, 48, 48
     map_size = 5.0  # meters, for your own semantic use
 
     n_obstacles = 3
+    world_seed = 0
     num_samples = 30
 
     print(f"\n=== 3D MC FMM: {n_obstacles} obstacles, {num_samples} samples ===\n")
 
     # Generate 3D world
-    mean_sdf, std_sdf = generate_world_with_uncertainty_3d(
+    mean_sdf, std_sdf = cache.cached(
+        generate_world_with_uncertainty_3d,
         nx, ny, nz,
         n_obstacles=n_obstacles,
         map_size=map_size,
         scale_range=(0.02, 0.08),
+        np_random_seed=world_seed,
     )
 
     # Voxel spacing (for physical units in PyKonal)
@@ -64,7 +74,8 @@ if __name__ == "__main__":
     # Monte Carlo speed field S*
     # ------------------------------------------------------
     print("Running Monte Carlo for speed field S*(x)...")
-    mean_S, var_S = monte_carlo_speedfield(
+    mean_S, var_S = cache.cached(
+        monte_carlo_speedfield,
         mean_sdf,
         std_sdf,
         num_samples=num_samples,
@@ -86,7 +97,8 @@ if __name__ == "__main__":
     print("Running Monte Carlo FMM (traveltime)...")
     src_idx = (0, 0, 0)  # lower corner
 
-    mean_T, var_T = monte_carlo_traveltime(
+    mean_T, var_T = cache.cached(
+        monte_carlo_traveltime,
         mean_sdf,
         std_sdf,
         num_samples=num_samples,
@@ -7,7 +7,7 @@ from .__version__ import (
     __version__
 )
 
-from .solver import EikonalSolver
+from .solver import EikonalSolver, EikonalSolver2D
 
 from . import constants
 from . import fields
@@ -1,5 +1,10 @@
 cimport numpy as np
 
-ctypedef np.float64_t  REAL_t
+# Values of fields: double, or float in builds with PYKONAL_REAL=float32.
+cdef extern from "real.h":
+    ctypedef double REAL_t "pykonal_real_t"
+
+# Intermediate results of the update kernels, double in every build.
+ctypedef double        WORK_t
 ctypedef np.uint16_t   UINT_t
 ctypedef np.npy_bool   BOOL_t
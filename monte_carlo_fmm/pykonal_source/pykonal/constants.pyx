@@ -3,7 +3,8 @@ Package-level constants.
 """
 import numpy as np
 
-DTYPE_REAL = np.float64
+# float32 if built with PYKONAL_REAL=float32 (see real.h).
+DTYPE_REAL = np.float32 if sizeof(REAL_t) == 4 else np.float64
 DTYPE_UINT = np.uint32
 DTYPE_INT  = np.int32
 DTYPE_BOOL = np.bool_
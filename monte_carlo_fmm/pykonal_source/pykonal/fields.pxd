@@ -10,10 +10,21 @@ cdef class Field3D(object):
     cdef constants.BOOL_t[3]       cy_iax_isperiodic
     cdef constants.REAL_t[3]       cy_max_coords
     cdef constants.REAL_t[3]       cy_min_coords
-    cdef constants.REAL_t[:,:,:,:] cy_norm
+    cdef object                    cy_nodes
+    cdef object                    cy_norm
     cdef constants.UINT_t[3]       cy_npts
     cdef constants.REAL_t[3]       cy_node_intervals
 
+    cdef bint _locate(
+        Field3D self,
+        constants.REAL_t x1,
+        constants.REAL_t x2,
+        constants.REAL_t x3,
+        Py_ssize_t[3][2] ii,
+        constants.REAL_t[3] delta
+    ) noexcept nogil
+    cdef void _clear_cache(Field3D self)
+    cdef void _clear_grid_cache(Field3D self)
     cdef constants.BOOL_t _update_max_coords(Field3D self)
     cdef constants.BOOL_t _update_iax_isnull(Field3D self)
     cdef constants.BOOL_t _update_iax_isperiodic(Field3D self)
@@ -28,6 +39,9 @@ cdef class Field3D(object):
 
 cdef class ScalarField3D(Field3D):
     cdef constants.REAL_t[:,:,:] cy_values
+    cdef VectorField3D           cy_gradient
+
+    cdef void _clear_cache(ScalarField3D self)
 
     cpdef np.ndarray[constants.REAL_t, ndim=1] resample(
         ScalarField3D self,
@@ -43,6 +57,27 @@ cdef class ScalarField3D(Field3D):
         constants.REAL_t[:] point,
         constants.REAL_t null=*
     )
+    cdef constants.REAL_t _value(
+        ScalarField3D self,
+        constants.REAL_t x1,
+        constants.REAL_t x2,
+        constants.REAL_t x3,
+        constants.REAL_t null
+    ) noexcept nogil
+    cdef void _node_gradient(
+        ScalarField3D self,
+        Py_ssize_t[3] idx,
+        bint spherical,
+        constants.REAL_t* gg
+    ) noexcept nogil
+    cdef void _gradient_value(
+        ScalarField3D self,
+        constants.REAL_t x1,
+        constants.REAL_t x2,
+        constants.REAL_t x3,
+        bint spherical,
+        constants.REAL_t* ff
+    ) noexcept nogil
     cpdef VectorField3D _gradient_of_cartesian(ScalarField3D self)
     cpdef VectorField3D _gradient_of_spherical(ScalarField3D self)
 
@@ -50,10 +85,23 @@ cdef class ScalarField3D(Field3D):
 cdef class VectorField3D(Field3D):
     cdef constants.REAL_t[:,:,:,:] cy_values
 
+    cpdef np.ndarray[constants.REAL_t, ndim=2] resample(
+        VectorField3D self,
+        constants.REAL_t[:,:] points,
+        constants.REAL_t null=*
+    )
     cpdef np.ndarray[constants.REAL_t, ndim=1] value(
         VectorField3D self,
         constants.REAL_t[:] point
     )
+    cdef void _value(
+        VectorField3D self,
+        constants.REAL_t x1,
+        constants.REAL_t x2,
+        constants.REAL_t x3,
+        constants.REAL_t null,
+        constants.REAL_t* ff
+    ) noexcept nogil
 
 
 cpdef Field3D load(str path)
@@ -21,6 +21,7 @@ classes.
 """
 
 import warnings
+import weakref
 
 # Third-party imports
 import h5py
@@ -31,7 +32,9 @@ from . import constants
 from . import transformations
 
 # Cython built-in imports.
-from libc.math cimport sqrt, sin
+cimport cython
+from cython.parallel cimport prange
+from libc.math cimport sqrt, sin, isnan, NAN
 from libcpp.vector cimport vector as cpp_vector
 
 # Third-party Cython imports
@@ -40,6 +43,94 @@ cimport numpy as np
 # Local Cython imports
 from . cimport constants
 
+
+# Batches of fewer points are interpolated serially, as spawning
+# OpenMP threads would cost more than it saves.
+cdef enum:
+    MIN_PARALLEL_POINTS = 4096
+
+# Integrators for ScalarField3D.trace_rays.
+RAY_METHODS = ("euler", "rk2", "rk4")
+cdef enum:
+    EULER, RK2, RK4
+
+# Smallest fraction of the decrease in traveltime predicted by the
+# gradient for trace_rays to accept a step.
+cdef constants.REAL_t SUFFICIENT_DECREASE = 0.25
+
+# Number of times trace_rays halves its step size to keep stepping
+# down the traveltime field before ending a ray, and number of
+# accepted steps after which it doubles it again.
+cdef enum:
+    MAX_STEP_HALVINGS = 10
+    STEPS_BEFORE_REGROWTH = 4
+
+# Grid metrics (node coordinates, gradient scaling factors) by grid
+# geometry, shared by all the fields on a grid while any of them holds
+# them.
+_grid_metrics = weakref.WeakValueDictionary()
+
+
+def _grid_metric(field, name, build):
+    # Read-only metric *name* of the grid of *field*, built by
+    # build(field) if no field on the same grid holds it.
+    key = (
+        name,
+        field.coord_sys,
+        tuple(field.min_coords),
+        tuple(field.node_intervals),
+        tuple(field.npts)
+    )
+    metric = _grid_metrics.get(key)
+    if metric is None:
+        metric = build(field)
+        metric.flags.writeable = False
+        _grid_metrics[key] = metric
+    return (metric)
+
+
+def _build_nodes(field):
+    nodes = [
+        np.linspace(
+            field.min_coords[idx],
+            field.max_coords[idx],
+            field.npts[idx],
+            dtype=constants.DTYPE_REAL
+        )
+        for idx in range(3)
+    ]
+    nodes = np.meshgrid(*nodes, indexing="ij")
+    nodes = np.stack(nodes)
+    nodes = np.moveaxis(nodes, 0, -1)
+    return (nodes)
+
+
+def _build_norm(field):
+    shape = tuple(field.npts) + (3,)
+    if field.coord_sys != "spherical":
+        # Constant on Cartesian grids: a view of the node intervals
+        # with zero strides, so reading it touches only three values.
+        return (np.broadcast_to(field.node_intervals, shape))
+    rho, theta = [
+        np.linspace(
+            field.min_coords[idx],
+            field.max_coords[idx],
+            field.npts[idx],
+            dtype=constants.DTYPE_REAL
+        )
+        for idx in range(2)
+    ]
+    norm = np.empty(shape, dtype=constants.DTYPE_REAL)
+    norm[..., 0] = field.node_intervals[0]
+    norm[..., 1] = field.node_intervals[1] * rho[:, None, None]
+    norm[..., 2] = (
+        field.node_intervals[2]
+        * rho[:, None, None]
+        * np.sin(theta)[None, :, None]
+    )
+    return (norm)
+
+
 cdef class Field3D(object):
     """
     Base class for representing generic 3D fields.
@@ -97,7 +188,7 @@ cdef class Field3D(object):
         :math:`\phi` coordinate must be in [-:math:`\pi`, :math:`\pi`) or
         [0, 2:math:`\pi`] for spherical coordinates.
         """
-        return (np.asarray(self.cy_min_coords))
+        return (np.asarray(self.cy_min_coords, dtype=constants.DTYPE_REAL))
 
     @min_coords.setter
     def min_coords(self, value):
@@ -108,6 +199,7 @@ cdef class Field3D(object):
         self.cy_min_coords = np.asarray(value, dtype=constants.DTYPE_REAL)
         self._update_max_coords()
         self._update_iax_isperiodic()
+        self._clear_grid_cache()
 
     @property
     def max_coords(self):
@@ -115,7 +207,7 @@ cdef class Field3D(object):
         [*Read only*, :class:`numpy.ndarray`\ (shape=(3,), dtype=numpy.float)]
         Array specifying the upper bound of each axis.
         """
-        return (np.asarray(self.cy_max_coords))
+        return (np.asarray(self.cy_max_coords, dtype=constants.DTYPE_REAL))
 
     @property
     def node_intervals(self):
@@ -124,7 +216,7 @@ cdef class Field3D(object):
         Array of node intervals along each axis. This attribute must be
         initialized by the user.
         """
-        return (np.asarray(self.cy_node_intervals))
+        return (np.asarray(self.cy_node_intervals, dtype=constants.DTYPE_REAL))
 
     @node_intervals.setter
     def node_intervals(self, value):
@@ -134,47 +226,32 @@ cdef class Field3D(object):
         self.cy_node_intervals = value
         self._update_max_coords()
         self._update_iax_isperiodic()
+        self._clear_grid_cache()
 
     @property
     def nodes(self):
         """
         [*Read only*, :class:`numpy.ndarray`\ (shape=(N0,N1,N2,3), dtype=numpy.float)]
-        Array specifying the grid-node coordinates.
-        """
-        nodes = [
-            np.linspace(
-                self.min_coords[idx],
-                self.max_coords[idx],
-                self.npts[idx],
-                dtype=constants.DTYPE_REAL
-            )
-            for idx in range(3)
-        ]
-        nodes = np.meshgrid(*nodes, indexing="ij")
-        nodes = np.stack(nodes)
-        nodes = np.moveaxis(nodes, 0, -1)
-        return (nodes)
+        Array specifying the grid-node coordinates. The array is
+        read-only and cached, and shared with other fields on the same
+        grid.
+        """
+        if self.cy_nodes is None:
+            self.cy_nodes = _grid_metric(self, "nodes", _build_nodes)
+        return (self.cy_nodes)
 
     @property
     def norm(self):
         """
         [*Read-only*, numpy.ndarray(shape=(N0,N1,N2,3), dtype=numpy.float)] 4D array of scaling
-        factors for gradient operator.
+        factors for gradient operator. The array is read-only and
+        cached, and shared with other fields on the same grid; on
+        Cartesian grids it is a zero-stride view of
+        :attr:`node_intervals`.
         """
-
-        try:
-            return (np.asarray(self.cy_norm))
-        except AttributeError:
-            norm = np.tile(
-                self.node_intervals,
-                np.append(self.npts, 1)
-            )
-            if self.coord_sys == "spherical":
-                norm[..., 1] *= self.nodes[..., 0]
-                norm[..., 2] *= self.nodes[..., 0]
-                norm[..., 2] *= np.sin(self.nodes[..., 1])
-            self.cy_norm = norm
-        return (np.asarray(self.cy_norm))
+        if self.cy_norm is None:
+            self.cy_norm = _grid_metric(self, "norm", _build_norm)
+        return (self.cy_norm)
 
     @property
     def npts(self):
@@ -191,16 +268,75 @@ cdef class Field3D(object):
         self._update_max_coords()
         self._update_iax_isnull()
         self._update_iax_isperiodic()
+        self._clear_grid_cache()
 
     @property
     def step_size(self):
         """
         [*Read only*, :class:`float`] Step size used for ray tracing.
         """
-        norm = self.norm[..., ~self.iax_isnull]
+        if self.coord_sys != "spherical":
+            norm = self.node_intervals[~self.iax_isnull]
+        else:
+            norm = self.norm[..., ~self.iax_isnull]
         return (norm[~np.isclose(norm, 0)].min() / 4)
 
 
+    cdef bint _locate(
+        Field3D self,
+        constants.REAL_t x1,
+        constants.REAL_t x2,
+        constants.REAL_t x3,
+        Py_ssize_t[3][2] ii,
+        constants.REAL_t[3] delta
+    ) noexcept nogil:
+        # Find the grid cell containing point (x1, x2, x3) for
+        # trilinear interpolation: the indices of its two nodes along
+        # each axis and the fractional position of the point between
+        # them. Returns False if the point lies outside the grid.
+        cdef constants.REAL_t[3] point
+        cdef constants.REAL_t    idx
+        cdef Py_ssize_t          iax, npts
+
+        point[0], point[1], point[2] = x1, x2, x3
+        for iax in range(3):
+            if (
+                (
+                    point[iax] < self.cy_min_coords[iax]
+                    or point[iax] > self.cy_max_coords[iax]
+                )
+                and not self.cy_iax_isperiodic[iax]
+                and not self.cy_iax_isnull[iax]
+            ):
+                return (False)
+            idx = (point[iax] - self.cy_min_coords[iax]) / self.cy_node_intervals[iax]
+            if self.cy_iax_isnull[iax]:
+                ii[iax][0] = 0
+                ii[iax][1] = 0
+            else:
+                npts = <Py_ssize_t> self.cy_npts[iax]
+                ii[iax][0] = <Py_ssize_t> idx
+                ii[iax][1] = (ii[iax][0] + 1) % npts
+                if ii[iax][1] < 0:
+                    ii[iax][1] += npts
+            delta[iax] = idx % 1
+        return (True)
+
+
+    cdef void _clear_cache(Field3D self):
+        # Drop anything derived from the values or the grid geometry;
+        # called whenever either is set.
+        pass
+
+
+    cdef void _clear_grid_cache(Field3D self):
+        # Drop the grid metrics too; called whenever the grid geometry
+        # is set.
+        self.cy_nodes = None
+        self.cy_norm = None
+        self._clear_cache()
+
+
     cdef constants.BOOL_t _update_iax_isperiodic(Field3D self):
         if self.cy_coord_sys == "spherical":
             self.cy_iax_isperiodic[2] = np.isclose(
@@ -340,13 +476,19 @@ cdef class ScalarField3D(Field3D):
     @property
     def gradient(self):
         """
-        [*Read only*, numpy.ndarray(shape=(N0,N1,N2,3), dtype=numpy.float)]
-        Gradient of the field.
+        [*Read only*, :class:`VectorField3D`] Gradient of the field.
+
+        The gradient is computed on first access and cached until
+        :attr:`values`, :attr:`min_coords`, :attr:`node_intervals` or
+        :attr:`npts` is set. Modifying :attr:`values` in place does not
+        invalidate the cache; assign the modified array instead.
         """
-        if self.coord_sys == "cartesian":
-            return (self._gradient_of_cartesian())
-        elif self.coord_sys == "spherical":
-            return (self._gradient_of_spherical())
+        if self.cy_gradient is None:
+            if self.coord_sys == "cartesian":
+                self.cy_gradient = self._gradient_of_cartesian()
+            elif self.coord_sys == "spherical":
+                self.cy_gradient = self._gradient_of_spherical()
+        return (self.cy_gradient)
 
 
     @property
@@ -367,6 +509,11 @@ cdef class ScalarField3D(Field3D):
         if not np.all(values.shape == self.npts):
             raise (ValueError("Shape of values does not match npts attribute."))
         self.cy_values = values
+        self._clear_cache()
+
+
+    cdef void _clear_cache(ScalarField3D self):
+        self.cy_gradient = None
 
 
     cpdef np.ndarray[constants.REAL_t, ndim=1] resample(ScalarField3D self, constants.REAL_t[:,:] points, constants.REAL_t null=np.nan):
@@ -376,6 +523,10 @@ cdef class ScalarField3D(Field3D):
         Resample the field at an arbitrary set of points using
         trilinear interpolation.
 
+        The GIL is released during interpolation, and large batches of
+        points are spread over OpenMP threads if PyKonal was built with
+        OpenMP support.
+
         :param points: Points at which to resample the field.
         :type points: numpy.ndarray(shape=(N,3), dtype=numpy.float)
         :param null: Default (null) value to return for points lying
@@ -384,15 +535,27 @@ cdef class ScalarField3D(Field3D):
         :return: Resampled field values.
         :rtype: numpy.ndarray(shape=(N,), dtype=numpy.float)
         """
-        cdef Py_ssize_t                           idx
-        cdef np.ndarray[constants.REAL_t, ndim=1] resampled # Using a MemoryViewBuffer might make this faster.
+        cdef Py_ssize_t              idx
+        cdef constants.REAL_t[:]     resampled
 
+        if points.shape[1] != 3:
+            raise (ValueError("points must have shape (N, 3)."))
+        self.values # Allocate the values if they are not set yet.
         resampled = np.empty(points.shape[0], dtype=constants.DTYPE_REAL)
 
-        for idx in range(points.shape[0]):
-            resampled[idx] = self.value(points[idx], null=null)
+        with nogil:
+            if points.shape[0] < MIN_PARALLEL_POINTS:
+                for idx in range(points.shape[0]):
+                    resampled[idx] = self._value(
+                        points[idx, 0], points[idx, 1], points[idx, 2], null
+                    )
+            else:
+                for idx in prange(points.shape[0], schedule="static"):
+                    resampled[idx] = self._value(
+                        points[idx, 0], points[idx, 1], points[idx, 2], null
+                    )
 
-        return (resampled)
+        return (np.asarray(resampled))
 
 
     cpdef np.ndarray[constants.REAL_t, ndim=2] trace_ray(
@@ -432,7 +595,7 @@ cdef class ScalarField3D(Field3D):
 
         for idx in range(3):
             ray.push_back(end[idx])
-        value = np.infty
+        value = np.inf
 
         while True:
             point = <constants.REAL_t[:3]>&ray[ray.size()-3]
@@ -462,6 +625,96 @@ cdef class ScalarField3D(Field3D):
         return (np.flipud(ray_np.reshape(-1,3)))
 
 
+    def trace_rays(
+        self,
+        ends,
+        method="rk4",
+        step_size=None,
+        max_points=None,
+        lazy_gradient=False
+    ):
+        """
+        trace_rays(self, ends, method="rk4", step_size=None, max_points=None, lazy_gradient=False)
+
+        Trace the rays ending at each of *ends* (given in the same
+        coordinate system as self.coord_sys.)
+
+        Like :meth:`trace_ray`, each ray is traced backwards along the
+        path of steepest descent and then reversed, but the steps are
+        integrated in
+        compiled code with the GIL released (the rays spread over
+        OpenMP threads if PyKonal was built with OpenMP support), and
+        the rays are written to a single padded array. Each step uses
+        the *method* integrator {"euler", "rk2", "rk4"}. Where a step
+        would not decrease the traveltime by at least a quarter of
+        the decrease predicted by the gradient, e.g. when overshooting
+        the source, it is retried with half the step size (up to 10
+        times), so rays end close to the source.
+
+        :param ends: Coordinates of the rays' end points.
+        :type ends: numpy.ndarray(shape=(N,3), dtype=numpy.float)
+        :param method: Integrator used to step along the rays.
+        :type method: str
+        :param step_size: Largest step size; defaults to
+                          :attr:`step_size`.
+        :type step_size: float
+        :param max_points: Maximum number of points per ray; defaults
+                           to enough for rays twice the length of the
+                           grid's diagonal. Longer rays are truncated.
+        :type max_points: int
+        :param lazy_gradient: If True and :attr:`gradient` is not
+                              cached yet, evaluate the gradient only
+                              in the grid cells the rays pass through
+                              instead of computing it for the whole
+                              grid; faster for a few rays on a large
+                              grid.
+        :type lazy_gradient: bool
+
+        :return: The ray paths, padded with NaN, and the number of
+                 points of each; ray *k* is rays[k, :npts[k]], and
+                 rays ending outside the grid are empty.
+        :rtype:  tuple(numpy.ndarray(shape=(N,M,3), dtype=numpy.float),
+                 numpy.ndarray(shape=(N,), dtype=numpy.int))
+        """
+        cdef Py_ssize_t                k
+        cdef constants.REAL_t          step
+        cdef constants.REAL_t[:,:,::1] rays
+        cdef Py_ssize_t[:]             npts
+        cdef Py_ssize_t                max_pts
+        cdef int                       imethod
+        cdef bint                      spherical
+        cdef VectorField3D             grad
+
+        if method not in RAY_METHODS:
+            raise (ValueError(f"method must be one of {RAY_METHODS}."))
+        imethod = (EULER, RK2, RK4)[RAY_METHODS.index(method)]
+        ends = np.asarray(ends, dtype=constants.DTYPE_REAL).reshape(-1, 3)
+        step = self.step_size if step_size is None else step_size
+        if not step > 0:
+            raise (ValueError("step_size must be positive."))
+        if max_points is None:
+            extent = (self.npts - 1) * self.norm.max(axis=(0, 1, 2))
+            max_points = 2 * int(np.sqrt(np.sum(np.square(extent))) / step) + 2
+        max_pts = max_points
+        spherical = self.coord_sys == "spherical"
+
+        self.values # Allocate the values if they are not set yet.
+        grad = self.cy_gradient if lazy_gradient else self.gradient
+        rays_np = np.full((ends.shape[0], max_pts, 3), np.nan, dtype=constants.DTYPE_REAL)
+        rays_np[:, 0] = ends
+        rays = rays_np
+        npts = np.zeros(ends.shape[0], dtype=np.intp)
+
+        with nogil:
+            for k in prange(rays.shape[0], schedule="dynamic"):
+                npts[k] = _trace_ray(
+                    self, grad, &rays[k, 0, 0], max_pts, step, imethod, spherical
+                )
+
+        npts_np = np.asarray(npts)
+        return (rays_np[:, :max(npts_np.max(initial=0), 1)], npts_np)
+
+
     cpdef constants.REAL_t value(
         ScalarField3D self,
         constants.REAL_t[:] point,
@@ -481,32 +734,27 @@ cdef class ScalarField3D(Field3D):
         :return: Value of the field at *point*.
         :rtype: float
         """
-        cdef constants.REAL_t[3]         delta, idx
+        self.values # Allocate the values if they are not set yet.
+        return (self._value(point[0], point[1], point[2], null))
+
+
+    @cython.initializedcheck(False)
+    cdef constants.REAL_t _value(
+        ScalarField3D self,
+        constants.REAL_t x1,
+        constants.REAL_t x2,
+        constants.REAL_t x3,
+        constants.REAL_t null
+    ) noexcept nogil:
+        cdef constants.REAL_t[3]         delta
         cdef constants.REAL_t            f000, f100, f110, f101, f111, f010, f011, f001
         cdef constants.REAL_t            f00, f10, f01, f11
         cdef constants.REAL_t            f0, f1
         cdef constants.REAL_t            f
         cdef Py_ssize_t[3][2]            ii
-        cdef Py_ssize_t                  i1, i2, i3, iax, di1, di2, di3
 
-        for iax in range(3):
-            if (
-                (
-                    point[iax] < self.cy_min_coords[iax]
-                    or point[iax] > self.cy_max_coords[iax]
-                )
-                and not self.cy_iax_isperiodic[iax]
-                and not self.cy_iax_isnull[iax]
-            ):
-                return (null)
-            idx[iax]   = (point[iax] - self.cy_min_coords[iax]) / self.cy_node_intervals[iax]
-            if self.cy_iax_isnull[iax]:
-                ii[iax][0] = 0
-                ii[iax][1] = 0
-            else:
-                ii[iax][0]  = <Py_ssize_t>idx[iax]
-                ii[iax][1]  = <Py_ssize_t>(ii[iax][0]+1) % self.npts[iax]
-            delta[iax] = idx[iax] % 1
+        if not self._locate(x1, x2, x3, ii, delta):
+            return (null)
         f000    = self.cy_values[ii[0][0], ii[1][0], ii[2][0]]
         f100    = self.cy_values[ii[0][1], ii[1][0], ii[2][0]]
         f110    = self.cy_values[ii[0][1], ii[1][1], ii[2][0]]
@@ -525,6 +773,95 @@ cdef class ScalarField3D(Field3D):
         return (f)
 
 
+    @cython.initializedcheck(False)
+    cdef void _node_gradient(
+        ScalarField3D self,
+        Py_ssize_t[3] idx,
+        bint spherical,
+        constants.REAL_t* gg
+    ) noexcept nogil:
+        # Gradient at node *idx*, using the same finite differences as
+        # _gradient_of_cartesian (*spherical* False) or
+        # _gradient_of_spherical (*spherical* True).
+        cdef constants.REAL_t  f0, f1, f2, h, scale
+        cdef Py_ssize_t[3][3]  jj
+        cdef Py_ssize_t        iax, jax, i, npts
+
+        for iax in range(3):
+            if self.cy_iax_isnull[iax]:
+                gg[iax] = 0
+                continue
+            i = idx[iax]
+            npts = <Py_ssize_t> self.cy_npts[iax]
+            h = self.cy_node_intervals[iax]
+            scale = 1
+            if spherical and iax > 0:
+                scale = self.cy_min_coords[0] + idx[0] * self.cy_node_intervals[0]
+                if iax == 2:
+                    scale *= sin(self.cy_min_coords[1] + idx[1] * self.cy_node_intervals[1])
+            # Nodes (i-1, i, i+1) along this axis, or the three nodes
+            # nearest the edge for one-sided differences.
+            for jax in range(3):
+                jj[0][jax] = jj[1][jax] = jj[2][jax] = idx[jax]
+            if i == 0:
+                jj[1][iax], jj[2][iax] = 1, 2
+            elif i == npts - 1:
+                jj[0][iax], jj[1][iax] = npts - 3, npts - 2
+            else:
+                jj[0][iax], jj[2][iax] = i - 1, i + 1
+            f0 = self.cy_values[jj[0][0], jj[0][1], jj[0][2]] if jj[0][iax] >= 0 else NAN
+            f1 = self.cy_values[jj[1][0], jj[1][1], jj[1][2]]
+            f2 = self.cy_values[jj[2][0], jj[2][1], jj[2][2]] if jj[2][iax] < npts else NAN
+            if 0 < i < npts - 1:
+                gg[iax] = (f2 - f0) / (2 * scale * h)
+            elif spherical and npts > 2 and i == 0:
+                gg[iax] = (-f2 + 4*f1 - 3*f0) / (2 * scale * h)
+            elif spherical and npts > 2:
+                gg[iax] = (f0 - 4*f1 + 3*f2) / (2 * scale * h)
+            elif i == 0:
+                gg[iax] = (f1 - f0) / h
+            else:
+                gg[iax] = (f2 - f1) / h
+
+
+    cdef void _gradient_value(
+        ScalarField3D self,
+        constants.REAL_t x1,
+        constants.REAL_t x2,
+        constants.REAL_t x3,
+        bint spherical,
+        constants.REAL_t* ff
+    ) noexcept nogil:
+        # Interpolate the gradient at (x1, x2, x3) from the gradients
+        # at the corners of its cell, computed on the fly with
+        # _node_gradient rather than taken from self.gradient. NaN
+        # outside the grid.
+        cdef constants.REAL_t[3]       delta
+        cdef constants.REAL_t[2][2][2][3] corner
+        cdef constants.REAL_t          f00, f10, f01, f11, f0, f1
+        cdef Py_ssize_t[3][2]          ii
+        cdef Py_ssize_t[3]             idx
+        cdef Py_ssize_t                i, j, k, iax
+
+        if not self._locate(x1, x2, x3, ii, delta):
+            for iax in range(3):
+                ff[iax] = NAN
+            return
+        for i in range(2):
+            for j in range(2):
+                for k in range(2):
+                    idx[0], idx[1], idx[2] = ii[0][i], ii[1][j], ii[2][k]
+                    self._node_gradient(idx, spherical, corner[i][j][k])
+        for iax in range(3):
+            f00     = corner[0][0][0][iax] + (corner[1][0][0][iax] - corner[0][0][0][iax]) * delta[0]
+            f10     = corner[0][1][0][iax] + (corner[1][1][0][iax] - corner[0][1][0][iax]) * delta[0]
+            f01     = corner[0][0][1][iax] + (corner[1][0][1][iax] - corner[0][0][1][iax]) * delta[0]
+            f11     = corner[0][1][1][iax] + (corner[1][1][1][iax] - corner[0][1][1][iax]) * delta[0]
+            f0      = f00  + (f10  - f00)  * delta[1]
+            f1      = f01  + (f11  - f01)  * delta[1]
+            ff[iax] = f0   + (f1   - f0)   * delta[2]
+
+
     cpdef VectorField3D _gradient_of_cartesian(ScalarField3D self):
         """
         The gradient of a field represented on a Cartesian grid.
@@ -565,9 +902,9 @@ cdef class ScalarField3D(Field3D):
             # Second-order forward difference evaluated along the lower edge
             g0_lower = (
                 (
-                        self.values[2]
-                    - 4*self.values[1]
-                    + 3*self.values[0]
+                      - self.values[2]
+                    + 4*self.values[1]
+                    - 3*self.values[0]
                 ) / (2*d0)
             ).reshape(1, n1, n2)
             # Second order central difference evaluated in the interior
@@ -588,9 +925,9 @@ cdef class ScalarField3D(Field3D):
             # Second-order forward difference evaluated along the lower edge
             g1_lower = (
                 (
-                        self.values[:,2]
-                    - 4*self.values[:,1]
-                    + 3*self.values[:,0]
+                      - self.values[:,2]
+                    + 4*self.values[:,1]
+                    - 3*self.values[:,0]
                 ) / (2*grid[:,0,:,0]*d1)
             ).reshape(n0, 1, n2)
             # Second order central difference evaluated in the interior
@@ -614,9 +951,9 @@ cdef class ScalarField3D(Field3D):
             # Second-order forward difference evaluated along the lower edge
             g2_lower = (
                   (
-                        self.values[:,:,2]
-                    - 4*self.values[:,:,1]
-                    + 3*self.values[:,:,0]
+                      - self.values[:,:,2]
+                    + 4*self.values[:,:,1]
+                    - 3*self.values[:,:,0]
                 ) / (2*grid[:,:,0,0]*np.sin(grid[:,:,0,1])*d2)
             ).reshape(n0, n1, 1)
 
@@ -674,6 +1011,51 @@ cdef class VectorField3D(Field3D):
         self.cy_values = np.asarray(value)
 
 
+    cpdef np.ndarray[constants.REAL_t, ndim=2] resample(VectorField3D self, constants.REAL_t[:,:] points, constants.REAL_t null=np.nan):
+        """
+        resample(self, points, null=numpy.nan)
+
+        Resample the field at an arbitrary set of points using
+        trilinear interpolation, e.g. to sample the gradient of a
+        traveltime field at many points at once.
+
+        The GIL is released during interpolation, and large batches of
+        points are spread over OpenMP threads if PyKonal was built with
+        OpenMP support.
+
+        :param points: Points at which to resample the field.
+        :type points: numpy.ndarray(shape=(N,3), dtype=numpy.float)
+        :param null: Default (null) value to return for points lying
+                     outside the interpolation domain.
+        :type null: float
+        :return: Resampled field values.
+        :rtype: numpy.ndarray(shape=(N,3), dtype=numpy.float)
+        """
+        cdef Py_ssize_t              idx
+        cdef constants.REAL_t[:,::1] resampled
+
+        if points.shape[1] != 3:
+            raise (ValueError("points must have shape (N, 3)."))
+        self.values # Allocate the values if they are not set yet.
+        resampled = np.empty((points.shape[0], 3), dtype=constants.DTYPE_REAL)
+
+        with nogil:
+            if points.shape[0] < MIN_PARALLEL_POINTS:
+                for idx in range(points.shape[0]):
+                    self._value(
+                        points[idx, 0], points[idx, 1], points[idx, 2], null,
+                        &resampled[idx, 0]
+                    )
+            else:
+                for idx in prange(points.shape[0], schedule="static"):
+                    self._value(
+                        points[idx, 0], points[idx, 1], points[idx, 2], null,
+                        &resampled[idx, 0]
+                    )
+
+        return (np.asarray(resampled))
+
+
     cpdef np.ndarray[constants.REAL_t, ndim=1] value(VectorField3D self, constants.REAL_t[:] point):
         """
         value(self, point)
@@ -683,40 +1065,37 @@ cdef class VectorField3D(Field3D):
         :param point: Coordinates of the point at which to interpolate
                       the field.
         :type point: numpy.ndarray(shape=(3,), dtype=numpy.float)
-        :return: Value of the field at *point*.
+        :return: Value of the field at *point*, or NaN if *point*
+                 lies outside the interpolation domain.
         :rtype: numpy.ndarray(shape=(3,), dtype=numpy.float)
         """
-        cdef constants.REAL_t[3]         ff
-        cdef constants.REAL_t[3]         delta, idx
+        cdef constants.REAL_t[3] ff
+
+        self.values # Allocate the values if they are not set yet.
+        self._value(point[0], point[1], point[2], np.nan, ff)
+        return (np.asarray(ff))
+
+
+    @cython.initializedcheck(False)
+    cdef void _value(
+        VectorField3D self,
+        constants.REAL_t x1,
+        constants.REAL_t x2,
+        constants.REAL_t x3,
+        constants.REAL_t null,
+        constants.REAL_t* ff
+    ) noexcept nogil:
+        cdef constants.REAL_t[3]         delta
         cdef constants.REAL_t            f000, f100, f110, f101, f111, f010, f011, f001
         cdef constants.REAL_t            f00, f10, f01, f11
         cdef constants.REAL_t            f0, f1
-        cdef constants.REAL_t            f
         cdef Py_ssize_t[3][2]            ii
-        cdef Py_ssize_t                  i1, i2, i3, iax, di1, di2, di3
+        cdef Py_ssize_t                  iax
 
-        for iax in range(3):
-            #if (
-            #    (
-            #        point[iax] < self.min_coords[iax]
-            #        or point[iax] > self.max_coords[iax]
-            #    )
-            #    and not self.is_periodic[iax]
-            #    and not self._iax_isnull[iax]
-            #):
-            #    raise(
-            #        OutOfBoundsError(
-            #            f"Point outside of interpolation domain requested: ({point[0]}, {point[1]}, {point[2]})"
-            #        )
-            #    )
-            idx[iax]   = (point[iax] - self.min_coords[iax]) / self.node_intervals[iax]
-            if self.iax_isnull[iax]:
-                ii[iax][0] = 0
-                ii[iax][1] = 0
-            else:
-                ii[iax][0]  = <Py_ssize_t>idx[iax]
-                ii[iax][1]  = <Py_ssize_t>(ii[iax][0]+1) % self.npts[iax]
-            delta[iax] = idx[iax] % 1
+        if not self._locate(x1, x2, x3, ii, delta):
+            for iax in range(3):
+                ff[iax] = null
+            return
 
         for iax in range(3):
             f000    = self.cy_values[ii[0][0], ii[1][0], ii[2][0], iax]
@@ -733,9 +1112,168 @@ cdef class VectorField3D(Field3D):
             f11     = f011 + (f111 - f011) * delta[0]
             f0      = f00  + (f10  - f00)  * delta[1]
             f1      = f01  + (f11  - f01)  * delta[1]
-            f       = f0   + (f1   - f0)   * delta[2]
-            ff[iax] = f
-        return (np.asarray(ff))
+            ff[iax] = f0   + (f1   - f0)   * delta[2]
+
+
+cdef void _clamp(Field3D field, constants.REAL_t* point) noexcept nogil:
+    # Move *point* onto the grid along each bounded axis, so rays slide
+    # along the edges of the grid rather than stepping off it.
+    cdef Py_ssize_t iax
+
+    for iax in range(3):
+        if not field.cy_iax_isperiodic[iax] and not field.cy_iax_isnull[iax]:
+            point[iax] = min(
+                max(point[iax], field.cy_min_coords[iax]),
+                field.cy_max_coords[iax]
+            )
+
+
+cdef constants.REAL_t _descent(
+    ScalarField3D field,
+    VectorField3D grad,
+    constants.REAL_t* point,
+    bint spherical,
+    constants.REAL_t* direction
+) noexcept nogil:
+    # Direction of steepest descent at *point*, as the rate of change
+    # of each coordinate per unit distance, from the gradient *grad*
+    # of *field* or, if *grad* is None, from the field's values.
+    # Returns the magnitude of the gradient, or 0 where the direction
+    # is undefined.
+    cdef constants.REAL_t norm
+    cdef Py_ssize_t       iax
+
+    if grad is None:
+        field._gradient_value(point[0], point[1], point[2], spherical, direction)
+    else:
+        grad._value(point[0], point[1], point[2], NAN, direction)
+    norm = sqrt(direction[0]**2 + direction[1]**2 + direction[2]**2)
+    if not norm > 0:
+        return (0)
+    for iax in range(3):
+        direction[iax] /= -norm
+    if spherical:
+        direction[1] /= point[0]
+        direction[2] /= point[0] * sin(point[1])
+    return (norm)
+
+
+cdef constants.REAL_t _ray_step(
+    ScalarField3D field,
+    VectorField3D grad,
+    constants.REAL_t* point,
+    constants.REAL_t h,
+    int method,
+    bint spherical,
+    constants.REAL_t* out
+) noexcept nogil:
+    # One step of size *h* down the traveltime field from *point*.
+    # Returns the magnitude of the gradient at *point*, or 0 if the
+    # step is undefined.
+    cdef constants.REAL_t[3] k1, k2, k3, k4, tmp
+    cdef constants.REAL_t    slope
+    cdef Py_ssize_t          iax
+
+    slope = _descent(field, grad, point, spherical, k1)
+    if slope == 0:
+        return (0)
+    if method == EULER:
+        for iax in range(3):
+            out[iax] = point[iax] + h * k1[iax]
+        _clamp(field, out)
+        return (slope)
+
+    for iax in range(3):
+        tmp[iax] = point[iax] + h / 2 * k1[iax]
+    _clamp(field, tmp)
+    if _descent(field, grad, tmp, spherical, k2) == 0:
+        return (0)
+    if method == RK2:
+        for iax in range(3):
+            out[iax] = point[iax] + h * k2[iax]
+        _clamp(field, out)
+        return (slope)
+
+    for iax in range(3):
+        tmp[iax] = point[iax] + h / 2 * k2[iax]
+    _clamp(field, tmp)
+    if _descent(field, grad, tmp, spherical, k3) == 0:
+        return (0)
+    for iax in range(3):
+        tmp[iax] = point[iax] + h * k3[iax]
+    _clamp(field, tmp)
+    if _descent(field, grad, tmp, spherical, k4) == 0:
+        return (0)
+    for iax in range(3):
+        tmp[iax] = (k1[iax] + 2 * k2[iax] + 2 * k3[iax] + k4[iax]) / 6
+        out[iax] = point[iax] + h * tmp[iax]
+    _clamp(field, out)
+    # The stages cancel out where the ray bends sharply, e.g. at the
+    # source; refuse steps much shorter than *h* there.
+    if spherical:
+        tmp[1] *= point[0]
+        tmp[2] *= point[0] * sin(point[1])
+    if tmp[0]**2 + tmp[1]**2 + tmp[2]**2 < 0.25:
+        return (0)
+    return (slope)
+
+
+cdef Py_ssize_t _trace_ray(
+    ScalarField3D field,
+    VectorField3D grad,
+    constants.REAL_t* ray,
+    Py_ssize_t max_points,
+    constants.REAL_t step_size,
+    int method,
+    bint spherical
+) noexcept nogil:
+    # Trace the ray ending at ray[0:3] into the buffer *ray* of
+    # *max_points* points, in forward-time order, and return its
+    # number of points.
+    cdef constants.REAL_t    h, slope, value, next_value, swap
+    cdef constants.REAL_t[3] point
+    cdef Py_ssize_t          i, iax, n, n_accepted
+
+    value = field._value(ray[0], ray[1], ray[2], NAN)
+    if isnan(value):
+        for iax in range(3):
+            ray[iax] = NAN
+        return (0)
+
+    n = 1
+    n_accepted = 0
+    h = step_size
+    while n < max_points:
+        slope = _ray_step(field, grad, &ray[3 * (n-1)], h, method, spherical, point)
+        if slope > 0:
+            next_value = field._value(point[0], point[1], point[2], NAN)
+            # Accept the step only if it decreases the traveltime by
+            # a fair share of the decrease expected from the gradient,
+            # so rays do not oscillate about the source.
+            if value - next_value >= SUFFICIENT_DECREASE * h * slope:
+                for iax in range(3):
+                    ray[3 * n + iax] = point[iax]
+                value = next_value
+                n += 1
+                n_accepted += 1
+                # Regrow the step after a kink in the ray, but not
+                # while closing in on the source, where steps
+                # alternate between accepted and rejected.
+                if n_accepted == STEPS_BEFORE_REGROWTH and h < step_size:
+                    h *= 2
+                    n_accepted = 0
+                continue
+        n_accepted = 0
+        h /= 2
+        if h < step_size / (1 << MAX_STEP_HALVINGS):
+            break
+
+    for i in range(n // 2):
+        for iax in range(3):
+            swap = ray[3 * i + iax]
+            ray[3 * i + iax] = ray[3 * (n-1-i) + iax]
+            ray[3 * (n-1-i) + iax] = swap
+    return (n)
 
 
 cpdef Field3D load(str path):
@@ -1,17 +1,67 @@
 # distutils: language=c++
 
 from libcpp.vector cimport vector as cpp_vector
+cimport numpy as np
+
 from . cimport constants
 
 cdef struct Index3D:
     Py_ssize_t i1, i2, i3
 
+cdef struct Entry:
+    constants.REAL_t value
+    np.int32_t       index
+
+# Running totals of heap operations, for the solver statistics.
+cdef struct HeapCounters:
+    long long pops, pushes, updates, sift_steps
+
 cdef class Heap(object):
+    cdef HeapCounters            cy_counters
     cdef cpp_vector[Index3D]     cy_keys
     cdef constants.REAL_t[:,:,:] cy_values
     cdef Py_ssize_t[:,:,:]       cy_heap_index
 
     cpdef (Py_ssize_t, Py_ssize_t, Py_ssize_t) pop(Heap self)
     cpdef constants.BOOL_t push(Heap self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3)
+    cpdef constants.BOOL_t push_many(Heap self, Py_ssize_t[:,:] indices)
     cpdef constants.BOOL_t sift_down(Heap self, Py_ssize_t j_start, Py_ssize_t j)
     cpdef constants.BOOL_t sift_up(Heap self, Py_ssize_t j_start)
+    cpdef constants.BOOL_t update(Heap self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3)
+    cdef Index3D _pop(Heap self) noexcept nogil
+    cdef void _push(Heap self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3) noexcept nogil
+    cdef void _push_many(Heap self, Py_ssize_t[:,:] indices) noexcept nogil
+    cdef void _sift_down(Heap self, Py_ssize_t j_start, Py_ssize_t j) noexcept nogil
+    cdef void _sift_up(Heap self, Py_ssize_t j_start) noexcept nogil
+    cdef Py_ssize_t _size(Heap self) noexcept nogil
+    cdef void _update(Heap self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3) noexcept nogil
+    cdef void _clear(Heap self) noexcept nogil
+    cdef cpp_vector[Index3D] _keys(Heap self) noexcept nogil
+
+cdef class QuaternaryHeap(Heap):
+    cdef cpp_vector[Entry]       cy_entries
+    cdef np.int32_t[:]           cy_position
+    cdef Py_ssize_t              cy_n2, cy_n3
+
+    cpdef constants.BOOL_t sift_down(QuaternaryHeap self, Py_ssize_t j_start, Py_ssize_t j)
+    cpdef constants.BOOL_t sift_up(QuaternaryHeap self, Py_ssize_t j_start)
+    cdef Index3D _unravel(QuaternaryHeap self, np.int32_t index) noexcept nogil
+    cdef void _push_many(QuaternaryHeap self, Py_ssize_t[:,:] indices) noexcept nogil
+    cdef void _sift_to_root(QuaternaryHeap self, Py_ssize_t j_start, Py_ssize_t j) noexcept nogil
+    cdef void _sift_to_leaf(QuaternaryHeap self, Py_ssize_t j) noexcept nogil
+
+cdef class BucketQueue(Heap):
+    cdef cpp_vector[cpp_vector[Entry]] cy_buckets
+    cdef cpp_vector[Entry]       cy_overflow
+    cdef constants.BOOL_t[:]     cy_queued
+    cdef constants.REAL_t        cy_width
+    cdef long long               cy_current, cy_last
+    cdef Py_ssize_t              cy_count, cy_n2, cy_n3
+
+    cpdef constants.BOOL_t sift_down(BucketQueue self, Py_ssize_t j_start, Py_ssize_t j)
+    cpdef constants.BOOL_t sift_up(BucketQueue self, Py_ssize_t j_start)
+    cdef Index3D _unravel(BucketQueue self, np.int32_t index) noexcept nogil
+    cdef long long _bucket(BucketQueue self, constants.REAL_t value) noexcept nogil
+    cdef void _insert(BucketQueue self, np.int32_t index, constants.REAL_t value) noexcept nogil
+    cdef void _grow(BucketQueue self, long long span) noexcept nogil
+    cdef void _push_many(BucketQueue self, Py_ssize_t[:,:] indices) noexcept nogil
@@ -1,13 +1,20 @@
 """
 A module providing heap-sort functionality.
 
-This module provides a single class (:class:`pykonal.heapq.Heap`) which
+This module provides a class (:class:`pykonal.heapq.Heap`) which
 implements a binary min-heap structure whose elements are indices
 (each having three components) sorted by an auxiliary value. Indices can
 be pushed onto and popped from the Heap and the auxiliary sort values
 can be updated on the fly, although care must be taken to resort the
 Heap so as to maintain the heap invariant when updating the underlying
 sort values.
+
+Two drop-in alternatives with the same interface are provided for the
+*Trial* set of the Fast Marching Method:
+:class:`pykonal.heapq.QuaternaryHeap`, a 4-ary heap of
+(value, linear index) pairs, and :class:`pykonal.heapq.BucketQueue`,
+an untidy priority queue that trades exact ordering for O(1) pushes
+and pops.
 """
 
 # Imports.
@@ -17,15 +24,31 @@ from . import constants
 
 
 # C Imports.
+cimport cython
 cimport numpy as np
+from cython.operator cimport dereference as deref
+from libc.math cimport floor, isfinite
+from libcpp.vector cimport vector as cpp_vector
 
 from . cimport constants
 
 
+# Largest number of buckets a BucketQueue spans on either side of its
+# current bucket; finite values further away are clamped into the last
+# one.
+cdef enum:
+    MAX_BUCKET_SPAN = 1 << 24
+
+
 cdef struct Index3D:
     Py_ssize_t i1, i2, i3
 
 
+cdef struct Entry:
+    constants.REAL_t value
+    np.int32_t       index
+
+
 cdef class Heap(object):
     """
     Binary Min-Heap structure for storing indices sorted by auxiliary
@@ -52,9 +75,10 @@ cdef class Heap(object):
         indices currently on the heap.
         """
         cdef Index3D idx
+        cdef cpp_vector[Index3D] keys = self._keys()
         output = []
-        for i in range(self.cy_keys.size()):
-            idx = self.cy_keys[i]
+        for i in range(keys.size()):
+            idx = keys[i]
             output.append((idx.i1, idx.i2, idx.i3))
         return (output)
 
@@ -64,7 +88,7 @@ cdef class Heap(object):
         """
         [*Read only*, int] Number of node indices on the heap.
         """
-        return (self.cy_keys.size())
+        return (self._size())
 
 
     @property
@@ -90,19 +114,12 @@ cdef class Heap(object):
         :return: Index of node on the heap with smallest sort value.
         :rtype: tuple(int, int, int)
         """
-        cdef Index3D last, idx_return
+        cdef Index3D idx
 
-        last = self.cy_keys.back()
-        self.cy_keys.pop_back()
-        self.cy_heap_index[last.i1, last.i2, last.i3] = -1
-        if self.cy_keys.size() > 0:
-            idx_return = self.cy_keys[0]
-            self.cy_heap_index[idx_return.i1, idx_return.i2, idx_return.i3] = -1
-            self.cy_keys[0] = last
-            self.cy_heap_index[last.i1, last.i2, last.i3] = 0
-            self.sift_up(0)
-            return ((idx_return.i1, idx_return.i2, idx_return.i3))
-        return ((last.i1, last.i2, last.i3))
+        if self._size() == 0:
+            raise (IndexError("pop from empty heap"))
+        idx = self._pop()
+        return ((idx.i1, idx.i2, idx.i3))
 
     cpdef constants.BOOL_t push(Heap self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3):
         """
@@ -122,11 +139,34 @@ cdef class Heap(object):
 
         .. todo:: Check that index is in range.
         """
-        cdef Index3D idx
-        idx.i1, idx.i2, idx.i3 = i1, i2, i3
-        self.cy_keys.push_back(idx)
-        self.cy_heap_index[idx.i1, idx.i2, idx.i3] = self.cy_keys.size()-1
-        self.sift_down(0, self.cy_keys.size()-1)
+        self._push(i1, i2, i3)
+        return (True)
+
+
+    cpdef constants.BOOL_t push_many(Heap self, Py_ssize_t[:,:] indices):
+        """
+        push_many(self, indices)
+
+        Push many indices onto the heap at once, maintaining the heap
+        invariant. When the new indices outnumber those already on the
+        heap, the heap is rebuilt bottom-up in linear time instead of
+        sifting each index in turn.
+
+        :param indices: Indices to push, none of which may already be
+                        on the heap.
+        :type indices: numpy.ndarray(shape=(N,3), dtype=numpy.intp)
+        :return: True upon successful completion.
+        :rtype: bool
+        """
+        cdef Py_ssize_t i, j
+
+        if indices.shape[1] != 3:
+            raise (ValueError("indices must have shape (N, 3)."))
+        for i in range(indices.shape[0]):
+            for j in range(3):
+                if not 0 <= indices[i, j] < self.cy_values.shape[j]:
+                    raise (IndexError("heap index out of range"))
+        self._push_many(indices)
         return (True)
 
 
@@ -146,6 +186,97 @@ cdef class Heap(object):
         :return: Returns True upon successful execution.
         :rtype: bool
         """
+        self._sift_down(j_start, j)
+        return (True)
+
+
+    cpdef constants.BOOL_t sift_up(Heap self, Py_ssize_t j_start):
+        """
+        sift_up(self, j_start)
+
+        Sift the heap element at *j_start* up the heap (away from the
+        root), until finding a place that it fits.
+
+        :param j_start: Heap index of element to sift away from root.
+        :type j_start: int
+        :return: Returns True upon successful execution.
+        :rtype: bool
+        """
+        self._sift_up(j_start)
+        return (True)
+
+
+    cpdef constants.BOOL_t update(Heap self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3):
+        """
+        update(self, i1, i2, i3)
+
+        Restore the heap invariant after decreasing the sort value of
+        an index already on the heap.
+
+        :param i1: First component of index.
+        :type i1: int
+        :param i2: Second component of index.
+        :type i2: int
+        :param i3: Third component of index.
+        :type i3: int
+        :return: Returns True upon successful execution.
+        :rtype: bool
+        """
+        self._update(i1, i2, i3)
+        return (True)
+
+
+    # The methods below implement the heap operations without the GIL
+    # so that they can be used from inside nogil solver kernels. The
+    # cpdef methods above are thin wrappers around them.
+
+    cdef Index3D _pop(Heap self) noexcept nogil:
+        cdef Index3D last, idx_return
+
+        self.cy_counters.pops += 1
+        last = self.cy_keys.back()
+        self.cy_keys.pop_back()
+        self.cy_heap_index[last.i1, last.i2, last.i3] = -1
+        if self.cy_keys.size() > 0:
+            idx_return = self.cy_keys[0]
+            self.cy_heap_index[idx_return.i1, idx_return.i2, idx_return.i3] = -1
+            self.cy_keys[0] = last
+            self.cy_heap_index[last.i1, last.i2, last.i3] = 0
+            self._sift_up(0)
+            return (idx_return)
+        return (last)
+
+
+    cdef void _push(Heap self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3) noexcept nogil:
+        cdef Index3D idx
+
+        self.cy_counters.pushes += 1
+        idx.i1, idx.i2, idx.i3 = i1, i2, i3
+        self.cy_keys.push_back(idx)
+        self.cy_heap_index[idx.i1, idx.i2, idx.i3] = self.cy_keys.size()-1
+        self._sift_down(0, self.cy_keys.size()-1)
+
+
+    cdef void _push_many(Heap self, Py_ssize_t[:,:] indices) noexcept nogil:
+        cdef Py_ssize_t i, j
+        cdef Index3D    idx
+
+        if indices.shape[0] < <Py_ssize_t> self.cy_keys.size():
+            for i in range(indices.shape[0]):
+                self._push(indices[i, 0], indices[i, 1], indices[i, 2])
+            return
+        self.cy_counters.pushes += indices.shape[0]
+        for i in range(indices.shape[0]):
+            idx.i1, idx.i2, idx.i3 = indices[i, 0], indices[i, 1], indices[i, 2]
+            self.cy_keys.push_back(idx)
+            self.cy_heap_index[idx.i1, idx.i2, idx.i3] = self.cy_keys.size()-1
+        # Floyd's heap construction: sift every parent towards the
+        # leaves, from the last one back to the root.
+        for j in range((<Py_ssize_t> self.cy_keys.size() >> 1) - 1, -1, -1):
+            self._sift_up(j)
+
+
+    cdef void _sift_down(Heap self, Py_ssize_t j_start, Py_ssize_t j) noexcept nogil:
         cdef Py_ssize_t j_parent
         cdef Index3D    idx_new, idx_parent
 
@@ -158,26 +289,15 @@ cdef class Heap(object):
             if self.cy_values[idx_new.i1, idx_new.i2, idx_new.i3] < self.cy_values[idx_parent.i1, idx_parent.i2, idx_parent.i3]:
                 self.cy_keys[j] = idx_parent
                 self.cy_heap_index[idx_parent.i1, idx_parent.i2, idx_parent.i3] = j
+                self.cy_counters.sift_steps += 1
                 j = j_parent
                 continue
             break
         self.cy_keys[j] = idx_new
         self.cy_heap_index[idx_new.i1, idx_new.i2, idx_new.i3] = j
-        return (True)
-
-
-    cpdef constants.BOOL_t sift_up(Heap self, Py_ssize_t j_start):
-        """
-        sift_up(self, j_start)
 
-        Sift the heap element at *j_start* up the heap (away from the
-        root), until finding a place that it fits.
 
-        :param j_start: Heap index of element to sift away from root.
-        :type j_start: int
-        :return: Returns True upon successful execution.
-        :rtype: bool
-        """
+    cdef void _sift_up(Heap self, Py_ssize_t j_start) noexcept nogil:
         cdef Py_ssize_t j, j_child, j_end, j_right
         cdef Index3D idx_child, idx_right, idx_new
 
@@ -189,17 +309,520 @@ cdef class Heap(object):
         while j_child < j_end:
             # Set childpos to index of smaller child.
             j_right = j_child + 1
-            idx_child, idx_right = self.cy_keys[j_child], self.cy_keys[j_right]
-            if j_right < j_end and not self.cy_values[idx_child.i1, idx_child.i2, idx_child.i3] < self.cy_values[idx_right.i1, idx_right.i2, idx_right.i3]:
-                j_child = j_right
+            if j_right < j_end:
+                idx_child, idx_right = self.cy_keys[j_child], self.cy_keys[j_right]
+                if not self.cy_values[idx_child.i1, idx_child.i2, idx_child.i3] < self.cy_values[idx_right.i1, idx_right.i2, idx_right.i3]:
+                    j_child = j_right
             # Move the smaller child up.
             self.cy_keys[j] = self.cy_keys[j_child]
             self.cy_heap_index[self.cy_keys[j_child].i1, self.cy_keys[j_child].i2, self.cy_keys[j_child].i3] = j
+            self.cy_counters.sift_steps += 1
             j = j_child
             j_child = 2 * j + 1
         # The leaf at pos is empty now.  Put newitem there, and bubble it up
         # to its final resting place (by sifting its parents down).
         self.cy_keys[j] = idx_new
         self.cy_heap_index[idx_new.i1, idx_new.i2, idx_new.i3] = j
-        self.sift_down(j_start, j)
+        self._sift_down(j_start, j)
+
+
+    # The solver kernels only use the methods below (and _pop and
+    # _push), which subclasses override to provide other *Trial* set
+    # structures.
+
+    cdef Py_ssize_t _size(Heap self) noexcept nogil:
+        return (self.cy_keys.size())
+
+
+    cdef void _update(Heap self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3) noexcept nogil:
+        self.cy_counters.updates += 1
+        self._sift_down(0, self.cy_heap_index[i1, i2, i3])
+
+
+    cdef void _clear(Heap self) noexcept nogil:
+        cdef Py_ssize_t i
+        cdef Index3D    idx
+
+        for i in range(self.cy_keys.size()):
+            idx = self.cy_keys[i]
+            self.cy_heap_index[idx.i1, idx.i2, idx.i3] = -1
+        self.cy_keys.clear()
+
+
+    cdef cpp_vector[Index3D] _keys(Heap self) noexcept nogil:
+        # In heap order, so pushing them back in this order after
+        # _clear() rebuilds an identical heap.
+        return (self.cy_keys)
+
+
+
+cdef class QuaternaryHeap(Heap):
+    """
+    4-ary Min-Heap structure for storing indices sorted by auxiliary
+    values.
+
+    Heap entries are (value, linear index) pairs, so sifting compares
+    the cached sort values stored contiguously in the heap instead of
+    gathering them from the 3D array of values, and the tree is half
+    as deep as a binary heap. Heap positions are tracked in a flat
+    int32 array. The cached value of an entry is refreshed by
+    :meth:`update` (or :meth:`sift_down`), which must be called after
+    decreasing the sort value of an index on the heap.
+    """
+    def __init__(self, values):
+        npts = np.asarray(values).shape
+        if np.prod(npts) > np.iinfo(np.int32).max:
+            raise (ValueError("QuaternaryHeap supports at most 2**31-1 nodes."))
+        self.cy_values   = values
+        self.cy_n2       = npts[1]
+        self.cy_n3       = npts[2]
+        self.cy_position = np.full(np.prod(npts), fill_value=-1, dtype=np.int32)
+
+
+    @property
+    def heap_index(self):
+        """
+        [*Read only*, numpy.ndarray(shape=(N0,N1,N2), dtype=numpy.int)]
+        Array of indices indicating the heap position of each node.
+        Index -1 indicates that a node is not on the heap.
+        """
+        return (
+            np.asarray(self.cy_position, dtype=constants.DTYPE_INT).reshape(
+                np.asarray(self.cy_values).shape
+            )
+        )
+
+
+    cpdef constants.BOOL_t sift_down(QuaternaryHeap self, Py_ssize_t j_start, Py_ssize_t j):
+        """
+        sift_down(self, j_start, j)
+
+        Refresh the cached sort value of the heap element at *j* and
+        sift it towards the root, without going past *j_start*.
+
+        :param j_start: Heap index creating a barrier beyond which heap
+                        element *j* cannot be sifted.
+        :type j_start: int
+        :param j: Heap index of element to sift towards root.
+        :type j: int
+        :return: Returns True upon successful execution.
+        :rtype: bool
+        """
+        cdef Index3D idx
+
+        idx = self._unravel(self.cy_entries[j].index)
+        self.cy_entries[j].value = self.cy_values[idx.i1, idx.i2, idx.i3]
+        self._sift_to_root(j_start, j)
         return (True)
+
+
+    cpdef constants.BOOL_t sift_up(QuaternaryHeap self, Py_ssize_t j_start):
+        """
+        sift_up(self, j_start)
+
+        Refresh the cached sort value of the heap element at *j_start*
+        and sift it away from the root, until finding a place that it
+        fits.
+
+        :param j_start: Heap index of element to sift away from root.
+        :type j_start: int
+        :return: Returns True upon successful execution.
+        :rtype: bool
+        """
+        cdef Index3D idx
+
+        idx = self._unravel(self.cy_entries[j_start].index)
+        self.cy_entries[j_start].value = self.cy_values[idx.i1, idx.i2, idx.i3]
+        self._sift_to_leaf(j_start)
+        return (True)
+
+
+    @cython.cdivision(True)
+    cdef Index3D _unravel(QuaternaryHeap self, np.int32_t index) noexcept nogil:
+        cdef Index3D idx
+
+        idx.i3 = index % self.cy_n3
+        index = index / self.cy_n3
+        idx.i2 = index % self.cy_n2
+        idx.i1 = index / self.cy_n2
+        return (idx)
+
+
+    cdef Index3D _pop(QuaternaryHeap self) noexcept nogil:
+        cdef Entry root
+
+        self.cy_counters.pops += 1
+        root = self.cy_entries[0]
+        self.cy_position[root.index] = -1
+        if self.cy_entries.size() > 1:
+            self.cy_entries[0] = self.cy_entries.back()
+            self.cy_entries.pop_back()
+            self._sift_to_leaf(0)
+        else:
+            self.cy_entries.pop_back()
+        return (self._unravel(root.index))
+
+
+    cdef void _push(QuaternaryHeap self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3) noexcept nogil:
+        cdef Entry entry
+
+        self.cy_counters.pushes += 1
+        entry.index = <np.int32_t> ((i1 * self.cy_n2 + i2) * self.cy_n3 + i3)
+        entry.value = self.cy_values[i1, i2, i3]
+        self.cy_entries.push_back(entry)
+        self._sift_to_root(0, self.cy_entries.size()-1)
+
+
+    cdef void _push_many(QuaternaryHeap self, Py_ssize_t[:,:] indices) noexcept nogil:
+        cdef Py_ssize_t i, j
+        cdef Entry      entry
+
+        if indices.shape[0] < <Py_ssize_t> self.cy_entries.size():
+            for i in range(indices.shape[0]):
+                self._push(indices[i, 0], indices[i, 1], indices[i, 2])
+            return
+        self.cy_counters.pushes += indices.shape[0]
+        for i in range(indices.shape[0]):
+            entry.index = <np.int32_t> (
+                (indices[i, 0] * self.cy_n2 + indices[i, 1]) * self.cy_n3 + indices[i, 2]
+            )
+            entry.value = self.cy_values[indices[i, 0], indices[i, 1], indices[i, 2]]
+            self.cy_position[entry.index] = self.cy_entries.size()
+            self.cy_entries.push_back(entry)
+        for j in range((<Py_ssize_t> self.cy_entries.size() - 2) >> 2, -1, -1):
+            self._sift_to_leaf(j)
+
+
+    cdef void _sift_to_root(QuaternaryHeap self, Py_ssize_t j_start, Py_ssize_t j) noexcept nogil:
+        cdef Py_ssize_t j_parent
+        cdef Entry      entry
+
+        entry = self.cy_entries[j]
+        while j > j_start:
+            j_parent = (j - 1) >> 2
+            if not entry.value < self.cy_entries[j_parent].value:
+                break
+            self.cy_entries[j] = self.cy_entries[j_parent]
+            self.cy_position[self.cy_entries[j].index] = j
+            self.cy_counters.sift_steps += 1
+            j = j_parent
+        self.cy_entries[j] = entry
+        self.cy_position[entry.index] = j
+
+
+    cdef void _sift_to_leaf(QuaternaryHeap self, Py_ssize_t j) noexcept nogil:
+        cdef Py_ssize_t j_child, j_end, j_min, j_size
+        cdef Entry      entry
+
+        entry = self.cy_entries[j]
+        j_size = self.cy_entries.size()
+        while True:
+            j_min = 4 * j + 1
+            if j_min >= j_size:
+                break
+            j_end = min(j_min + 4, j_size)
+            for j_child in range(j_min + 1, j_end):
+                if self.cy_entries[j_child].value < self.cy_entries[j_min].value:
+                    j_min = j_child
+            if not self.cy_entries[j_min].value < entry.value:
+                break
+            self.cy_entries[j] = self.cy_entries[j_min]
+            self.cy_position[self.cy_entries[j].index] = j
+            self.cy_counters.sift_steps += 1
+            j = j_min
+        self.cy_entries[j] = entry
+        self.cy_position[entry.index] = j
+
+
+    cdef Py_ssize_t _size(QuaternaryHeap self) noexcept nogil:
+        return (self.cy_entries.size())
+
+
+    cdef void _update(QuaternaryHeap self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3) noexcept nogil:
+        cdef Py_ssize_t j
+
+        self.cy_counters.updates += 1
+        j = self.cy_position[(i1 * self.cy_n2 + i2) * self.cy_n3 + i3]
+        self.cy_entries[j].value = self.cy_values[i1, i2, i3]
+        self._sift_to_root(0, j)
+
+
+    cdef void _clear(QuaternaryHeap self) noexcept nogil:
+        cdef Py_ssize_t i
+
+        for i in range(self.cy_entries.size()):
+            self.cy_position[self.cy_entries[i].index] = -1
+        self.cy_entries.clear()
+
+
+    cdef cpp_vector[Index3D] _keys(QuaternaryHeap self) noexcept nogil:
+        cdef Py_ssize_t          i
+        cdef cpp_vector[Index3D] keys
+
+        keys.reserve(self.cy_entries.size())
+        for i in range(self.cy_entries.size()):
+            keys.push_back(self._unravel(self.cy_entries[i].index))
+        return (keys)
+
+
+
+cdef class BucketQueue(Heap):
+    """
+    Untidy priority queue for storing indices sorted (approximately)
+    by auxiliary values.
+
+    Indices are binned by sort value into buckets of *bucket_width*
+    kept in a circular array, and popped last-in-first-out from the
+    lowest non-empty bucket, so pushes, pops and updates cost O(1)
+    but indices within one bucket come out in arbitrary order.
+    The circular array grows as needed to span the range of values
+    on the queue. Non-finite values are kept apart and popped after
+    all the finite ones.
+    Decreasing the sort value of an index re-inserts it (see
+    :meth:`update`); the superseded entry is discarded when reached.
+
+    Used as the *Trial* set of the Fast Marching Method, this gives
+    the untidy variant of the method, whose traveltime errors grow
+    with *bucket_width* relative to the traveltime increment between
+    neighbouring nodes.
+    """
+    def __init__(self, values, bucket_width):
+        npts = np.asarray(values).shape
+        if np.prod(npts) > np.iinfo(np.int32).max:
+            raise (ValueError("BucketQueue supports at most 2**31-1 nodes."))
+        if not bucket_width > 0:
+            raise (ValueError("bucket_width must be positive."))
+        self.cy_values  = values
+        self.cy_n2      = npts[1]
+        self.cy_n3      = npts[2]
+        self.cy_queued  = np.zeros(np.prod(npts), dtype=constants.DTYPE_BOOL)
+        self.cy_width   = bucket_width
+        self.cy_current = 0
+        self.cy_last    = 0
+        self.cy_count   = 0
+        self.cy_buckets.resize(64)
+
+
+    @property
+    def bucket_width(self):
+        """
+        [*Read only*, float] Range of sort values binned together.
+        """
+        return (self.cy_width)
+
+
+    @property
+    def heap_index(self):
+        raise (AttributeError("BucketQueue does not track heap positions."))
+
+
+    cpdef constants.BOOL_t sift_down(BucketQueue self, Py_ssize_t j_start, Py_ssize_t j):
+        """
+        Not supported; use :meth:`update`.
+        """
+        raise (NotImplementedError("BucketQueue has no heap positions; use update()."))
+
+
+    cpdef constants.BOOL_t sift_up(BucketQueue self, Py_ssize_t j_start):
+        """
+        Not supported; use :meth:`update`.
+        """
+        raise (NotImplementedError("BucketQueue has no heap positions; use update()."))
+
+
+    @cython.cdivision(True)
+    cdef Index3D _unravel(BucketQueue self, np.int32_t index) noexcept nogil:
+        cdef Index3D idx
+
+        idx.i3 = index % self.cy_n3
+        index = index / self.cy_n3
+        idx.i2 = index % self.cy_n2
+        idx.i1 = index / self.cy_n2
+        return (idx)
+
+
+    @cython.cdivision(True)
+    cdef long long _bucket(BucketQueue self, constants.REAL_t value) noexcept nogil:
+        cdef constants.REAL_t offset
+
+        offset = floor(value / self.cy_width) - self.cy_current
+        if offset <= -MAX_BUCKET_SPAN:
+            return (self.cy_current - MAX_BUCKET_SPAN + 1)
+        if not offset < MAX_BUCKET_SPAN:
+            return (self.cy_current + MAX_BUCKET_SPAN - 1)
+        return (self.cy_current + <long long> offset)
+
+
+    cdef void _insert(BucketQueue self, np.int32_t index, constants.REAL_t value) noexcept nogil:
+        cdef long long bucket
+        cdef Entry     entry
+
+        entry.index = index
+        entry.value = value
+        if not isfinite(value):
+            # Binning inf or NaN would stretch the ring to
+            # MAX_BUCKET_SPAN buckets.
+            self.cy_overflow.push_back(entry)
+            return
+        bucket = self._bucket(value)
+        if bucket > self.cy_last:
+            self.cy_last = bucket
+        if bucket < self.cy_current:
+            # Pop the new entry next rather than out of order.
+            self.cy_current = bucket
+        if self.cy_last - self.cy_current >= <long long> self.cy_buckets.size():
+            self._grow(self.cy_last - self.cy_current + 1)
+        self.cy_buckets[bucket & (self.cy_buckets.size() - 1)].push_back(entry)
+
+
+    cdef void _grow(BucketQueue self, long long span) noexcept nogil:
+        # Re-bin the live entries into a ring of at least *span*
+        # buckets, dropping superseded ones.
+        cdef Py_ssize_t                    i, j, n
+        cdef Entry                         entry
+        cdef Index3D                       idx
+        cdef cpp_vector[cpp_vector[Entry]] buckets
+
+        n = self.cy_buckets.size()
+        while n < span:
+            n *= 2
+        buckets.resize(n)
+        for i in range(self.cy_buckets.size()):
+            for j in range(self.cy_buckets[i].size()):
+                entry = self.cy_buckets[i][j]
+                idx = self._unravel(entry.index)
+                if (
+                    self.cy_queued[entry.index]
+                    and entry.value == self.cy_values[idx.i1, idx.i2, idx.i3]
+                ):
+                    buckets[self._bucket(entry.value) & (n - 1)].push_back(entry)
+        self.cy_buckets.swap(buckets)
+
+
+    cdef Index3D _pop(BucketQueue self) noexcept nogil:
+        cdef cpp_vector[Entry]* bucket
+        cdef Entry              entry
+        cdef Index3D            idx
+
+        while True:
+            bucket = &self.cy_buckets[self.cy_current & (self.cy_buckets.size() - 1)]
+            while deref(bucket).size() > 0:
+                entry = deref(bucket).back()
+                deref(bucket).pop_back()
+                idx = self._unravel(entry.index)
+                if (
+                    self.cy_queued[entry.index]
+                    and entry.value == self.cy_values[idx.i1, idx.i2, idx.i3]
+                ):
+                    self.cy_queued[entry.index] = False
+                    self.cy_count -= 1
+                    self.cy_counters.pops += 1
+                    return (idx)
+                # Skipping superseded entries and empty buckets is
+                # the sifting of an untidy queue.
+                self.cy_counters.sift_steps += 1
+            if self.cy_current >= self.cy_last:
+                break
+            self.cy_counters.sift_steps += 1
+            self.cy_current += 1
+
+        # The ring is empty, so pop the non-finite values.
+        while True:
+            entry = self.cy_overflow.back()
+            self.cy_overflow.pop_back()
+            idx = self._unravel(entry.index)
+            if (
+                self.cy_queued[entry.index]
+                and not isfinite(self.cy_values[idx.i1, idx.i2, idx.i3])
+            ):
+                self.cy_queued[entry.index] = False
+                self.cy_count -= 1
+                self.cy_counters.pops += 1
+                return (idx)
+            self.cy_counters.sift_steps += 1
+
+
+    @cython.cdivision(True)
+    cdef void _push(BucketQueue self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3) noexcept nogil:
+        cdef np.int32_t       index
+        cdef constants.REAL_t value
+
+        index = <np.int32_t> ((i1 * self.cy_n2 + i2) * self.cy_n3 + i3)
+        value = self.cy_values[i1, i2, i3]
+        if (
+            (
+                self.cy_count == 0
+                or self.cy_current == self.cy_last
+                and self.cy_buckets[self.cy_current & (self.cy_buckets.size() - 1)].size() == 0
+            )
+            and -1e15 < value / self.cy_width < 1e15
+        ):
+            # Restart the empty ring (non-finite values aside) at the
+            # first value pushed.
+            self.cy_current = <long long> floor(value / self.cy_width)
+            self.cy_last = self.cy_current
+        self.cy_queued[index] = True
+        self.cy_count += 1
+        self.cy_counters.pushes += 1
+        self._insert(index, value)
+
+
+    cdef void _push_many(BucketQueue self, Py_ssize_t[:,:] indices) noexcept nogil:
+        cdef Py_ssize_t i
+
+        # Pushes are already O(1), so there is nothing to batch.
+        for i in range(indices.shape[0]):
+            self._push(indices[i, 0], indices[i, 1], indices[i, 2])
+
+
+    cdef Py_ssize_t _size(BucketQueue self) noexcept nogil:
+        return (self.cy_count)
+
+
+    cdef void _update(BucketQueue self, Py_ssize_t i1, Py_ssize_t i2, Py_ssize_t i3) noexcept nogil:
+        self.cy_counters.updates += 1
+        self._insert(
+            <np.int32_t> ((i1 * self.cy_n2 + i2) * self.cy_n3 + i3),
+            self.cy_values[i1, i2, i3]
+        )
+
+
+    cdef void _clear(BucketQueue self) noexcept nogil:
+        cdef Py_ssize_t i, j
+
+        for i in range(self.cy_buckets.size()):
+            for j in range(self.cy_buckets[i].size()):
+                self.cy_queued[self.cy_buckets[i][j].index] = False
+            self.cy_buckets[i].clear()
+        for i in range(self.cy_overflow.size()):
+            self.cy_queued[self.cy_overflow[i].index] = False
+        self.cy_overflow.clear()
+        self.cy_current = 0
+        self.cy_last = 0
+        self.cy_count = 0
+
+
+    cdef cpp_vector[Index3D] _keys(BucketQueue self) noexcept nogil:
+        cdef Py_ssize_t          i, j
+        cdef Entry               entry
+        cdef Index3D             idx
+        cdef cpp_vector[Index3D] keys
+
+        for i in range(self.cy_buckets.size()):
+            for j in range(self.cy_buckets[i].size()):
+                entry = self.cy_buckets[i][j]
+                idx = self._unravel(entry.index)
+                if (
+                    self.cy_queued[entry.index]
+                    and entry.value == self.cy_values[idx.i1, idx.i2, idx.i3]
+                ):
+                    keys.push_back(idx)
+        for i in range(self.cy_overflow.size()):
+            entry = self.cy_overflow[i]
+            idx = self._unravel(entry.index)
+            if (
+                self.cy_queued[entry.index]
+                and not isfinite(self.cy_values[idx.i1, idx.i2, idx.i3])
+            ):
+                keys.push_back(idx)
+        return (keys)
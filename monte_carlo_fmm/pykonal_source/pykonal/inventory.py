@@ -1,29 +1,79 @@
 import h5py
+import json
 import numpy as np
 import os
 
+from . import constants
 from . import fields
 
 
-class TraveltimeInventory(object):
+BACKENDS = ("hdf5", "npy")
+
 
-    def __init__(self, path, mode="r"):
+class TraveltimeInventory(object):
+    """
+    TraveltimeInventory(path, mode="r", backend=None, chunks=None, compression=None, compression_opts=None)
+
+    A collection of traveltime fields stored on disk under keys like
+    "network/station/phase".
+
+    With the "hdf5" *backend*, the inventory is a single HDF5 file
+    with one group per field. Values are stored contiguously unless
+    *chunks* (a chunk shape, or True to let h5py choose) or
+    *compression* (e.g. "gzip" or "lzf", with *compression_opts*) is
+    given, in which case reading a subregion only reads and
+    decompresses the chunks that intersect it.
+
+    With the "npy" backend, the inventory is a directory with one
+    subdirectory per field holding its values as an uncompressed .npy
+    file, which is memory-mapped (copy-on-write) when read: reading a
+    field or a subregion costs no copy, and only the pages that are
+    actually accessed are read from disk.
+
+    *backend* defaults to "npy" if *path* is an existing directory and
+    to "hdf5" otherwise.
+    """
+
+    def __init__(
+        self,
+        path,
+        mode="r",
+        backend=None,
+        chunks=None,
+        compression=None,
+        compression_opts=None
+    ):
+        if backend is None:
+            backend = "npy" if os.path.isdir(path) else "hdf5"
+        if backend not in BACKENDS:
+            raise (ValueError(f"backend must be one of {BACKENDS}."))
+        self._backend = backend
+        self._chunks = chunks
+        self._compression = compression
+        self._compression_opts = compression_opts
         self._mode = mode
         self._path = path
-        self._f5 = h5py.File(path, mode=mode)
+        self._store = None
+        self._store = self._open()
 
     def __del__(self):
-        self.f5.close()
+        self.close()
 
     def __enter__(self):
         return (self)
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
-        self.__del__()
+        self.close()
+
+    @property
+    def backend(self):
+        return (self._backend)
 
     @property
     def f5(self):
-        return (self._f5)
+        if self.backend != "hdf5":
+            return (None)
+        return (self._store.f5)
 
     @property
     def mode(self):
@@ -32,22 +82,50 @@ class TraveltimeInventory(object):
     @mode.setter
     def mode(self, value):
         self._mode = value
-        self.f5.close()
-        self._f5 = h5py.File(self.path, mode=value)
+        self.close()
+        self._store = self._open()
 
     @property
     def path(self):
         return (self._path)
 
 
-    def add(self, field, key):
+    def _open(self):
+        if self.backend == "hdf5":
+            return (_HDF5Store(self.path, self.mode))
+        return (_NpyStore(self.path, self.mode))
 
-        group = self.f5.create_group(key)
-        group.attrs["coord_sys"] = field.coord_sys
-        group.attrs["field_type"] = field.field_type
 
-        for attr in ("min_coords", "node_intervals", "npts", "values"):
-            group.create_dataset(attr, data=getattr(field, attr))
+    def keys(self):
+        """
+        Keys of all the fields in the inventory.
+        """
+        return (self._store.keys())
+
+
+    def close(self):
+        if getattr(self, "_store", None) is not None:
+            self._store.close()
+            self._store = None
+        return (True)
+
+
+    def add(self, field, key, chunks=None, compression=None, compression_opts=None):
+        """
+        Add *field* to the inventory under *key*. *chunks*,
+        *compression* and *compression_opts* override the inventory's
+        defaults for this field (HDF5 only).
+        """
+        self._store.add(
+            field,
+            key,
+            chunks=self._chunks if chunks is None else chunks,
+            compression=self._compression if compression is None else compression,
+            compression_opts=(
+                self._compression_opts if compression_opts is None
+                else compression_opts
+            )
+        )
 
         return (True)
 
@@ -67,60 +145,230 @@ class TraveltimeInventory(object):
 
     def read(self, key, min_coords=None, max_coords=None):
 
-        group = self.f5[key]
-
-        _coord_sys = group.attrs["coord_sys"]
-        _field_type = group.attrs["field_type"]
-        _min_coords = group["min_coords"][:]
-        _node_intervals = group["node_intervals"][:]
-        _npts = group["npts"][:]
-
-        if min_coords is not None:
-            min_coords = np.array(min_coords)
-
-        if max_coords is not None:
+        attrs = self._store.attrs(key)
+        idx_start, idx_end = _window(attrs, min_coords, max_coords)
+        field = _empty_field(attrs, idx_start, idx_end)
+        idxs = tuple(slice(idx_start[idx], idx_end[idx]) for idx in range(3))
+        field.values = self._store.values(key)[idxs]
 
-            max_coords = np.array(max_coords)
+        return (field)
 
-        if min_coords is not None and max_coords is not None:
 
-            if np.any(min_coords >= max_coords):
+    def read_many(self, keys, min_coords=None, max_coords=None):
+        """
+        Read the fields stored under each of *keys*, optionally limited
+        to the region between *min_coords* and *max_coords*, as
+        :meth:`read` does.
+
+        Fields on the same grid (the usual case, e.g. one field per
+        station) are read into a single contiguous array of shape
+        (len(keys), N0, N1, N2[, 3]), whose slices become the fields'
+        values; with the "hdf5" backend, each field is read straight
+        into its slice, touching only the chunks that intersect the
+        region. The "npy" backend returns memory-mapped views instead.
+
+        :return: The fields, in the order of *keys*.
+        :rtype: list
+        """
+        keys = list(keys)
+        attrs = [self._store.attrs(key) for key in keys]
+        if (
+            self.backend != "hdf5"
+            or len(keys) == 0
+            or any(not _same_grid(attrs[0], other) for other in attrs[1:])
+        ):
+            return ([self.read(key, min_coords, max_coords) for key in keys])
+
+        idx_start, idx_end = _window(attrs[0], min_coords, max_coords)
+        idxs = tuple(slice(idx_start[idx], idx_end[idx]) for idx in range(3))
+        shape = tuple(idx_end - idx_start)
+        if attrs[0]["field_type"] == "vector":
+            shape += (3,)
+        values = np.empty((len(keys),) + shape, dtype=constants.DTYPE_REAL)
+        fields_ = []
+        for i, key in enumerate(keys):
+            self._store.read_direct(key, idxs, values[i])
+            field = _empty_field(attrs[i], idx_start, idx_end)
+            field.values = values[i]
+            fields_.append(field)
 
-                raise(ValueError("All values of min_coords must satisfy min_coords < max_coords."))
+        return (fields_)
 
-        if min_coords is not None:
 
-            idx_start = (min_coords - _min_coords) / _node_intervals
-            idx_start = np.floor(idx_start)
-            idx_start = idx_start.astype(np.int32)
-            idx_start = np.clip(idx_start, 0, _npts - 1)
+class _HDF5Store(object):
+    # Fields as groups of an HDF5 file.
 
-        else:
+    def __init__(self, path, mode):
+        self.f5 = h5py.File(path, mode=mode)
 
-            idx_start = np.array([0, 0, 0])
+    def close(self):
+        self.f5.close()
 
-        if max_coords is not None:
+    def keys(self):
+        keys = []
+        self.f5.visititems(
+            lambda name, obj: keys.append(name)
+            if isinstance(obj, h5py.Group) and "values" in obj else None
+        )
+        return (keys)
 
-            idx_end = (max_coords - _min_coords) / _node_intervals
-            idx_end = np.ceil(idx_end) + 1
-            idx_end = idx_end.astype(np.int32)
-            idx_end = np.clip(idx_end, idx_start + 1, _npts)
+    def attrs(self, key):
+        group = self.f5[key]
+        return ({
+            "coord_sys": group.attrs["coord_sys"],
+            "field_type": group.attrs["field_type"],
+            "min_coords": group["min_coords"][:],
+            "node_intervals": group["node_intervals"][:],
+            "npts": group["npts"][:]
+        })
 
-        else:
+    def values(self, key):
+        return (self.f5[key]["values"])
 
-            idx_end = _npts
+    def read_direct(self, key, idxs, out):
+        self.f5[key]["values"].read_direct(out, source_sel=idxs)
 
-        if _field_type == "scalar":
-            field = fields.ScalarField3D(coord_sys=_coord_sys)
-        elif _field_type == "vector":
-            field = fields.VectorField3D(coord_sys=_coord_sys)
-        else:
-            raise (ValueError(f"Unrecognized field type: {_field_type}"))
+    def add(self, field, key, chunks=None, compression=None, compression_opts=None):
+        group = self.f5.create_group(key)
+        group.attrs["coord_sys"] = field.coord_sys
+        group.attrs["field_type"] = field.field_type
 
-        field.min_coords = _min_coords  +  idx_start * _node_intervals
-        field.node_intervals = _node_intervals
-        field.npts = idx_end - idx_start
-        idxs = tuple(slice(idx_start[idx], idx_end[idx]) for idx in range(3))
-        field.values = group["values"][idxs]
+        for attr in ("min_coords", "node_intervals", "npts"):
+            group.create_dataset(attr, data=getattr(field, attr))
 
-        return (field)
+        values = field.values
+        if chunks is not None and chunks is not True:
+            # Chunk shapes are given for the grid axes, and clipped to
+            # the grid.
+            chunks = tuple(
+                int(min(max(chunk, 1), n))
+                for chunk, n in zip(chunks, values.shape)
+            ) + values.shape[3:]
+        group.create_dataset(
+            "values",
+            data=values,
+            chunks=chunks,
+            compression=compression,
+            compression_opts=compression_opts
+        )
+
+
+class _NpyStore(object):
+    # Fields as directories holding values.npy and attrs.json.
+
+    def __init__(self, path, mode):
+        if mode == "r" and not os.path.isdir(path):
+            raise (FileNotFoundError(f"No such inventory: {path}"))
+        if mode == "w" and os.path.isdir(path) and os.listdir(path):
+            raise (FileExistsError(f"Inventory already exists: {path}"))
+        if mode != "r":
+            os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.mode = mode
+
+    def close(self):
+        pass
+
+    def keys(self):
+        keys = []
+        for root, _, files in os.walk(self.path):
+            if "attrs.json" in files:
+                keys.append(os.path.relpath(root, self.path).replace(os.sep, "/"))
+        return (sorted(keys))
+
+    def attrs(self, key):
+        with open(os.path.join(self.path, key, "attrs.json")) as f:
+            attrs = json.load(f)
+        for attr in ("min_coords", "node_intervals", "npts"):
+            attrs[attr] = np.asarray(attrs[attr])
+        return (attrs)
+
+    def values(self, key):
+        # Copy-on-write, so the fields' values are writable without
+        # ever modifying the inventory.
+        return (np.load(os.path.join(self.path, key, "values.npy"), mmap_mode="c"))
+
+    def add(self, field, key, chunks=None, compression=None, compression_opts=None):
+        if self.mode == "r":
+            raise (ValueError("Inventory is read-only."))
+        path = os.path.join(self.path, key)
+        if os.path.exists(os.path.join(path, "attrs.json")):
+            raise (ValueError(f"Field already exists: {key}"))
+        os.makedirs(path, exist_ok=True)
+        np.save(
+            os.path.join(path, "values.npy"),
+            np.ascontiguousarray(field.values, dtype=constants.DTYPE_REAL)
+        )
+        with open(os.path.join(path, "attrs.json"), "w") as f:
+            json.dump(
+                {
+                    "coord_sys": field.coord_sys,
+                    "field_type": field.field_type,
+                    "min_coords": field.min_coords.tolist(),
+                    "node_intervals": field.node_intervals.tolist(),
+                    "npts": field.npts.tolist()
+                },
+                f
+            )
+
+
+def _window(attrs, min_coords, max_coords):
+    # Start and end indices of the nodes spanning the region between
+    # min_coords and max_coords.
+    _min_coords = attrs["min_coords"]
+    _node_intervals = attrs["node_intervals"]
+    _npts = attrs["npts"]
+
+    if min_coords is not None:
+        min_coords = np.array(min_coords)
+
+    if max_coords is not None:
+        max_coords = np.array(max_coords)
+
+    if min_coords is not None and max_coords is not None:
+        if np.any(min_coords >= max_coords):
+            raise(ValueError("All values of min_coords must satisfy min_coords < max_coords."))
+
+    if min_coords is not None:
+        idx_start = (min_coords - _min_coords) / _node_intervals
+        idx_start = np.floor(idx_start)
+        idx_start = idx_start.astype(np.int32)
+        idx_start = np.clip(idx_start, 0, _npts - 1)
+    else:
+        idx_start = np.array([0, 0, 0])
+
+    if max_coords is not None:
+        idx_end = (max_coords - _min_coords) / _node_intervals
+        idx_end = np.ceil(idx_end) + 1
+        idx_end = idx_end.astype(np.int32)
+        idx_end = np.clip(idx_end, idx_start + 1, _npts)
+    else:
+        idx_end = _npts
+
+    return (idx_start, idx_end)
+
+
+def _empty_field(attrs, idx_start, idx_end):
+    # Field with the geometry of the window, without values.
+    if attrs["field_type"] == "scalar":
+        field = fields.ScalarField3D(coord_sys=attrs["coord_sys"])
+    elif attrs["field_type"] == "vector":
+        field = fields.VectorField3D(coord_sys=attrs["coord_sys"])
+    else:
+        raise (ValueError(f"Unrecognized field type: {attrs['field_type']}"))
+
+    field.min_coords = attrs["min_coords"] + idx_start * attrs["node_intervals"]
+    field.node_intervals = attrs["node_intervals"]
+    field.npts = idx_end - idx_start
+
+    return (field)
+
+
+def _same_grid(attrs, other):
+    return (
+        attrs["coord_sys"] == other["coord_sys"]
+        and attrs["field_type"] == other["field_type"]
+        and np.array_equal(attrs["min_coords"], other["min_coords"])
+        and np.array_equal(attrs["node_intervals"], other["node_intervals"])
+        and np.array_equal(attrs["npts"], other["npts"])
+    )
@@ -14,6 +14,9 @@ cdef class EQLocator(object):
     cdef dict                    cy_arrivals
     cdef dict                    cy_traveltimes
     cdef dict                    cy_residual_rvs
+    cdef list                    cy_traveltime_keys
+    cdef fields.ScalarField3D    cy_traveltime_grid
+    cdef constants.REAL_t[:,:,:,::1] cy_traveltime_stack
 
     cpdef constants.BOOL_t add_arrivals(EQLocator self, dict arrivals)
     cpdef constants.BOOL_t add_residual_rvs(EQLocator self, dict residua_rvs)
@@ -22,13 +25,35 @@ cdef class EQLocator(object):
     cpdef constants.BOOL_t read_traveltimes(
         EQLocator self,
         constants.REAL_t[:] min_coords=*,
-        constants.REAL_t[:] max_coords=*
+        constants.REAL_t[:] max_coords=*,
+        list keys=*
     )
     cpdef constants.REAL_t log_likelihood(
         EQLocator self,
         constants.REAL_t[:] model
     )
-    #cpdef np.ndarray[constants.REAL_t, ndim=1] grid_search(EQLocator self)
+    cpdef np.ndarray[constants.REAL_t, ndim=2] residuals(
+        EQLocator self,
+        constants.REAL_t[:,:] hypocenters
+    )
+    cpdef np.ndarray[constants.REAL_t, ndim=1] rms_batch(
+        EQLocator self,
+        constants.REAL_t[:,:] hypocenters
+    )
+    cpdef np.ndarray[constants.REAL_t, ndim=1] log_likelihood_batch(
+        EQLocator self,
+        constants.REAL_t[:,:] models
+    )
+    cpdef np.ndarray[constants.REAL_t, ndim=1] grid_search(
+        EQLocator self,
+        Py_ssize_t npts=*,
+        Py_ssize_t nlevels=*
+    )
+    cdef np.ndarray[constants.REAL_t, ndim=2] _interpolate_stack(
+        EQLocator self,
+        constants.REAL_t[:,:] points,
+        Py_ssize_t[:] columns
+    )
     cpdef constants.REAL_t rms(EQLocator self, constants.REAL_t[:] hypocenter)
     cpdef np.ndarray[constants.REAL_t, ndim=1] locate(
         EQLocator self,
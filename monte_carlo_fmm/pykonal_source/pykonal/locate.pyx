@@ -12,17 +12,25 @@ import tempfile
 from . import constants as _constants
 from . import inventory as _inventory
 from . import solver as _solver
+from . import stats as _stats
 from . import transformations as _transformations
 
+cimport cython
 cimport numpy as np
 
-from libc.math cimport sqrt
+from cython.parallel cimport prange
+from libc.math cimport sqrt, INFINITY
 
 from . cimport fields
 from . cimport constants
 
 inf = np.inf
 
+# Batches of fewer hypocenters are evaluated serially, as spawning
+# OpenMP threads would cost more than it saves.
+cdef enum:
+    MIN_PARALLEL_POINTS = 256
+
 cdef class EQLocator(object):
     """
     EQLocator(stations, tt_inv, coord_sys='spherical')
@@ -35,7 +43,9 @@ cdef class EQLocator(object):
         coord_sys: str="spherical"
     ):
         self.cy_arrivals = {}
+        self.cy_residual_rvs = {}
         self.cy_traveltimes = {}
+        self.cy_traveltime_keys = []
         self.cy_coord_sys = coord_sys
         inventory = _inventory.TraveltimeInventory(
             traveltime_inventory, 
@@ -45,7 +55,7 @@ cdef class EQLocator(object):
 
 
     def __del__(self):
-        self.traveltime_inventory.f5.close()
+        self.traveltime_inventory.close()
 
 
     def __enter__(self):
@@ -155,6 +165,17 @@ cdef class EQLocator(object):
     @traveltimes.setter
     def traveltimes(self, value: dict):
         self.cy_traveltimes = value
+        self.cy_traveltime_keys = []
+        self.cy_traveltime_grid = None
+
+    @property
+    def traveltime_keys(self) -> list:
+        """
+        [*Read only*, list] Keys of the traveltime fields stacked by
+        :meth:`read_traveltimes`, in the order of the stack; empty
+        unless the fields share a grid.
+        """
+        return (list(self.cy_traveltime_keys))
         
     @property
     def vs(self) -> object:
@@ -168,32 +189,274 @@ cdef class EQLocator(object):
     cpdef constants.BOOL_t read_traveltimes(
         EQLocator self, 
         constants.REAL_t[:] min_coords=None, 
-        constants.REAL_t[:] max_coords=None
+        constants.REAL_t[:] max_coords=None,
+        list keys=None
     ):
+        """
+        read_traveltimes(self, min_coords=None, max_coords=None, keys=None)
+
+        Read the traveltime fields of *keys* (default: the keys of
+        :attr:`arrivals`) from the inventory, optionally limited to
+        the region between *min_coords* and *max_coords*.
+
+        Fields on a common grid are also stacked into a single
+        contiguous array, node by node, against which
+        :meth:`residuals`, :meth:`rms_batch`,
+        :meth:`log_likelihood_batch`, and :meth:`grid_search` evaluate
+        many hypocenters at once. The arrivals of these methods can be
+        any subset of *keys*, so reading the fields of every station
+        once serves all the events located in the same region.
+
+        :param keys: Keys (network, station, phase) of the fields to
+                     read.
+        :type keys: list
+        :return: Returns True upon successful execution.
+        :rtype: bool
+        """
+        cdef object              first
+
+        if keys is None:
+            keys = list(self.cy_arrivals)
+        keys = [tuple(key) for key in keys]
+        traveltimes = self.cy_traveltime_inventory.read_many(
+            ["/".join(key) for key in keys],
+            min_coords=min_coords,
+            max_coords=max_coords
+        )
+        self.cy_traveltimes = dict(zip(keys, traveltimes))
+
+        self.cy_traveltime_keys = []
+        self.cy_traveltime_grid = None
+        if len(traveltimes) == 0:
+            return (True)
+        first = traveltimes[0]
+        for field in traveltimes[1:]:
+            if not (
+                field.coord_sys == first.coord_sys
+                and np.array_equal(field.min_coords, first.min_coords)
+                and np.array_equal(field.node_intervals, first.node_intervals)
+                and np.array_equal(field.npts, first.npts)
+            ):
+                return (True)
+        self.cy_traveltime_stack = np.stack(
+            [field.values for field in traveltimes],
+            axis=-1
+        ).astype(_constants.DTYPE_REAL, copy=False)
+        self.cy_traveltime_keys = keys
+        self.cy_traveltime_grid = first
+
+        return (True)
+
+
+    cpdef np.ndarray[constants.REAL_t, ndim=2] residuals(
+        EQLocator self,
+        constants.REAL_t[:,:] hypocenters
+    ):
+        """
+        residuals(self, hypocenters)
+
+        Residuals (observed minus predicted arrival time) of the
+        arrivals for each of a batch of hypocenters, predicted from the
+        traveltimes stacked by :meth:`read_traveltimes`.
+
+        The GIL is released while the traveltimes are interpolated, and
+        large batches of hypocenters are spread over OpenMP threads if
+        PyKonal was built with OpenMP support. Hypocenters outside the
+        grid get infinite predicted arrival times.
+
+        :param hypocenters: Candidate hypocenters (x1, x2, x3, origin
+                            time).
+        :type hypocenters: numpy.ndarray(shape=(M,4), dtype=numpy.float)
+        :return: Residuals, one column per arrival in the order of
+                 :attr:`arrivals`.
+        :rtype: numpy.ndarray(shape=(M,K), dtype=numpy.float)
+        """
+        cdef np.ndarray[constants.REAL_t, ndim=2] predicted
+
+        if hypocenters.shape[1] != 4:
+            raise (ValueError("hypocenters must have shape (M, 4)."))
+        columns, arrivals = self._stacked_arrivals()
+        predicted = self._interpolate_stack(hypocenters[:, :3], columns)
+
+        return (arrivals - np.asarray(hypocenters[:, 3:4]) - predicted)
+
+
+    cpdef np.ndarray[constants.REAL_t, ndim=1] rms_batch(
+        EQLocator self,
+        constants.REAL_t[:,:] hypocenters
+    ):
+        """
+        rms_batch(self, hypocenters)
+
+        Residual RMS of each of a batch of hypocenters; the batched
+        equivalent of :meth:`rms`. See :meth:`residuals`.
+
+        :param hypocenters: Candidate hypocenters (x1, x2, x3, origin
+                            time).
+        :type hypocenters: numpy.ndarray(shape=(M,4), dtype=numpy.float)
+        :return: Residual RMS of each hypocenter.
+        :rtype: numpy.ndarray(shape=(M,), dtype=numpy.float)
+        """
+        cdef np.ndarray[constants.REAL_t, ndim=2] residuals_
+
+        residuals_ = self.residuals(hypocenters)
+        return (np.sqrt(np.mean(residuals_ * residuals_, axis=1)))
+
+
+    cpdef np.ndarray[constants.REAL_t, ndim=1] log_likelihood_batch(
+        EQLocator self,
+        constants.REAL_t[:,:] models
+    ):
+        """
+        log_likelihood_batch(self, models)
+
+        Log-likelihood of the residuals of each of a batch of models
+        under :attr:`residual_rvs`; the batched equivalent of
+        :meth:`log_likelihood`. See :meth:`residuals`.
+
+        Residual distributions other than
+        :class:`pykonal.stats.NormalDistribution` must have a
+        vectorized *logpdf* method, as scipy.stats distributions do.
+
+        :param models: Candidate hypocenters (x1, x2, x3, origin time).
+        :type models: numpy.ndarray(shape=(M,4), dtype=numpy.float)
+        :return: Log-likelihood of each model.
+        :rtype: numpy.ndarray(shape=(M,), dtype=numpy.float)
+        """
+        cdef np.ndarray[constants.REAL_t, ndim=2] residuals_
+        cdef np.ndarray[constants.REAL_t, ndim=1] log_likelihood
+
+        residuals_ = self.residuals(models)
+        log_likelihood = np.zeros(residuals_.shape[0], dtype=_constants.DTYPE_REAL)
+        for iarrival, key in enumerate(self.cy_arrivals):
+            log_likelihood += _logpdf(self.cy_residual_rvs[key], residuals_[:, iarrival])
+
+        return (log_likelihood)
+
+
+    cpdef np.ndarray[constants.REAL_t, ndim=1] grid_search(
+        EQLocator self,
+        Py_ssize_t npts=16,
+        Py_ssize_t nlevels=4
+    ):
+        """
+        grid_search(self, npts=16, nlevels=4)
+
+        Locate the event by a coarse-to-fine grid search minimizing the
+        residual RMS over the traveltimes stacked by
+        :meth:`read_traveltimes`.
+
+        The first level evaluates a lattice of *npts* points per axis
+        spanning the grid of the traveltimes. Each of the *nlevels* - 1
+        following levels evaluates a lattice of the same size spanning
+        one spacing of the previous lattice on either side of its best
+        point. Every level is evaluated as one batch. The origin time
+        of a point is the mean of its residuals at a zero origin time,
+        which minimizes its RMS, so only space is searched.
+
+        :param npts: Number of points per axis of each lattice.
+        :type npts: int
+        :param nlevels: Number of lattices.
+        :type nlevels: int
+        :return: Hypocenter (x1, x2, x3, origin time) with the smallest
+                 residual RMS.
+        :rtype: numpy.ndarray(shape=(4,), dtype=numpy.float)
+        """
+        cdef Py_ssize_t                           ilevel, best
+        cdef np.ndarray[constants.REAL_t, ndim=2] residuals_
+
+        if npts < 2 or nlevels < 1:
+            raise (ValueError("npts must be at least 2 and nlevels at least 1."))
+        columns, arrivals = self._stacked_arrivals()
+        grid = self.cy_traveltime_grid
+        lower, upper = grid.min_coords, grid.max_coords
+
+        for ilevel in range(nlevels):
+            axes = [
+                np.linspace(lower[iax], upper[iax], 1 if grid.iax_isnull[iax] else npts)
+                for iax in range(3)
+            ]
+            points = np.stack(
+                np.meshgrid(*axes, indexing="ij"),
+                axis=-1
+            ).reshape(-1, 3).astype(_constants.DTYPE_REAL)
+            residuals_ = arrivals - self._interpolate_stack(points, columns)
+            origin_times = residuals_.mean(axis=1)
+            residuals_ -= origin_times[:, np.newaxis]
+            rms = np.sqrt(np.mean(residuals_ * residuals_, axis=1))
+            # Points outside the region reached by every arrival.
+            rms[~np.isfinite(rms)] = np.inf
+            best = np.argmin(rms)
+            spacing = (upper - lower) / (npts - 1)
+            lower = np.maximum(points[best] - spacing, grid.min_coords)
+            upper = np.minimum(points[best] + spacing, grid.max_coords)
+
+        return (np.array([*points[best], origin_times[best]], dtype=_constants.DTYPE_REAL))
+
+
+    def _stacked_arrivals(self):
+        """
+        Columns of the traveltime stack and times of the arrivals, in
+        the order of :attr:`arrivals`.
+        """
+        if self.cy_traveltime_grid is None:
+            raise (ValueError(
+                "Traveltimes must be read on a common grid by read_traveltimes."
+            ))
+        index = {key: icolumn for icolumn, key in enumerate(self.cy_traveltime_keys)}
+        missing = [key for key in self.cy_arrivals if key not in index]
+        if len(missing) > 0:
+            raise (ValueError(f"No traveltimes read for arrivals {missing}."))
+        columns = np.array([index[key] for key in self.cy_arrivals], dtype=np.intp)
+        arrivals = np.array(list(self.cy_arrivals.values()), dtype=_constants.DTYPE_REAL)
+
+        return (columns, arrivals)
+
+
+    @cython.initializedcheck(False)
+    cdef np.ndarray[constants.REAL_t, ndim=2] _interpolate_stack(
+        EQLocator self,
+        constants.REAL_t[:,:] points,
+        Py_ssize_t[:] columns
+    ):
+        """
+        Traveltimes of the stacked fields *columns* at *points*, by
+        trilinear interpolation.
+        """
+        cdef Py_ssize_t                           ipoint
+        cdef constants.REAL_t[:,::1]              interpolated
+
+        interpolated = np.empty(
+            (points.shape[0], columns.shape[0]),
+            dtype=_constants.DTYPE_REAL
+        )
+
+        with nogil:
+            if points.shape[0] < MIN_PARALLEL_POINTS:
+                for ipoint in range(points.shape[0]):
+                    _interpolate_point(
+                        self.cy_traveltime_grid,
+                        self.cy_traveltime_stack,
+                        columns,
+                        points[ipoint, 0],
+                        points[ipoint, 1],
+                        points[ipoint, 2],
+                        &interpolated[ipoint, 0]
+                    )
+            else:
+                for ipoint in prange(points.shape[0], schedule="static"):
+                    _interpolate_point(
+                        self.cy_traveltime_grid,
+                        self.cy_traveltime_stack,
+                        columns,
+                        points[ipoint, 0],
+                        points[ipoint, 1],
+                        points[ipoint, 2],
+                        &interpolated[ipoint, 0]
+                    )
+
+        return (np.asarray(interpolated))
 
-        inventory = self.cy_traveltime_inventory
-        self.cy_traveltimes = {
-            index: inventory.read(
-                "/".join(index),
-                min_coords=min_coords,
-                max_coords=max_coords
-            ) for index in self.cy_arrivals
-        }
-
-        return True
-
-
-    #cpdef np.ndarray[constants.REAL_t, ndim=1] grid_search(EQLocator self):
-    #    values = [self.cy_arrivals[key]-np.ma.masked_invalid(self.cy_traveltimes[key].values) for key in self.cy_traveltimes]
-    #    values = np.stack(values)
-    #    std = values.std(axis=0)
-    #    arg_min = np.argmin(std)
-    #    idx_min = np.unravel_index(arg_min, std.shape)
-    #    coords = self.cy_grid.nodes[idx_min]
-    #    time = values.mean(axis=0)[idx_min]
-    #    return (np.array([*coords, time], dtype=_constants.DTYPE_REAL))
-
-    #
     cpdef constants.REAL_t rms(EQLocator self, constants.REAL_t[:] hypocenter):
         cdef tuple                   key
         cdef dict                    arrivals
@@ -233,7 +496,11 @@ cdef class EQLocator(object):
             max_coords=max_coords[:3]
         )
 
-        soln = scipy.optimize.differential_evolution(self.rms, bounds)
+        soln = scipy.optimize.differential_evolution(
+            _rms,
+            bounds,
+            args=(self,)
+        )
 
         return (soln.x)
 
@@ -251,3 +518,62 @@ cdef class EQLocator(object):
             residual = self.cy_arrivals[key] - t_pred
             log_likelihood = log_likelihood + self.cy_residual_rvs[key].logpdf(residual)
         return (log_likelihood)
+
+
+@cython.initializedcheck(False)
+cdef void _interpolate_point(
+    fields.Field3D                      grid,
+    const constants.REAL_t[:,:,:,::1]   stack,
+    Py_ssize_t[:]                       columns,
+    constants.REAL_t                    x1,
+    constants.REAL_t                    x2,
+    constants.REAL_t                    x3,
+    constants.REAL_t*                   out
+) noexcept nogil:
+    # Interpolate the stacked fields *columns* at (x1, x2, x3) into
+    # *out*, with the arithmetic of ScalarField3D.value, locating the
+    # point on the grid once for all of them; infinite outside the grid.
+    cdef constants.REAL_t[3]         delta
+    cdef constants.REAL_t            f000, f100, f110, f101, f111, f010, f011, f001
+    cdef constants.REAL_t            f00, f10, f01, f11
+    cdef constants.REAL_t            f0, f1
+    cdef Py_ssize_t[3][2]            ii
+    cdef Py_ssize_t                  icolumn, k
+
+    if not grid._locate(x1, x2, x3, ii, delta):
+        for icolumn in range(columns.shape[0]):
+            out[icolumn] = INFINITY
+        return
+    for icolumn in range(columns.shape[0]):
+        k = columns[icolumn]
+        f000    = stack[ii[0][0], ii[1][0], ii[2][0], k]
+        f100    = stack[ii[0][1], ii[1][0], ii[2][0], k]
+        f110    = stack[ii[0][1], ii[1][1], ii[2][0], k]
+        f101    = stack[ii[0][1], ii[1][0], ii[2][1], k]
+        f111    = stack[ii[0][1], ii[1][1], ii[2][1], k]
+        f010    = stack[ii[0][0], ii[1][1], ii[2][0], k]
+        f011    = stack[ii[0][0], ii[1][1], ii[2][1], k]
+        f001    = stack[ii[0][0], ii[1][0], ii[2][1], k]
+        f00     = f000 + (f100 - f000) * delta[0]
+        f10     = f010 + (f110 - f010) * delta[0]
+        f01     = f001 + (f101 - f001) * delta[0]
+        f11     = f011 + (f111 - f011) * delta[0]
+        f0      = f00  + (f10  - f00)  * delta[1]
+        f1      = f01  + (f11  - f01)  * delta[1]
+        out[icolumn] = f0 + (f1 - f0) * delta[2]
+
+
+def _logpdf(rv, x):
+    # Log-density of the residuals *x* under *rv*, vectorized.
+    if isinstance(rv, _stats.NormalDistribution):
+        return (
+            np.log(1 / (rv.sigma * np.sqrt(2 * np.pi)))
+            - (((x - rv.mu) / rv.sigma) ** 2) / 2
+        )
+    return (rv.logpdf(x))
+
+
+def _rms(hypocenter, locator):
+    # Objective of EQLocator.locate; the optimizer works in float64
+    # whatever the precision of the build.
+    return (locator.rms(np.asarray(hypocenter, dtype=_constants.DTYPE_REAL)))
@@ -0,0 +1,16 @@
+/*
+ * Floating-point type of the values of PyKonal fields (constants.REAL_t).
+ *
+ * double by default; float if built with PYKONAL_REAL=float32, which
+ * defines PYKONAL_REAL_FLOAT32 (see setup.py).
+ */
+#ifndef PYKONAL_REAL_H
+#define PYKONAL_REAL_H
+
+#ifdef PYKONAL_REAL_FLOAT32
+typedef float pykonal_real_t;
+#else
+typedef double pykonal_real_t;
+#endif
+
+#endif
@@ -6,18 +6,58 @@ from . cimport constants
 from . cimport fields
 from . cimport heapq
 
+# Statistics of a call to solve, solve_incremental or solve_batch; see
+# EikonalSolver.stats.
+cdef struct SolverStats:
+    long long solves, sweeps
+    long long pops, pushes, updates, sift_steps
+    long long stencil_evaluations, first_order_updates, second_order_updates
+    long long degenerate_updates, discriminant_clamps, accepted_updates
+    double    time_setup, time_restart, time_propagate, time_finalize, time_total
+
 cdef class EikonalSolver(object):
     cdef str                       cy_coord_sys
+    cdef str                       cy_heap_type
+    cdef constants.REAL_t          cy_bucket_width
+    cdef bint                      cy_fast_path
+    cdef str                       cy_method
+    cdef constants.REAL_t          cy_sweep_tolerance
+    cdef Py_ssize_t                cy_max_sweep_iterations
+    cdef bint                      cy_collect_stats
+    cdef bint                      cy_has_stats
+    cdef SolverStats               cy_stats
+    cdef heapq.HeapCounters        cy_stats_counters
+    cdef double                    cy_stats_start
     cdef fields.ScalarField3D      cy_velocity
     cdef fields.ScalarField3D      cy_traveltime
     cdef heapq.Heap                cy_trial
     cdef constants.BOOL_t[:,:,:]   cy_known
     cdef constants.BOOL_t[:,:,:]   cy_unknown
-    cdef constants.REAL_t[:,:,:,:] cy_norm
     cdef constants.UINT_t[3]       cy_is_periodic
 
     cpdef constants.BOOL_t solve(EikonalSolver self)
+    cpdef constants.BOOL_t solve_incremental(
+            EikonalSolver self,
+            constants.REAL_t[:,:,:] baseline,
+            constants.BOOL_t[:,:,:] changed
+    )
+    cpdef np.ndarray[constants.REAL_t, ndim=4] solve_batch(
+            EikonalSolver self,
+            constants.REAL_t[:,:,:,:] velocities,
+            constants.REAL_t[:,:,:] baseline=*,
+            constants.BOOL_t[:,:,:,:] changed=*
+    )
     cpdef np.ndarray[constants.REAL_t, ndim=2] trace_ray(
             EikonalSolver self,
             constants.REAL_t[:] end
     )
+    cdef int _kernel(EikonalSolver self) except -1
+    cdef SolverStats* _stats_begin(EikonalSolver self) except? NULL
+    cdef void _stats_end(EikonalSolver self, SolverStats* stats)
+
+cdef class EikonalSolver2D(EikonalSolver):
+    cpdef np.ndarray[constants.REAL_t, ndim=2] trace_ray(
+            EikonalSolver2D self,
+            constants.REAL_t[:] end
+    )
+    cdef int _kernel(EikonalSolver2D self) except -1
@@ -24,12 +24,14 @@ import numpy as np
 
 # Local imports.
 from . import constants
+from . import transformations
 
 # Cython built-in imports.
 cimport cython
-from libc.math cimport sqrt, sin
+from libc.math cimport sqrt, sin, isnan, INFINITY, NAN
+from cython.parallel cimport prange
 from libcpp.vector cimport vector as cpp_vector
-from libc.stdlib   cimport malloc, free
+from libc.string   cimport memset
 
 # Cython third-party imports.
 cimport numpy as np
@@ -39,6 +41,58 @@ from . cimport constants
 from . cimport fields
 from . cimport heapq
 
+
+# Monotonic wall-clock time in seconds, callable without the GIL, for
+# the timings of EikonalSolver.stats.
+cdef extern from *:
+    """
+    #include <chrono>
+    static double pykonal_wtime(void) {
+        return std::chrono::duration<double>(
+            std::chrono::steady_clock::now().time_since_epoch()
+        ).count();
+    }
+    """
+    double _wtime "pykonal_wtime" () noexcept nogil
+
+
+cdef inline double _lap(double* t) noexcept nogil:
+    # Seconds elapsed since *t, which is moved on to now.
+    cdef double now = _wtime()
+    cdef double elapsed = now - t[0]
+    t[0] = now
+    return (elapsed)
+
+
+HEAP_TYPES = ("binary", "quaternary", "bucket")
+METHODS = ("fmm", "fsm")
+
+# Wavefront propagation kernels.
+cdef enum:
+    GENERAL_KERNEL, CARTESIAN_KERNEL, CARTESIAN_2D_KERNEL, SWEEPING_KERNEL
+
+# Minimum number of nodes (estimated) in a hyperplane of the fast
+# sweeping method for the hyperplane to be updated in parallel.
+cdef enum:
+    SWEEP_MIN_PARALLEL_NODES = 2048
+
+# Node states of the padded state arrays used by the Cartesian kernels.
+# FIXED nodes are in Trial with their final values (see
+# _restart_from_baseline): like GHOST nodes they are never updated,
+# and they become KNOWN when popped.
+cdef enum:
+    FAR, TRIAL, KNOWN, GHOST, FIXED
+
+# Outcome of a fast sweeping update, as bit flags: the node was
+# evaluated, its discriminant was clamped to zero, its traveltime
+# decreased, and by more than the tolerance.
+cdef enum:
+    SWEEP_EVALUATED = 1
+    SWEEP_CLAMPED = 2
+    SWEEP_DECREASED = 4
+    SWEEP_CHANGED = 8
+
+
 cdef class EikonalSolver(object):
     """
     The core class of PyKonal for solving the Eikonal equation.
@@ -68,8 +122,23 @@ cdef class EikonalSolver(object):
        tt = solver.traveltime.values
     """
 
-    def __init__(self, coord_sys="cartesian"):
+    def __init__(
+        self,
+        coord_sys="cartesian",
+        heap_type="binary",
+        bucket_width=None,
+        method="fmm"
+    ):
+        if heap_type not in HEAP_TYPES:
+            raise (ValueError(f"heap_type must be one of {HEAP_TYPES}."))
         self.cy_coord_sys = coord_sys
+        self.cy_heap_type = heap_type
+        self.cy_bucket_width = 0 if bucket_width is None else bucket_width
+        self.cy_fast_path = True
+        self.method = method
+        self.cy_sweep_tolerance = 0
+        self.cy_max_sweep_iterations = 100
+        self.cy_collect_stats = False
         self.cy_velocity = fields.ScalarField3D(coord_sys=self.coord_sys)
 
 
@@ -78,11 +147,165 @@ cdef class EikonalSolver(object):
         """
         [*Read/Write*, :class:`pykonal.heapq.Heap`] Heap of node
         indices in *Trial*.
+
+        The structure is selected by the *heap_type* constructor
+        argument: "binary" (:class:`pykonal.heapq.Heap`, the default),
+        "quaternary" (:class:`pykonal.heapq.QuaternaryHeap`), which
+        gives the same traveltimes up to the order of ties, or
+        "bucket" (:class:`pykonal.heapq.BucketQueue`), the untidy
+        variant of the Fast Marching Method. Its *bucket_width*
+        defaults to one eighth of the smallest node interval divided
+        by the largest velocity, which keeps the ordering errors below
+        the discretization error for smooth velocity models; rougher
+        models need a smaller width.
         """
         if self.cy_trial is None:
-            self.cy_trial = heapq.Heap(self.traveltime.values)
+            if self.cy_heap_type == "quaternary":
+                self.cy_trial = heapq.QuaternaryHeap(self.traveltime.values)
+            elif self.cy_heap_type == "bucket":
+                self.cy_trial = heapq.BucketQueue(
+                    self.traveltime.values,
+                    self.cy_bucket_width or self._default_bucket_width()
+                )
+            else:
+                self.cy_trial = heapq.Heap(self.traveltime.values)
         return (self.cy_trial)
 
+    @property
+    def fast_path(self):
+        """
+        [*Read/Write*, bool] Whether to propagate the wavefront on
+        Cartesian grids with a specialized kernel (the default), which
+        pads the node states with ghost layers instead of checking the
+        bounds of each stencil (and uses a 4-neighbour stencil in
+        :class:`EikonalSolver2D`). Results match the general kernel to
+        round-off. Has no effect on spherical grids.
+        """
+        return (self.cy_fast_path)
+
+    @fast_path.setter
+    def fast_path(self, value):
+        self.cy_fast_path = value
+
+    @property
+    def method(self):
+        """
+        [*Read/Write*, str] Method used to solve the Eikonal equation
+        {"fmm", "fsm"}.
+
+        "fmm" (the default) is the Fast Marching Method, which accepts
+        nodes one at a time in order of increasing traveltime. "fsm"
+        is the Fast Sweeping Method: Gauss-Seidel iterations of a
+        first-order Godunov upwind update, each sweeping the grid in
+        all 2**d axis directions, until no traveltime decreases by
+        more than *sweep_tolerance* (or *max_sweep_iterations* is
+        reached). Within a sweep, nodes are visited by hyperplanes
+        i1 + i2 + i3 = const, whose nodes do not depend on one another
+        and are updated in parallel on OpenMP threads; the result is
+        that of a sequential sweep, whatever the number of threads.
+
+        Sweeping needs no heap and converges in a few iterations for
+        smooth velocity models, but more for strongly heterogeneous
+        ones (e.g. fronts diffracting around obstacles), and is only
+        first-order accurate. It is only available on Cartesian
+        grids; the initial conditions are those of the FMM, all nodes
+        not in *Unknown* being fixed.
+        """
+        return (self.cy_method)
+
+    @method.setter
+    def method(self, value):
+        if value not in METHODS:
+            raise (ValueError(f"method must be one of {METHODS}."))
+        if value == "fsm" and self.cy_coord_sys != "cartesian":
+            raise (ValueError("The fast sweeping method requires a Cartesian grid."))
+        self.cy_method = value
+
+    @property
+    def sweep_tolerance(self):
+        """
+        [*Read/Write*, float] Largest traveltime decrease at any node
+        for an iteration of the fast sweeping method to be considered
+        converged (default 0, i.e., until no node changes).
+        """
+        return (self.cy_sweep_tolerance)
+
+    @sweep_tolerance.setter
+    def sweep_tolerance(self, value):
+        self.cy_sweep_tolerance = value
+
+    @property
+    def max_sweep_iterations(self):
+        """
+        [*Read/Write*, int] Largest number of iterations of the fast
+        sweeping method (default 100). A warning is issued if it is
+        reached before convergence.
+        """
+        return (self.cy_max_sweep_iterations)
+
+    @max_sweep_iterations.setter
+    def max_sweep_iterations(self, value):
+        if value < 1:
+            raise (ValueError("max_sweep_iterations must be positive."))
+        self.cy_max_sweep_iterations = value
+
+    @property
+    def collect_stats(self):
+        """
+        [*Read/Write*, bool] Whether to collect :attr:`stats` (default
+        False).
+        """
+        return (self.cy_collect_stats)
+
+    @collect_stats.setter
+    def collect_stats(self, value):
+        self.cy_collect_stats = value
+
+    @property
+    def stats(self):
+        """
+        [*Read only*, dict] Statistics of the last call to
+        :meth:`solve`, :meth:`solve_incremental`, or
+        :meth:`solve_batch`, or None unless it was made with
+        :attr:`collect_stats` enabled:
+
+        - *solves*: number of traveltime fields solved (the number of
+          realizations for :meth:`solve_batch`);
+        - *sweeps*: sweeps of the fast sweeping method, one per
+          direction per iteration;
+        - *pops*, *pushes*, *updates*: operations on *Trial*, and
+          *sift_steps*, the number of entries it moved to keep its
+          order (for a :class:`pykonal.heapq.BucketQueue`, the stale
+          entries and empty buckets it skipped);
+        - *stencil_evaluations*: traveltime updates computed, each
+          one *first_order_updates* or *second_order_updates* (by the
+          highest order of the upwind differences it used), or a
+          *degenerate_updates* without any known neighbour;
+          *discriminant_clamps* counts those whose quadratic had a
+          negative discriminant, which is set to zero, and
+          *accepted_updates* those that lowered a traveltime;
+        - *time_setup*, *time_restart*, *time_propagate*,
+          *time_finalize*, *time_total*: wall time in seconds spent
+          preparing the solve, restarting the wavefront from the
+          baseline (incremental solves), propagating it, saving and
+          restoring the initial conditions (:meth:`solve_batch`) or
+          updating *Known* and *Unknown* (fast sweeping), and overall.
+
+        Counting costs next to nothing; the timings read the clock
+        once per phase.
+        """
+        if not self.cy_has_stats:
+            return (None)
+        return (self.cy_stats)
+
+    @property
+    def heap_type(self):
+        """
+        [*Read only*, str] Structure of the *Trial* set
+        {"binary", "quaternary", "bucket"}.
+        """
+        return (self.cy_heap_type)
+
     @property
     def coord_sys(self):
         """
@@ -133,19 +356,7 @@ cdef class EikonalSolver(object):
             ".traveltime.norm instead."
         warnings.warn(warning_message, DeprecationWarning)
 
-        try:
-            return (np.asarray(self.cy_norm))
-        except AttributeError:
-            norm = np.tile(
-                self.traveltime.node_intervals,
-                np.append(self.traveltime.npts, 1)
-            )
-            if self.coord_sys == 'spherical':
-                norm[..., 1] *= self.traveltime.nodes[..., 0]
-                norm[..., 2] *= self.traveltime.nodes[..., 0]
-                norm[..., 2] *= np.sin(self.traveltime.nodes[..., 1])
-            self.cy_norm = norm
-        return (np.asarray(self.cy_norm))
+        return (self.traveltime.norm)
 
     @property
     def step_size(self):
@@ -203,206 +414,645 @@ cdef class EikonalSolver(object):
         """
         return (self.velocity)
 
+
+    def initialize_sources(self, indices, values=0):
+        """
+        initialize_sources(self, indices, values=0)
+
+        Initialize grid nodes as sources: fix their traveltimes to
+        *values* and push them onto *Trial* in one batch (see
+        :meth:`pykonal.heapq.Heap.push_many`), so that goal sets and
+        multiple sources are solved for in a single pass.
+
+        Sources are also marked as *Known*, so the wavefront
+        propagates from them without overwriting their values. Nodes
+        given more than once keep their smallest value, nodes already
+        in *Trial* are only updated if their traveltime decreases, and
+        nodes in *Known* (including earlier sources) are left
+        untouched.
+
+        :param indices: Node indices of the sources.
+        :type indices: numpy.ndarray(shape=(N,3), dtype=numpy.int)
+        :param values: Traveltimes at the sources (e.g. origin times).
+        :type values: float or numpy.ndarray(shape=(N,), dtype=numpy.float)
+        :return: Returns True upon successful completion.
+        :rtype: bool
+        """
+        indices = np.asarray(indices, dtype=np.intp).reshape(-1, 3)
+        values = np.broadcast_to(
+            np.asarray(values, dtype=constants.DTYPE_REAL),
+            indices.shape[:1]
+        )
+        npts = tuple(self.traveltime.npts)
+        if np.any((indices < 0) | (indices >= npts)):
+            raise (IndexError("Source index out of range."))
+
+        # Keep the smallest value of nodes given more than once.
+        flat = np.ravel_multi_index(indices.T, npts)
+        order = np.lexsort((values, flat))
+        flat, values = flat[order], values[order]
+        first = np.ones(flat.size, dtype=bool)
+        first[1:] = flat[1:] != flat[:-1]
+        idxs = np.unravel_index(flat[first], npts)
+        values = values[first]
+
+        tt = self.traveltime.values
+        tt_old = tt[idxs]
+        keep = ~self.known[idxs] & (values <= tt_old)
+        idxs = tuple(idx[keep] for idx in idxs)
+        values, tt_old = values[keep], tt_old[keep]
+        is_new = self.unknown[idxs]
+        tt[idxs] = values
+        self.cy_traveltime._clear_cache()
+        self.known[idxs] = True
+        self.unknown[idxs] = False
+
+        trial = self.trial
+        for i in np.flatnonzero(~is_new & (values < tt_old)):
+            trial.update(idxs[0][i], idxs[1][i], idxs[2][i])
+        trial.push_many(np.stack([idx[is_new] for idx in idxs], axis=-1))
+        return (True)
+
+
+    def initialize_point_sources(self, coords, values=0, radius=2):
+        """
+        initialize_point_sources(self, coords, values=0, radius=2)
+
+        Initialize sources at arbitrary (off-grid) coordinates. Every
+        node within *radius* node intervals of a source along each
+        axis is initialized with the exact traveltime for the velocity
+        at the source, *values* plus the straight-line distance over
+        the velocity, and the nodes are handed to
+        :meth:`initialize_sources`.
+
+        :param coords: Coordinates of the sources, in the coordinate
+                       system of the solver.
+        :type coords: numpy.ndarray(shape=(N,3), dtype=numpy.float)
+        :param values: Traveltimes at the sources (e.g. origin times).
+        :type values: float or numpy.ndarray(shape=(N,), dtype=numpy.float)
+        :param radius: Half-width, in node intervals, of the region
+                       initialized around each source.
+        :type radius: float
+        :return: Returns True upon successful completion.
+        :rtype: bool
+        """
+        field = self.velocity
+        coords = np.asarray(coords, dtype=constants.DTYPE_REAL).reshape(-1, 3)
+        values = np.broadcast_to(
+            np.asarray(values, dtype=constants.DTYPE_REAL),
+            coords.shape[:1]
+        )
+        vv = field.resample(np.ascontiguousarray(coords))
+        if np.any(np.isnan(vv)):
+            raise (ValueError("Source coordinates must be inside the grid."))
+
+        npts = field.npts
+        min_coords = field.min_coords
+        node_intervals = field.node_intervals
+        iax_isnull = field.iax_isnull
+        # Fractional grid positions of the sources.
+        pos = np.zeros_like(coords)
+        pos[:, ~iax_isnull] = (
+            (coords - min_coords) / np.where(iax_isnull, 1, node_intervals)
+        )[:, ~iax_isnull]
+        nmax = int(np.ceil(radius))
+        offsets = [
+            np.zeros(1, dtype=np.intp) if iax_isnull[iax]
+            else np.arange(-nmax, nmax + 2)
+            for iax in range(3)
+        ]
+        offsets = np.stack(np.meshgrid(*offsets, indexing="ij"), axis=-1).reshape(-1, 3)
+        idxs = np.floor(pos).astype(np.intp)[:, np.newaxis] + offsets
+        inside = np.all(np.abs(idxs - pos[:, np.newaxis]) <= radius, axis=-1)
+
+        nodes = min_coords + idxs * node_intervals
+        nodes[..., iax_isnull] = coords[:, np.newaxis, iax_isnull]
+        for iax in range(3):
+            if field.iax_isperiodic[iax]:
+                idxs[..., iax] %= npts[iax]
+            else:
+                inside &= (idxs[..., iax] >= 0) & (idxs[..., iax] < npts[iax])
+
+        if self.coord_sys == "spherical":
+            nodes = transformations.sph2xyz(nodes)
+            coords = transformations.sph2xyz(coords)
+        dist = np.sqrt(np.sum(np.square(nodes - coords[:, np.newaxis]), axis=-1))
+        tt = values[:, np.newaxis] + dist / vv[:, np.newaxis]
+        return (self.initialize_sources(idxs[inside], tt[inside]))
+
+
+    def initialize_traveltime(self, values):
+        """
+        initialize_traveltime(self, values)
+
+        Initialize the solver from a traveltime volume, e.g. an
+        arbitrary boundary or the traveltimes of a previous solve:
+        every node with a finite value is handed to
+        :meth:`initialize_sources`.
+
+        :param values: Initial traveltimes; use numpy.inf for nodes to
+                       be solved for.
+        :type values: numpy.ndarray(shape=(N0,N1,N2), dtype=numpy.float)
+        :return: Returns True upon successful completion.
+        :rtype: bool
+        """
+        values = np.asarray(values, dtype=constants.DTYPE_REAL)
+        if values.shape != tuple(self.traveltime.npts):
+            raise (ValueError("values must have the shape of the grid."))
+        idxs = np.nonzero(np.isfinite(values))
+        return (self.initialize_sources(np.stack(idxs, axis=-1), values[idxs]))
+
+
+    def reset(self, velocity=None):
+        """
+        reset(self, velocity=None)
+
+        Reset the solver to its uninitialized state in place, so that
+        it can be reused for another solve on the same grid without
+        reallocating anything: traveltimes are refilled with
+        numpy.inf, every node is returned to *Unknown* and *Trial* is
+        emptied. Sources must be initialized again afterwards.
+
+        The *bucket_width* of a "bucket" *Trial* set is kept.
+
+        :param velocity: New velocity values, used without copying if
+                         already an array of
+                         pykonal.constants.DTYPE_REAL.
+        :type velocity: numpy.ndarray(shape=(N0,N1,N2), dtype=numpy.float)
+        :return: Returns True upon successful completion.
+        :rtype: bool
+        """
+        if velocity is not None:
+            self.velocity.values = velocity
+        if self.cy_traveltime is None:
+            return (True)
+        if self.cy_trial is not None:
+            self.cy_trial._clear()
+        self.traveltime.values.fill(np.inf)
+        self.cy_traveltime._clear_cache()
+        self.known.fill(False)
+        self.unknown.fill(True)
+        return (True)
+
+
     @cython.initializedcheck(False)
     cpdef constants.BOOL_t solve(EikonalSolver self):
         """
         solve(self)
 
-        Solve the Eikonal equation using the FMM.
+        Solve the Eikonal equation using the FMM (or the FSM, see
+        :attr:`method`).
+
+        The GIL is released while the wavefront is propagated, so
+        multiple solvers can be run concurrently from different
+        threads.
 
         :return: Returns True upon successful execution.
         :rtype:  bool
         """
-        cdef Py_ssize_t                           i, iax, idrxn, iheap
-        cdef Py_ssize_t[6][3]                     nbrs
-        cdef Py_ssize_t[3]                        nbr, switch, max_idx, active_idx
-        cdef Py_ssize_t[2]                        drxns = [-1, 1]
-        cdef Py_ssize_t[:,:,:]                    heap_index
-        cdef (Py_ssize_t, Py_ssize_t, Py_ssize_t) idx
-        cdef int                                  count_a = 0
-        cdef int                                  count_b = 0
-        cdef int                                  inbr
-        cdef int[2]                               order
-        cdef constants.REAL_t                     a, b, c, bfd, ffd, new
-        cdef constants.REAL_t[2]                  fdu
-        cdef constants.REAL_t[3]                  aa, bb, cc
+        cdef Py_ssize_t                           iax, iterations
+        cdef Py_ssize_t[3]                        max_idx
         cdef constants.REAL_t[:,:,:]              tt, vv
-        cdef constants.REAL_t[:,:,:,:]            norm
-        cdef constants.BOOL_t[3]                  iax_isperiodic,
+        cdef constants.REAL_t[3]                  node_intervals
+        cdef const constants.REAL_t[:,:,:,:]      norm
+        cdef constants.BOOL_t[3]                  iax_isperiodic
+        cdef int                                  kernel
         cdef constants.BOOL_t[:,:,:]              known, unknown
         cdef heapq.Heap                           trial
+        cdef unsigned char[::1]                   state
+        cdef SolverStats*                         stats
+        cdef double                               t
+
+        stats = self._stats_begin()
+        t = self.cy_stats_start
 
         for iax in range(3):
             max_idx[iax] = <Py_ssize_t> self.cy_traveltime.cy_npts[iax]
             iax_isperiodic[iax] = <constants.BOOL_t> self.cy_traveltime.cy_iax_isperiodic[iax]
+            node_intervals[iax] = self.cy_traveltime.cy_node_intervals[iax]
+        kernel = self._kernel()
 
         tt = self.traveltime.values
+        # tt is solved for in place, so drop the stale gradient.
+        self.cy_traveltime._clear_cache()
         vv = self.velocity.values
-        norm = self.velocity.norm
+        if kernel == GENERAL_KERNEL:
+            norm = self.velocity.norm
+        elif kernel != SWEEPING_KERNEL:
+            state = _padded_state(max_idx, kernel)
         known = self.known
         unknown = self.unknown
         trial = self.trial
-        heap_index = trial.cy_heap_index
+        if stats != NULL:
+            stats.solves = 1
+            stats.time_setup = _lap(&t)
+
+        if kernel == SWEEPING_KERNEL:
+            with nogil:
+                iterations = _sweep(
+                    tt,
+                    vv,
+                    node_intervals,
+                    unknown,
+                    max_idx,
+                    self.cy_sweep_tolerance,
+                    self.cy_max_sweep_iterations,
+                    stats
+                )
+            if stats != NULL:
+                stats.time_propagate = _lap(&t)
+            if iterations < 0:
+                _warn_not_converged(self.cy_max_sweep_iterations)
+            # Leave the sets as the FMM would.
+            reached = np.isfinite(self.traveltime.values)
+            self.known[reached] = True
+            self.unknown[reached] = False
+            trial._clear()
+            if stats != NULL:
+                stats.time_finalize = _lap(&t)
+            self._stats_end(stats)
+            return (True)
+
+        with nogil:
+            if kernel == CARTESIAN_2D_KERNEL:
+                _march_2d(
+                    tt, vv, node_intervals, known, unknown, trial, max_idx, &state[0], NULL, stats
+                )
+            elif kernel == CARTESIAN_KERNEL:
+                _march_cartesian(
+                    tt, vv, node_intervals, known, unknown, trial, max_idx, &state[0], NULL, stats
+                )
+            else:
+                _march(tt, vv, norm, known, unknown, trial, max_idx, iax_isperiodic, NULL, stats)
+        if stats != NULL:
+            stats.time_propagate = _lap(&t)
+        self._stats_end(stats)
 
+        return (True)
 
-        while trial.cy_keys.size() > 0:
-            # Let Active be the point in Trial with the smallest
-            # traveltime value.
-            idx = trial.pop()
-            active_idx = [idx[0], idx[1], idx[2]]
-            known[active_idx[0], active_idx[1], active_idx[2]] = True
 
-            # Determine the indices of neighbouring nodes.
-            inbr = 0
-            for iax in range(3):
-                switch = [0, 0, 0]
-                for idrxn in range(2):
-                    switch[iax] = drxns[idrxn]
-                    for jax in range(3):
-                        if iax_isperiodic[jax]:
-                            nbrs[inbr][jax] = (
-                                  active_idx[jax]
-                                + switch[jax]
-                                + max_idx[jax]
-                            )\
-                            % max_idx[jax]
-                        else:
-                            nbrs[inbr][jax] = active_idx[jax] + switch[jax]
-                    inbr += 1
-
-            # Recompute the traveltime values at all Trial neighbours
-            # of Active by solving the piecewise quadratic equation.
-            for i in range(6):
-                nbr    = nbrs[i]
-                if not stencil(nbr[0], nbr[1], nbr[2], max_idx[0], max_idx[1], max_idx[2]) or known[nbr[0], nbr[1], nbr[2]]:
-                    continue
-                if vv[nbr[0], nbr[1], nbr[2]] > 0:
-                    for iax in range(3):
-                        switch = [0, 0, 0]
-                        idrxn = 0
-                        if norm[nbr[0], nbr[1], nbr[2], iax] == 0:
-                            aa[iax], bb[iax], cc[iax] = 0, 0, 0
-                            continue
-                        for idrxn in range(2):
-                            switch[iax] = drxns[idrxn]
-                            nbr1_i1 = (nbr[0]+switch[0]+max_idx[0]) % max_idx[0]\
-                                if iax_isperiodic[0] else nbr[0]+switch[0]
-                            nbr1_i2 = (nbr[1]+switch[1]+max_idx[1]) % max_idx[1]\
-                                if iax_isperiodic[1] else nbr[1]+switch[1]
-                            nbr1_i3 = (nbr[2]+switch[2]+max_idx[2]) % max_idx[2]\
-                                if iax_isperiodic[2] else nbr[2]+switch[2]
-                            nbr2_i1 = (nbr[0]+2*switch[0]+max_idx[0]) % max_idx[0]\
-                                if iax_isperiodic[0] else nbr[0]+2*switch[0]
-                            nbr2_i2 = (nbr[1]+2*switch[1]+max_idx[1]) % max_idx[1]\
-                                if iax_isperiodic[1] else nbr[1]+2*switch[1]
-                            nbr2_i3 = (nbr[2]+2*switch[2]+max_idx[2]) % max_idx[2]\
-                                if iax_isperiodic[2] else nbr[2]+2*switch[2]
-                            if (
-                                (
-                                   drxns[idrxn] == -1
-                                   and (nbr[iax] > 1 or iax_isperiodic[iax])
-                                )
-                                or
-                                (
-                                    drxns[idrxn] == 1
-                                    and (nbr[iax] < max_idx[iax] - 2 or iax_isperiodic[iax])
-                                )
-                            )\
-                                and known[nbr2_i1, nbr2_i2, nbr2_i3]\
-                                and known[nbr1_i1, nbr1_i2, nbr1_i3]\
-                                and tt[nbr2_i1, nbr2_i2, nbr2_i3] \
-                                    <= tt[nbr1_i1, nbr1_i2, nbr1_i3]\
-                            :
-                                order[idrxn] = 2
-                                fdu[idrxn]  = drxns[idrxn] * (
-                                    - 3 * tt[nbr[0], nbr[1], nbr[2]]
-                                    + 4 * tt[nbr1_i1, nbr1_i2, nbr1_i3]
-                                    -     tt[nbr2_i1, nbr2_i2, nbr2_i3]
-                                ) / (2 * norm[nbr[0], nbr[1], nbr[2], iax])
-                            elif (
-                                (
-                                    drxns[idrxn] == -1
-                                    and (nbr[iax] > 0 or iax_isperiodic[iax])
-                                )
-                                or (
-                                    drxns[idrxn] ==  1
-                                    and (nbr[iax] < max_idx[iax] - 1 or iax_isperiodic[iax])
-                                )
-                            )\
-                                and known[nbr1_i1, nbr1_i2, nbr1_i3]\
-                            :
-                                order[idrxn] = 1
-                                fdu[idrxn] = drxns[idrxn] * (
-                                    tt[nbr1_i1, nbr1_i2, nbr1_i3]
-                                  - tt[nbr[0], nbr[1], nbr[2]]
-                                ) / norm[nbr[0], nbr[1], nbr[2], iax]
-                            else:
-                                order[idrxn], fdu[idrxn] = 0, 0
-                        if fdu[0] > -fdu[1]:
-                            # Do the update using the backward operator
-                            idrxn, switch[iax] = 0, -1
-                        else:
-                            # Do the update using the forward operator
-                            idrxn, switch[iax] = 1, 1
-                        nbr1_i1 = (nbr[0]+switch[0]+max_idx[0]) % max_idx[0]\
-                            if iax_isperiodic[0] else nbr[0]+switch[0]
-                        nbr1_i2 = (nbr[1]+switch[1]+max_idx[1]) % max_idx[1]\
-                            if iax_isperiodic[1] else nbr[1]+switch[1]
-                        nbr1_i3 = (nbr[2]+switch[2]+max_idx[2]) % max_idx[2]\
-                            if iax_isperiodic[2] else nbr[2]+switch[2]
-                        nbr2_i1 = (nbr[0]+2*switch[0]+max_idx[0]) % max_idx[0]\
-                            if iax_isperiodic[0] else nbr[0]+2*switch[0]
-                        nbr2_i2 = (nbr[1]+2*switch[1]+max_idx[1]) % max_idx[1]\
-                            if iax_isperiodic[1] else nbr[1]+2*switch[1]
-                        nbr2_i3 = (nbr[2]+2*switch[2]+max_idx[2]) % max_idx[2]\
-                            if iax_isperiodic[2] else nbr[2]+2*switch[2]
-                        if order[idrxn] == 2:
-                            aa[iax] = 9 / (4*norm[nbr[0], nbr[1], nbr[2], iax] ** 2)
-                            bb[iax] = (
-                                6 * tt[nbr2_i1, nbr2_i2, nbr2_i3]
-                             - 24 * tt[nbr1_i1, nbr1_i2, nbr1_i3]
-                            ) / (4 * norm[nbr[0], nbr[1], nbr[2], iax]**2)
-                            cc[iax] = (
-                                       tt[nbr2_i1, nbr2_i2, nbr2_i3]**2
-                                -  8 * tt[nbr2_i1, nbr2_i2, nbr2_i3]
-                                     * tt[nbr1_i1, nbr1_i2, nbr1_i3]
-                                + 16 * tt[nbr1_i1, nbr1_i2, nbr1_i3]**2
-                            ) / (4 * norm[nbr[0], nbr[1], nbr[2], iax]**2)
-                        elif order[idrxn] == 1:
-                            aa[iax] = 1 / norm[nbr[0], nbr[1], nbr[2], iax]**2
-                            bb[iax] = -2 * tt[nbr1_i1, nbr1_i2, nbr1_i3]\
-                                / norm[nbr[0], nbr[1], nbr[2], iax] ** 2
-                            cc[iax] = tt[nbr1_i1, nbr1_i2, nbr1_i3]**2\
-                                / norm[nbr[0], nbr[1], nbr[2], iax]**2
-                        elif order[idrxn] == 0:
-                            aa[iax], bb[iax], cc[iax] = 0, 0, 0
-                    a = aa[0] + aa[1] + aa[2]
-                    if a == 0:
-                        count_a += 1
-                        continue
-                    b = bb[0] + bb[1] + bb[2]
-                    c = cc[0] + cc[1] + cc[2] - 1/vv[nbr[0], nbr[1], nbr[2]]**2
-                    if b**2 < 4*a*c:
-                        # This is a hack to solve the quadratic equation
-                        # when the discrimnant is negative. This hack
-                        # simply sets the discriminant to zero.
-                        new = -b / (2*a)
-                        count_b += 1
-                    else:
-                        new = (-b + sqrt(b**2 - 4*a*c)) / (2*a)
-                    if new < tt[nbr[0], nbr[1], nbr[2]]:
-                        tt[nbr[0], nbr[1], nbr[2]] = new
-                        # Tag as Trial all neighbours of Active that are not
-                        # Alive. If the neighbour is in Far, remove it from
-                        # that list and add it to Trial.
-                        if unknown[nbr[0], nbr[1], nbr[2]]:
-                            trial.push(nbr[0], nbr[1], nbr[2])
-                            unknown[nbr[0], nbr[1], nbr[2]] = False
-                        else:
-                            trial.sift_down(0, heap_index[nbr[0], nbr[1], nbr[2]])
+    @cython.initializedcheck(False)
+    cpdef constants.BOOL_t solve_incremental(
+            EikonalSolver self,
+            constants.REAL_t[:,:,:] baseline,
+            constants.BOOL_t[:,:,:] changed
+    ):
+        """
+        solve_incremental(self, baseline, changed)
+
+        Re-solve the Eikonal equation after the velocity changed at a
+        subset of nodes, re-propagating only the part of the wavefront
+        that the change can affect.
+
+        The solver must hold its initial conditions, as for
+        :meth:`solve`. Let tau be the earliest *baseline* arrival at a
+        changed node or one of its neighbours. Nodes that arrive
+        before tau keep their baseline values and the wavefront is
+        restarted from the boundary of that region, so the cost scales
+        with the size of the downstream region rather than the grid.
+
+        The fast sweeping method has no notion of arrival order, so
+        with *method* "fsm" this is a full :meth:`solve`.
+
+        :param baseline: Traveltime field solved with the same initial
+                         conditions before the velocity was modified.
+        :type baseline: numpy.ndarray(shape=(N0,N1,N2), dtype=numpy.float)
+        :param changed: Mask of nodes whose velocity differs from the
+                        one *baseline* was solved with.
+        :type changed: numpy.ndarray(shape=(N0,N1,N2), dtype=numpy.bool)
+        :return: Returns True upon successful execution.
+        :rtype:  bool
+        """
+        cdef Py_ssize_t                           iax
+        cdef Py_ssize_t[3]                        max_idx
+        cdef constants.REAL_t[:,:,:]              tt, vv
+        cdef constants.REAL_t[3]                  node_intervals
+        cdef const constants.REAL_t[:,:,:,:]      norm
+        cdef constants.BOOL_t[3]                  iax_isperiodic
+        cdef int                                  kernel
+        cdef constants.BOOL_t[:,:,:]              known, unknown
+        cdef constants.BOOL_t[::1]                fixed
+        cdef heapq.Heap                           trial
+        cdef unsigned char[::1]                   state
+        cdef SolverStats*                         stats
+        cdef double                               t
+
+        if not (
+            np.all(np.asarray(baseline).shape == self.velocity.npts)
+            and np.all(np.asarray(changed).shape == self.velocity.npts)
+        ):
+            raise (ValueError("Shape of baseline or changed does not match npts attribute."))
+
+        if self.cy_method == "fsm":
+            return (self.solve())
+
+        stats = self._stats_begin()
+        t = self.cy_stats_start
+
+        for iax in range(3):
+            max_idx[iax] = <Py_ssize_t> self.cy_traveltime.cy_npts[iax]
+            iax_isperiodic[iax] = <constants.BOOL_t> self.cy_traveltime.cy_iax_isperiodic[iax]
+            node_intervals[iax] = self.cy_traveltime.cy_node_intervals[iax]
+        kernel = self._kernel()
+
+        tt = self.traveltime.values
+        # tt is solved for in place, so drop the stale gradient.
+        self.cy_traveltime._clear_cache()
+        vv = self.velocity.values
+        if kernel == GENERAL_KERNEL:
+            norm = self.velocity.norm
+        elif kernel != SWEEPING_KERNEL:
+            state = _padded_state(max_idx, kernel)
+        fixed = np.empty(np.prod(max_idx), dtype=constants.DTYPE_BOOL)
+        known = self.known
+        unknown = self.unknown
+        trial = self.trial
+        if stats != NULL:
+            stats.solves = 1
+            stats.time_setup = _lap(&t)
+
+        with nogil:
+            _restart_from_baseline(
+                tt, known, unknown, trial, baseline, changed, max_idx, iax_isperiodic, &fixed[0]
+            )
+            if stats != NULL:
+                stats.time_restart = _lap(&t)
+            if kernel == CARTESIAN_2D_KERNEL:
+                _march_2d(
+                    tt, vv, node_intervals, known, unknown, trial, max_idx, &state[0], &fixed[0], stats
+                )
+            elif kernel == CARTESIAN_KERNEL:
+                _march_cartesian(
+                    tt, vv, node_intervals, known, unknown, trial, max_idx, &state[0], &fixed[0], stats
+                )
+            else:
+                _march(
+                    tt, vv, norm, known, unknown, trial, max_idx, iax_isperiodic, &fixed[0], stats
+                )
+            if stats != NULL:
+                stats.time_propagate = _lap(&t)
+        self._stats_end(stats)
+
         return (True)
 
 
+    @cython.initializedcheck(False)
+    cpdef np.ndarray[constants.REAL_t, ndim=4] solve_batch(
+            EikonalSolver self,
+            constants.REAL_t[:,:,:,:] velocities,
+            constants.REAL_t[:,:,:] baseline=None,
+            constants.BOOL_t[:,:,:,:] changed=None
+    ):
+        """
+        solve_batch(self, velocities, baseline=None, changed=None)
+
+        Solve the Eikonal equation for a stack of velocity models that
+        share the grid and initial conditions of this solver.
+
+        The traveltime values and the *Known*, *Unknown*, and *Trial*
+        sets configured on the solver (e.g., a source node pushed onto
+        *Trial*) serve as the initial conditions of every realization.
+        The solver's heap and state arrays are reused as the workspace
+        for all realizations and the GIL is released for the entire
+        batch. The solver is restored to its initial conditions upon
+        return, so it can be reused for subsequent batches.
+
+        If *baseline* and *changed* are given, each realization is
+        solved incrementally (see :meth:`solve_incremental`) from the
+        *baseline* traveltime field, *changed[k]* flagging the nodes
+        where *velocities[k]* differs from the baseline velocity
+        (with *method* "fsm", they are ignored and every realization
+        is solved in full).
+
+        :param velocities: Stack of velocity models, one per
+                           realization, each sampled on the grid of
+                           self.velocity.
+        :type velocities: numpy.ndarray(shape=(K,N0,N1,N2), dtype=numpy.float)
+        :param baseline: Traveltime field of the baseline velocity model.
+        :type baseline: numpy.ndarray(shape=(N0,N1,N2), dtype=numpy.float)
+        :param changed: Per-realization mask of changed nodes.
+        :type changed: numpy.ndarray(shape=(K,N0,N1,N2), dtype=numpy.bool)
+        :return: Traveltime field of each realization.
+        :rtype: numpy.ndarray(shape=(K,N0,N1,N2), dtype=numpy.float)
+        """
+        cdef Py_ssize_t                           i, i1, i2, i3, iax, k
+        cdef Py_ssize_t                           iterations, max_sweep_iterations
+        cdef Py_ssize_t[3]                        max_idx
+        cdef cpp_vector[heapq.Index3D]            keys0
+        cdef constants.REAL_t[:,:,:]              tt, tt0
+        cdef constants.REAL_t[3]                  node_intervals
+        cdef const constants.REAL_t[:,:,:,:]      norm
+        cdef constants.REAL_t[:,:,:,:]            out
+        cdef constants.BOOL_t[3]                  iax_isperiodic
+        cdef int                                  kernel
+        cdef constants.BOOL_t[:,:,:]              known, known0, unknown, unknown0
+        cdef constants.BOOL_t[::1]                fixed
+        cdef constants.BOOL_t*                    pfixed = NULL
+        cdef heapq.Heap                           trial
+        cdef unsigned char[::1]                   state
+        cdef constants.REAL_t                     sweep_tolerance
+        cdef bint                                 incremental, converged
+        cdef SolverStats*                         stats
+        cdef double                               t
+
+        if not np.all(np.asarray(velocities).shape[1:] == self.velocity.npts):
+            raise (ValueError("Shape of velocities does not match npts attribute."))
+
+        incremental = baseline is not None
+        if incremental != (changed is not None):
+            raise (ValueError("baseline and changed must be given together."))
+        if incremental and not (
+            np.all(np.asarray(baseline).shape == self.velocity.npts)
+            and np.asarray(changed).shape == np.asarray(velocities).shape
+        ):
+            raise (ValueError("Shape of baseline or changed does not match velocities."))
+
+        stats = self._stats_begin()
+        t = self.cy_stats_start
+
+        for iax in range(3):
+            max_idx[iax] = <Py_ssize_t> self.cy_traveltime.cy_npts[iax]
+            iax_isperiodic[iax] = <constants.BOOL_t> self.cy_traveltime.cy_iax_isperiodic[iax]
+            node_intervals[iax] = self.cy_traveltime.cy_node_intervals[iax]
+        kernel = self._kernel()
+        incremental = incremental and kernel != SWEEPING_KERNEL
+        sweep_tolerance = self.cy_sweep_tolerance
+        max_sweep_iterations = self.cy_max_sweep_iterations
+        converged = True
+
+        tt = self.traveltime.values
+        if kernel == GENERAL_KERNEL:
+            norm = self.velocity.norm
+        elif kernel != SWEEPING_KERNEL:
+            state = _padded_state(max_idx, kernel)
+        if incremental:
+            fixed = np.empty(np.prod(max_idx), dtype=constants.DTYPE_BOOL)
+            pfixed = &fixed[0]
+        known = self.known
+        unknown = self.unknown
+        trial = self.trial
+
+        # Snapshot the initial conditions.
+        tt0 = np.array(tt)
+        known0 = np.array(known)
+        unknown0 = np.array(unknown)
+        keys0 = trial._keys()
+
+        out = np.empty(
+            (velocities.shape[0], max_idx[0], max_idx[1], max_idx[2]),
+            dtype=constants.DTYPE_REAL
+        )
+        if stats != NULL:
+            stats.solves = velocities.shape[0]
+            stats.time_setup = _lap(&t)
+
+        with nogil:
+            for k in range(velocities.shape[0]):
+                if incremental:
+                    _restart_from_baseline(
+                        tt,
+                        known,
+                        unknown,
+                        trial,
+                        baseline,
+                        changed[k],
+                        max_idx,
+                        iax_isperiodic,
+                        pfixed
+                    )
+                    if stats != NULL:
+                        stats.time_restart += _lap(&t)
+                if kernel == SWEEPING_KERNEL:
+                    iterations = _sweep(
+                        tt,
+                        velocities[k],
+                        node_intervals,
+                        unknown,
+                        max_idx,
+                        sweep_tolerance,
+                        max_sweep_iterations,
+                        stats
+                    )
+                    converged = converged and iterations >= 0
+                elif kernel == CARTESIAN_2D_KERNEL:
+                    _march_2d(
+                        tt,
+                        velocities[k],
+                        node_intervals,
+                        known,
+                        unknown,
+                        trial,
+                        max_idx,
+                        &state[0],
+                        pfixed,
+                        stats
+                    )
+                elif kernel == CARTESIAN_KERNEL:
+                    _march_cartesian(
+                        tt,
+                        velocities[k],
+                        node_intervals,
+                        known,
+                        unknown,
+                        trial,
+                        max_idx,
+                        &state[0],
+                        pfixed,
+                        stats
+                    )
+                else:
+                    _march(
+                        tt,
+                        velocities[k],
+                        norm,
+                        known,
+                        unknown,
+                        trial,
+                        max_idx,
+                        iax_isperiodic,
+                        pfixed,
+                        stats
+                    )
+                if stats != NULL:
+                    stats.time_propagate += _lap(&t)
+                for i1 in range(max_idx[0]):
+                    for i2 in range(max_idx[1]):
+                        for i3 in range(max_idx[2]):
+                            out[k, i1, i2, i3] = tt[i1, i2, i3]
+                            # Restore the initial conditions.
+                            tt[i1, i2, i3] = tt0[i1, i2, i3]
+                            known[i1, i2, i3] = known0[i1, i2, i3]
+                            unknown[i1, i2, i3] = unknown0[i1, i2, i3]
+                trial._clear()
+                for i in range(keys0.size()):
+                    trial._push(keys0[i].i1, keys0[i].i2, keys0[i].i3)
+                if stats != NULL:
+                    stats.time_finalize += _lap(&t)
+        self._stats_end(stats)
+
+        if not converged:
+            _warn_not_converged(max_sweep_iterations)
+
+        return (np.asarray(out))
+
+
+    def _default_bucket_width(self):
+        """
+        One eighth of the smallest traveltime increment along a grid
+        axis (smallest node interval / largest velocity).
+        """
+        if self.coord_sys != "spherical":
+            norm = self.velocity.node_intervals[~self.velocity.iax_isnull]
+        else:
+            norm = self.velocity.norm[..., ~self.velocity.iax_isnull]
+        vmax = np.nanmax(self.velocity.values)
+        if not vmax > 0:
+            raise (ValueError("Velocity must be set before using a BucketQueue."))
+        return (norm[norm > 0].min() / vmax / 8)
+
+
+    cdef int _kernel(EikonalSolver self) except -1:
+        """
+        The kernel used to propagate the wavefront.
+        """
+        if self.cy_method == "fsm":
+            return (SWEEPING_KERNEL)
+        if self.cy_fast_path and self.cy_coord_sys == "cartesian":
+            return (CARTESIAN_KERNEL)
+        return (GENERAL_KERNEL)
+
+
+    cdef SolverStats* _stats_begin(EikonalSolver self) except? NULL:
+        """
+        Reset the statistics for a call to a solve method, or return
+        NULL if they are not collected.
+        """
+        self.cy_has_stats = False
+        if not self.cy_collect_stats:
+            return (NULL)
+        memset(&self.cy_stats, 0, sizeof(SolverStats))
+        self.cy_stats_counters = (<heapq.Heap>self.trial).cy_counters
+        self.cy_stats_start = _wtime()
+        return (&self.cy_stats)
+
+
+    cdef void _stats_end(EikonalSolver self, SolverStats* stats):
+        """
+        Complete the statistics begun by :meth:`_stats_begin`.
+        """
+        cdef heapq.HeapCounters counters
+
+        if stats == NULL:
+            return
+        counters = self.cy_trial.cy_counters
+        stats.pops = counters.pops - self.cy_stats_counters.pops
+        stats.pushes = counters.pushes - self.cy_stats_counters.pushes
+        stats.updates = counters.updates - self.cy_stats_counters.updates
+        stats.sift_steps = counters.sift_steps - self.cy_stats_counters.sift_steps
+        stats.time_total = _wtime() - self.cy_stats_start
+        self.cy_has_stats = True
+
+
     cpdef np.ndarray[constants.REAL_t, ndim=2] trace_ray(
             EikonalSolver self,
             constants.REAL_t[:] end
@@ -415,6 +1065,169 @@ cdef class EikonalSolver(object):
         return (self.traveltime.trace_ray(end))
 
 
+    def trace_rays(
+        self,
+        ends,
+        method="rk4",
+        step_size=None,
+        max_points=None,
+        lazy_gradient=False
+    ):
+        """
+        trace_rays(self, ends, method="rk4", step_size=None, max_points=None, lazy_gradient=False)
+
+        An alias to self.traveltime.trace_rays().
+        """
+        return (self.traveltime.trace_rays(
+            ends, method, step_size, max_points, lazy_gradient
+        ))
+
+
+
+cdef class EikonalSolver2D(EikonalSolver):
+    """
+    Solver for the Eikonal equation on 2D Cartesian grids.
+
+    As elsewhere in PyKonal, a 2D grid is a grid with a single node
+    along the third axis; its (N0, N1, 1) arrays have the memory
+    layout of (N0, N1) arrays. The API is that of
+    :class:`EikonalSolver`, but the wavefront is propagated with a
+    4-neighbour stencil on a 2D (ghost-padded) grid, and rays are
+    traced in 2D.
+
+    .. code-block:: python
+
+       import numpy as np
+       import pykonal
+
+       solver = pykonal.EikonalSolver2D()
+       solver.velocity.min_coords = 0, 0, 0
+       solver.velocity.node_intervals = 1, 1, 1
+       solver.velocity.npts = 64, 64, 1
+       solver.velocity.values = np.ones(solver.velocity.npts)
+       src_idx = (0, 0, 0)
+       solver.traveltime.values[src_idx] = 0
+       solver.unknown[src_idx] = False
+       solver.trial.push(*src_idx)
+       solver.solve()
+       ray = solver.trace_ray(np.array([40., 30.]))
+    """
+
+    def __init__(self, heap_type="binary", bucket_width=None, method="fmm"):
+        super(EikonalSolver2D, self).__init__(
+            coord_sys="cartesian",
+            heap_type=heap_type,
+            bucket_width=bucket_width,
+            method=method
+        )
+
+
+    cdef int _kernel(EikonalSolver2D self) except -1:
+        if self.cy_traveltime.cy_npts[2] != 1:
+            raise (ValueError("EikonalSolver2D requires npts[2] == 1."))
+        if self.cy_method == "fsm":
+            return (SWEEPING_KERNEL)
+        if self.cy_fast_path:
+            return (CARTESIAN_2D_KERNEL)
+        return (GENERAL_KERNEL)
+
+
+    cpdef np.ndarray[constants.REAL_t, ndim=2] trace_ray(
+            EikonalSolver2D self,
+            constants.REAL_t[:] end
+    ):
+        """
+        trace_ray(self, end)
+
+        Trace the ray ending at *end* in reverse direction by taking
+        small steps along the path of steepest descent of the
+        bilinearly interpolated traveltime field, as
+        :meth:`pykonal.fields.ScalarField3D.trace_ray` does in 3D.
+        The resulting ray is reversed before being returned, so it is
+        in the normal forward-time orientation.
+
+        :param end: Coordinates of the ray's end point. A third
+                    coordinate, if given, is ignored.
+        :type end: numpy.ndarray(shape=(2,), dtype=numpy.float)
+
+        :return: The ray path ending at *end*.
+        :rtype:  numpy.ndarray(shape=(N,2), dtype=numpy.float)
+        """
+        cdef cpp_vector[constants.REAL_t]         ray
+        cdef constants.REAL_t                     norm, step_size, value, value_1back
+        cdef constants.REAL_t[2]                  gg, min_coords, node_intervals, point
+        cdef constants.REAL_t[:,:]                tt
+        cdef constants.REAL_t[:,:,:]              grad
+        cdef Py_ssize_t                           iax
+        cdef np.ndarray[constants.REAL_t, ndim=1] ray_np
+
+        if self.traveltime.npts[0] < 2 or self.traveltime.npts[1] < 2:
+            raise (ValueError("Tracing rays requires npts[0], npts[1] >= 2."))
+
+        for iax in range(2):
+            min_coords[iax] = self.cy_traveltime.cy_min_coords[iax]
+            node_intervals[iax] = self.cy_traveltime.cy_node_intervals[iax]
+            point[iax] = end[iax]
+            ray.push_back(point[iax])
+        tt = self.traveltime.values[:, :, 0]
+        grad = self.traveltime.gradient.values[:, :, 0, :2]
+        step_size = min(node_intervals[0], node_intervals[1]) / 4
+        value = INFINITY
+
+        while True:
+            value_1back = value
+            value = _bilinear(tt, point, min_coords, node_intervals)
+            if not value < value_1back:
+                ray.resize(ray.size()-2) # drop bad pt
+                break
+            for iax in range(2):
+                gg[iax] = _bilinear(grad[:, :, iax], point, min_coords, node_intervals)
+            norm = sqrt(gg[0]**2 + gg[1]**2)
+            if isnan(norm):
+                raise (ValueError("Encountered NaN gradient."))
+            for iax in range(2):
+                point[iax] -= step_size * gg[iax] / norm
+                ray.push_back(point[iax])
+
+        ray_np = np.empty(ray.size(), dtype=constants.DTYPE_REAL)
+        for iax in range(ray_np.size):
+            ray_np[iax] = ray[iax]
+        return (np.flipud(ray_np.reshape(-1, 2)))
+
+
+    def trace_rays(
+        self,
+        ends,
+        method="rk4",
+        step_size=None,
+        max_points=None,
+        lazy_gradient=False
+    ):
+        """
+        trace_rays(self, ends, method="rk4", step_size=None, max_points=None, lazy_gradient=False)
+
+        Trace the rays ending at each of *ends* with
+        :meth:`pykonal.fields.ScalarField3D.trace_rays`, in 2D.
+
+        :param ends: Coordinates of the rays' end points. A third
+                     coordinate, if given, is ignored.
+        :type ends: numpy.ndarray(shape=(N,2), dtype=numpy.float)
+
+        :return: The ray paths, padded with NaN, and the number of
+                 points of each.
+        :rtype:  tuple(numpy.ndarray(shape=(N,M,2), dtype=numpy.float),
+                 numpy.ndarray(shape=(N,), dtype=numpy.int))
+        """
+        ends = np.atleast_2d(np.asarray(ends, dtype=constants.DTYPE_REAL))
+        ends_3d = np.empty((ends.shape[0], 3), dtype=constants.DTYPE_REAL)
+        ends_3d[:, :2] = ends[:, :2]
+        ends_3d[:, 2] = self.traveltime.min_coords[2]
+        rays, npts = self.traveltime.trace_rays(
+            ends_3d, method, step_size, max_points, lazy_gradient
+        )
+        return (rays[..., :2], npts)
+
+
 
 
 class PointSourceSolver(EikonalSolver):
@@ -430,8 +1243,12 @@ class PointSourceSolver(EikonalSolver):
     using some reasonable values if the user does not manually configure
     it.
     """
-    def __init__(self, coord_sys="cartesian"):
-        super(PointSourceSolver, self).__init__(coord_sys=coord_sys)
+    def __init__(self, coord_sys="cartesian", heap_type="binary", bucket_width=None):
+        super(PointSourceSolver, self).__init__(
+            coord_sys=coord_sys,
+            heap_type=heap_type,
+            bucket_width=bucket_width
+        )
 
     @property
     def dphi(self):
@@ -519,7 +1336,10 @@ class PointSourceSolver(EikonalSolver):
         equation in the near-field region.
         """
         if not hasattr(self, "_near_field"):
-            self._near_field = EikonalSolver(coord_sys="spherical")
+            self._near_field = EikonalSolver(
+                coord_sys="spherical",
+                heap_type=self.heap_type
+            )
         return (self._near_field)
 
     @property
@@ -557,14 +1377,13 @@ class PointSourceSolver(EikonalSolver):
         :return: Returns True upon successful completion.
         :rtype: bool
         """
-        for it in range(self.ntheta):
-            for ip in range(self.nphi):
-                idx = (0, it, ip)
-                vv = self.near_field.vv.values[idx]
-                if not np.isnan(vv):
-                    self.near_field.tt.values[idx] = self.drho / vv
-                    self.near_field.unknown[idx] = False
-                    self.near_field.trial.push(*idx)
+        vv = self.near_field.vv.values[0]
+        idxs = np.argwhere(~np.isnan(vv))
+        self.near_field.initialize_sources(
+            np.insert(idxs, 0, 0, axis=1),
+            self.drho / vv[~np.isnan(vv)]
+        )
+        return (True)
 
 
     def initialize_far_field_narrow_band(self) -> bool:
@@ -575,11 +1394,8 @@ class PointSourceSolver(EikonalSolver):
         :return: Returns True upon successful completion.
         :rtype: bool
         """
-        # Update the FMM state variables.
-        for idx in np.argwhere(~np.isinf(self.tt.values)):
-            idx = tuple(idx)
-            self.unknown[idx] = False
-            self.trial.push(*idx)
+        self.initialize_traveltime(self.tt.values)
+        return (True)
 
 
     def interpolate_near_field_traveltime_onto_far_field(self) -> bool:
@@ -684,10 +1500,915 @@ class PointSourceSolver(EikonalSolver):
 
 
 
+@cython.initializedcheck(False)
+cdef void _march(
+        constants.REAL_t[:,:,:]         tt,
+        constants.REAL_t[:,:,:]         vv,
+        const constants.REAL_t[:,:,:,:] norm,
+        constants.BOOL_t[:,:,:]         known,
+        constants.BOOL_t[:,:,:]         unknown,
+        heapq.Heap                      trial,
+        Py_ssize_t*                     max_idx,
+        constants.BOOL_t*               iax_isperiodic,
+        constants.BOOL_t*               fixed,
+        SolverStats*                    stats
+) noexcept nogil:
+    """
+    Propagate the wavefront from the nodes in *Trial* until no nodes
+    remain in *Trial*, updating *tt*, *known*, and *unknown* in place,
+    and counting the updates in *stats* unless it is NULL.
+
+    Unless it is NULL, *fixed* flags (in C order) the *Trial* nodes
+    that hold their final values: they are never updated.
+    """
+    cdef Py_ssize_t                           i, iax, jax, idrxn
+    cdef Py_ssize_t                           nbr1_i1, nbr1_i2, nbr1_i3
+    cdef Py_ssize_t                           nbr2_i1, nbr2_i2, nbr2_i3
+    cdef Py_ssize_t[6][3]                     nbrs
+    cdef Py_ssize_t[3]                        switch
+    cdef Py_ssize_t*                          nbr
+    cdef Py_ssize_t[2]                        drxns = [-1, 1]
+    cdef heapq.Index3D                        active_idx
+    cdef long long                            count_a = 0
+    cdef long long                            count_b = 0
+    cdef long long                            count_evaluated = 0
+    cdef long long                            count_second = 0
+    cdef long long                            count_accepted = 0
+    cdef int                                  inbr, highest
+    cdef int[2]                               order
+    cdef constants.WORK_t                     a, b, c, new, tt1, tt2
+    cdef constants.WORK_t[2]                  fdu
+    cdef constants.WORK_t[3]                  aa, bb, cc
+
+    while trial._size() > 0:
+        # Let Active be the point in Trial with the smallest
+        # traveltime value.
+        active_idx = trial._pop()
+        known[active_idx.i1, active_idx.i2, active_idx.i3] = True
+
+        # Determine the indices of neighbouring nodes.
+        inbr = 0
+        for iax in range(3):
+            switch[0], switch[1], switch[2] = 0, 0, 0
+            for idrxn in range(2):
+                switch[iax] = drxns[idrxn]
+                nbrs[inbr][0] = _wrap(active_idx.i1 + switch[0], max_idx[0], iax_isperiodic[0])
+                nbrs[inbr][1] = _wrap(active_idx.i2 + switch[1], max_idx[1], iax_isperiodic[1])
+                nbrs[inbr][2] = _wrap(active_idx.i3 + switch[2], max_idx[2], iax_isperiodic[2])
+                inbr += 1
+
+        # Recompute the traveltime values at all Trial neighbours
+        # of Active by solving the piecewise quadratic equation.
+        for i in range(6):
+            nbr = nbrs[i]
+            if not stencil(nbr[0], nbr[1], nbr[2], max_idx[0], max_idx[1], max_idx[2]) or known[nbr[0], nbr[1], nbr[2]]:
+                continue
+            if fixed != NULL and fixed[(nbr[0] * max_idx[1] + nbr[1]) * max_idx[2] + nbr[2]]:
+                continue
+            if vv[nbr[0], nbr[1], nbr[2]] > 0:
+                count_evaluated += 1
+                highest = 0
+                for iax in range(3):
+                    switch[0], switch[1], switch[2] = 0, 0, 0
+                    idrxn = 0
+                    if norm[nbr[0], nbr[1], nbr[2], iax] == 0:
+                        aa[iax], bb[iax], cc[iax] = 0, 0, 0
+                        continue
+                    for idrxn in range(2):
+                        switch[iax] = drxns[idrxn]
+                        nbr1_i1 = _wrap(nbr[0]+switch[0], max_idx[0], iax_isperiodic[0])
+                        nbr1_i2 = _wrap(nbr[1]+switch[1], max_idx[1], iax_isperiodic[1])
+                        nbr1_i3 = _wrap(nbr[2]+switch[2], max_idx[2], iax_isperiodic[2])
+                        nbr2_i1 = _wrap(nbr[0]+2*switch[0], max_idx[0], iax_isperiodic[0])
+                        nbr2_i2 = _wrap(nbr[1]+2*switch[1], max_idx[1], iax_isperiodic[1])
+                        nbr2_i3 = _wrap(nbr[2]+2*switch[2], max_idx[2], iax_isperiodic[2])
+                        if (
+                            (
+                               drxns[idrxn] == -1
+                               and (nbr[iax] > 1 or iax_isperiodic[iax])
+                            )
+                            or
+                            (
+                                drxns[idrxn] == 1
+                                and (nbr[iax] < max_idx[iax] - 2 or iax_isperiodic[iax])
+                            )
+                        )\
+                            and known[nbr2_i1, nbr2_i2, nbr2_i3]\
+                            and known[nbr1_i1, nbr1_i2, nbr1_i3]\
+                            and tt[nbr2_i1, nbr2_i2, nbr2_i3] \
+                                <= tt[nbr1_i1, nbr1_i2, nbr1_i3]\
+                        :
+                            order[idrxn] = 2
+                            fdu[idrxn]  = drxns[idrxn] * (
+                                - 3 * tt[nbr[0], nbr[1], nbr[2]]
+                                + 4 * tt[nbr1_i1, nbr1_i2, nbr1_i3]
+                                -     tt[nbr2_i1, nbr2_i2, nbr2_i3]
+                            ) / (2 * norm[nbr[0], nbr[1], nbr[2], iax])
+                        elif (
+                            (
+                                drxns[idrxn] == -1
+                                and (nbr[iax] > 0 or iax_isperiodic[iax])
+                            )
+                            or (
+                                drxns[idrxn] ==  1
+                                and (nbr[iax] < max_idx[iax] - 1 or iax_isperiodic[iax])
+                            )
+                        )\
+                            and known[nbr1_i1, nbr1_i2, nbr1_i3]\
+                        :
+                            order[idrxn] = 1
+                            fdu[idrxn] = drxns[idrxn] * (
+                                tt[nbr1_i1, nbr1_i2, nbr1_i3]
+                              - tt[nbr[0], nbr[1], nbr[2]]
+                            ) / norm[nbr[0], nbr[1], nbr[2], iax]
+                        else:
+                            order[idrxn], fdu[idrxn] = 0, 0
+                    if fdu[0] > -fdu[1]:
+                        # Do the update using the backward operator
+                        idrxn, switch[iax] = 0, -1
+                    else:
+                        # Do the update using the forward operator
+                        idrxn, switch[iax] = 1, 1
+                    nbr1_i1 = _wrap(nbr[0]+switch[0], max_idx[0], iax_isperiodic[0])
+                    nbr1_i2 = _wrap(nbr[1]+switch[1], max_idx[1], iax_isperiodic[1])
+                    nbr1_i3 = _wrap(nbr[2]+switch[2], max_idx[2], iax_isperiodic[2])
+                    nbr2_i1 = _wrap(nbr[0]+2*switch[0], max_idx[0], iax_isperiodic[0])
+                    nbr2_i2 = _wrap(nbr[1]+2*switch[1], max_idx[1], iax_isperiodic[1])
+                    nbr2_i3 = _wrap(nbr[2]+2*switch[2], max_idx[2], iax_isperiodic[2])
+                    highest = max(highest, order[idrxn])
+                    if order[idrxn] == 2:
+                        tt1 = tt[nbr1_i1, nbr1_i2, nbr1_i3]
+                        tt2 = tt[nbr2_i1, nbr2_i2, nbr2_i3]
+                        aa[iax] = 9 / (4*norm[nbr[0], nbr[1], nbr[2], iax] ** 2)
+                        bb[iax] = (
+                            6 * tt2
+                         - 24 * tt1
+                        ) / (4 * norm[nbr[0], nbr[1], nbr[2], iax]**2)
+                        cc[iax] = (
+                                   tt2**2
+                            -  8 * tt2
+                                 * tt1
+                            + 16 * tt1**2
+                        ) / (4 * norm[nbr[0], nbr[1], nbr[2], iax]**2)
+                    elif order[idrxn] == 1:
+                        tt1 = tt[nbr1_i1, nbr1_i2, nbr1_i3]
+                        aa[iax] = 1 / norm[nbr[0], nbr[1], nbr[2], iax]**2
+                        bb[iax] = -2 * tt1\
+                            / norm[nbr[0], nbr[1], nbr[2], iax] ** 2
+                        cc[iax] = tt1**2\
+                            / norm[nbr[0], nbr[1], nbr[2], iax]**2
+                    elif order[idrxn] == 0:
+                        aa[iax], bb[iax], cc[iax] = 0, 0, 0
+                a = aa[0] + aa[1] + aa[2]
+                if a == 0:
+                    count_a += 1
+                    continue
+                if highest == 2:
+                    count_second += 1
+                b = bb[0] + bb[1] + bb[2]
+                c = cc[0] + cc[1] + cc[2] - 1/vv[nbr[0], nbr[1], nbr[2]]**2
+                if b**2 < 4*a*c:
+                    # This is a hack to solve the quadratic equation
+                    # when the discrimnant is negative. This hack
+                    # simply sets the discriminant to zero.
+                    new = -b / (2*a)
+                    count_b += 1
+                else:
+                    new = (-b + sqrt(b**2 - 4*a*c)) / (2*a)
+                if new < tt[nbr[0], nbr[1], nbr[2]]:
+                    count_accepted += 1
+                    tt[nbr[0], nbr[1], nbr[2]] = new
+                    # Tag as Trial all neighbours of Active that are not
+                    # Alive. If the neighbour is in Far, remove it from
+                    # that list and add it to Trial.
+                    if unknown[nbr[0], nbr[1], nbr[2]]:
+                        trial._push(nbr[0], nbr[1], nbr[2])
+                        unknown[nbr[0], nbr[1], nbr[2]] = False
+                    else:
+                        trial._update(nbr[0], nbr[1], nbr[2])
+
+    _count_updates(
+        stats, count_evaluated, count_second, count_a, count_b, count_accepted
+    )
+
+
+cdef unsigned char[::1] _padded_state(Py_ssize_t* max_idx, int kernel):
+    """
+    Node state array of :func:`_march_cartesian` (or of
+    :func:`_march_2d` for *CARTESIAN_2D_KERNEL*), with two ghost layers
+    on each side of each axis. It is allocated while the GIL is held,
+    so that running out of memory raises MemoryError.
+    """
+    cdef Py_ssize_t iax
+    cdef Py_ssize_t npad = 1
+
+    for iax in range(2 if kernel == CARTESIAN_2D_KERNEL else 3):
+        npad *= max_idx[iax] + 4
+    return (np.empty(npad, dtype=np.uint8))
+
+
+@cython.initializedcheck(False)
+@cython.cdivision(True)
+cdef void _march_cartesian(
+        constants.REAL_t[:,:,:]   tt,
+        constants.REAL_t[:,:,:]   vv,
+        constants.REAL_t*         node_intervals,
+        constants.BOOL_t[:,:,:]   known,
+        constants.BOOL_t[:,:,:]   unknown,
+        heapq.Heap                trial,
+        Py_ssize_t*               max_idx,
+        unsigned char*            state,
+        constants.BOOL_t*         fixed,
+        SolverStats*              stats
+) noexcept nogil:
+    """
+    Equivalent of :func:`_march` for (non-periodic) Cartesian grids.
+
+    Node states are mirrored in *state*, a linear array padded with two
+    ghost layers on each side (see :func:`_padded_state`), so the
+    stencil needs no bounds checks or wrapping, neighbours are
+    addressed by precomputed linear offsets, and the inverse (squared)
+    node intervals are computed once. Nodes flagged in *fixed* are
+    FIXED.
+    Results match :func:`_march` to round-off.
+    """
+    cdef Py_ssize_t                           i, i1, i2, i3, iax, jax, idrxn, jdrxn
+    cdef Py_ssize_t                           p, p1, p_active, t, t_active
+    cdef Py_ssize_t                           npad
+    cdef Py_ssize_t[3]                        idx, pstride, tstride
+    cdef Py_ssize_t[2]                        drxns = [-1, 1]
+    cdef heapq.Index3D                        active_idx
+    cdef long long                            count_a = 0
+    cdef long long                            count_b = 0
+    cdef long long                            count_evaluated = 0
+    cdef long long                            count_second = 0
+    cdef long long                            count_accepted = 0
+    cdef int                                  highest
+    cdef int[2]                               order
+    cdef constants.REAL_t*                    ttp = &tt[0, 0, 0]
+    cdef constants.WORK_t                     a, b, c, new, tt0
+    cdef constants.WORK_t[2]                  fdu, tt1, tt2
+    cdef constants.WORK_t[3]                  inv_h, inv_h2
+
+    for iax in range(3):
+        tstride[iax] = tt.strides[iax] // sizeof(constants.REAL_t)
+        if node_intervals[iax] > 0:
+            inv_h[iax] = 1 / node_intervals[iax]
+            inv_h2[iax] = inv_h[iax] * inv_h[iax]
+        else:
+            inv_h[iax], inv_h2[iax] = 0, 0
+    pstride[2] = 1
+    pstride[1] = max_idx[2] + 4
+    pstride[0] = (max_idx[1] + 4) * pstride[1]
+    npad = (max_idx[0] + 4) * pstride[0]
+
+    memset(state, GHOST, npad * sizeof(unsigned char))
+    for i1 in range(max_idx[0]):
+        for i2 in range(max_idx[1]):
+            p = (i1 + 2) * pstride[0] + (i2 + 2) * pstride[1] + 2
+            for i3 in range(max_idx[2]):
+                if known[i1, i2, i3]:
+                    state[p + i3] = KNOWN
+                elif fixed != NULL and fixed[(i1 * max_idx[1] + i2) * max_idx[2] + i3]:
+                    state[p + i3] = FIXED
+                elif unknown[i1, i2, i3]:
+                    state[p + i3] = FAR
+                else:
+                    state[p + i3] = TRIAL
+
+    while trial._size() > 0:
+        # Let Active be the point in Trial with the smallest
+        # traveltime value.
+        active_idx = trial._pop()
+        known[active_idx.i1, active_idx.i2, active_idx.i3] = True
+        p_active = (
+              (active_idx.i1 + 2) * pstride[0]
+            + (active_idx.i2 + 2) * pstride[1]
+            + (active_idx.i3 + 2)
+        )
+        t_active = (
+              active_idx.i1 * tstride[0]
+            + active_idx.i2 * tstride[1]
+            + active_idx.i3 * tstride[2]
+        )
+        state[p_active] = KNOWN
+
+        # Recompute the traveltime values at all Trial neighbours
+        # of Active by solving the piecewise quadratic equation.
+        for i in range(6):
+            iax, idrxn = i >> 1, i & 1
+            p = p_active + drxns[idrxn] * pstride[iax]
+            if state[p] >= KNOWN:
+                continue
+            idx[0], idx[1], idx[2] = active_idx.i1, active_idx.i2, active_idx.i3
+            idx[iax] += drxns[idrxn]
+            if not vv[idx[0], idx[1], idx[2]] > 0:
+                continue
+            t = t_active + drxns[idrxn] * tstride[iax]
+            tt0 = ttp[t]
+            a, b, c = 0, 0, 0
+            count_evaluated += 1
+            highest = 0
+            for jax in range(3):
+                if inv_h[jax] == 0:
+                    continue
+                for jdrxn in range(2):
+                    p1 = p + drxns[jdrxn] * pstride[jax]
+                    order[jdrxn], fdu[jdrxn] = 0, 0
+                    if state[p1] != KNOWN:
+                        continue
+                    tt1[jdrxn] = ttp[t + drxns[jdrxn] * tstride[jax]]
+                    if state[p1 + drxns[jdrxn] * pstride[jax]] == KNOWN:
+                        tt2[jdrxn] = ttp[t + 2 * drxns[jdrxn] * tstride[jax]]
+                        if tt2[jdrxn] <= tt1[jdrxn]:
+                            order[jdrxn] = 2
+                            fdu[jdrxn] = drxns[jdrxn] * (
+                                -3 * tt0 + 4 * tt1[jdrxn] - tt2[jdrxn]
+                            ) * 0.5 * inv_h[jax]
+                            continue
+                    order[jdrxn] = 1
+                    fdu[jdrxn] = drxns[jdrxn] * (tt1[jdrxn] - tt0) * inv_h[jax]
+                # Backward operator if fdu[0] > -fdu[1], else forward.
+                jdrxn = 0 if fdu[0] > -fdu[1] else 1
+                highest = max(highest, order[jdrxn])
+                if order[jdrxn] == 2:
+                    a += 2.25 * inv_h2[jax]
+                    b += (6 * tt2[jdrxn] - 24 * tt1[jdrxn]) * 0.25 * inv_h2[jax]
+                    c += (
+                               tt2[jdrxn] * tt2[jdrxn]
+                        -  8 * tt2[jdrxn] * tt1[jdrxn]
+                        + 16 * tt1[jdrxn] * tt1[jdrxn]
+                    ) * 0.25 * inv_h2[jax]
+                elif order[jdrxn] == 1:
+                    a += inv_h2[jax]
+                    b -= 2 * tt1[jdrxn] * inv_h2[jax]
+                    c += tt1[jdrxn] * tt1[jdrxn] * inv_h2[jax]
+            if a == 0:
+                count_a += 1
+                continue
+            if highest == 2:
+                count_second += 1
+            c -= 1 / (vv[idx[0], idx[1], idx[2]] * vv[idx[0], idx[1], idx[2]])
+            if b * b < 4 * a * c:
+                # Negative discriminant: set it to zero, as in _march.
+                new = -b / (2 * a)
+                count_b += 1
+            else:
+                new = (-b + sqrt(b * b - 4 * a * c)) / (2 * a)
+            if new < tt0:
+                count_accepted += 1
+                ttp[t] = new
+                if state[p] == FAR:
+                    trial._push(idx[0], idx[1], idx[2])
+                    unknown[idx[0], idx[1], idx[2]] = False
+                    state[p] = TRIAL
+                else:
+                    trial._update(idx[0], idx[1], idx[2])
+
+    _count_updates(
+        stats, count_evaluated, count_second, count_a, count_b, count_accepted
+    )
+
+
+@cython.initializedcheck(False)
+@cython.cdivision(True)
+cdef void _march_2d(
+        constants.REAL_t[:,:,:]   tt,
+        constants.REAL_t[:,:,:]   vv,
+        constants.REAL_t*         node_intervals,
+        constants.BOOL_t[:,:,:]   known,
+        constants.BOOL_t[:,:,:]   unknown,
+        heapq.Heap                trial,
+        Py_ssize_t*               max_idx,
+        unsigned char*            state,
+        constants.BOOL_t*         fixed,
+        SolverStats*              stats
+) noexcept nogil:
+    """
+    Equivalent of :func:`_march_cartesian` for 2D grids (a single node
+    along the third axis), with a 4-neighbour stencil and a 2D padded
+    state array. Results are identical.
+    """
+    cdef Py_ssize_t                           i, i1, i2, iax, jax, idrxn, jdrxn
+    cdef Py_ssize_t                           p, p1, p_active, t, t_active
+    cdef Py_ssize_t                           npad
+    cdef Py_ssize_t[2]                        idx, pstride, tstride
+    cdef Py_ssize_t[2]                        drxns = [-1, 1]
+    cdef heapq.Index3D                        active_idx
+    cdef long long                            count_a = 0
+    cdef long long                            count_b = 0
+    cdef long long                            count_evaluated = 0
+    cdef long long                            count_second = 0
+    cdef long long                            count_accepted = 0
+    cdef int                                  highest
+    cdef int[2]                               order
+    cdef constants.REAL_t*                    ttp = &tt[0, 0, 0]
+    cdef constants.WORK_t                     a, b, c, new, tt0
+    cdef constants.WORK_t[2]                  fdu, tt1, tt2
+    cdef constants.WORK_t[2]                  inv_h, inv_h2
+
+    for iax in range(2):
+        tstride[iax] = tt.strides[iax] // sizeof(constants.REAL_t)
+        if node_intervals[iax] > 0:
+            inv_h[iax] = 1 / node_intervals[iax]
+            inv_h2[iax] = inv_h[iax] * inv_h[iax]
+        else:
+            inv_h[iax], inv_h2[iax] = 0, 0
+    pstride[1] = 1
+    pstride[0] = max_idx[1] + 4
+    npad = (max_idx[0] + 4) * pstride[0]
+
+    memset(state, GHOST, npad * sizeof(unsigned char))
+    for i1 in range(max_idx[0]):
+        p = (i1 + 2) * pstride[0] + 2
+        for i2 in range(max_idx[1]):
+            if known[i1, i2, 0]:
+                state[p + i2] = KNOWN
+            elif fixed != NULL and fixed[i1 * max_idx[1] + i2]:
+                state[p + i2] = FIXED
+            elif unknown[i1, i2, 0]:
+                state[p + i2] = FAR
+            else:
+                state[p + i2] = TRIAL
+
+    while trial._size() > 0:
+        # Let Active be the point in Trial with the smallest
+        # traveltime value.
+        active_idx = trial._pop()
+        known[active_idx.i1, active_idx.i2, 0] = True
+        p_active = (active_idx.i1 + 2) * pstride[0] + (active_idx.i2 + 2)
+        t_active = active_idx.i1 * tstride[0] + active_idx.i2 * tstride[1]
+        state[p_active] = KNOWN
+
+        # Recompute the traveltime values at all Trial neighbours
+        # of Active by solving the piecewise quadratic equation.
+        for i in range(4):
+            iax, idrxn = i >> 1, i & 1
+            p = p_active + drxns[idrxn] * pstride[iax]
+            if state[p] >= KNOWN:
+                continue
+            idx[0], idx[1] = active_idx.i1, active_idx.i2
+            idx[iax] += drxns[idrxn]
+            if not vv[idx[0], idx[1], 0] > 0:
+                continue
+            t = t_active + drxns[idrxn] * tstride[iax]
+            tt0 = ttp[t]
+            a, b, c = 0, 0, 0
+            count_evaluated += 1
+            highest = 0
+            for jax in range(2):
+                if inv_h[jax] == 0:
+                    continue
+                for jdrxn in range(2):
+                    p1 = p + drxns[jdrxn] * pstride[jax]
+                    order[jdrxn], fdu[jdrxn] = 0, 0
+                    if state[p1] != KNOWN:
+                        continue
+                    tt1[jdrxn] = ttp[t + drxns[jdrxn] * tstride[jax]]
+                    if state[p1 + drxns[jdrxn] * pstride[jax]] == KNOWN:
+                        tt2[jdrxn] = ttp[t + 2 * drxns[jdrxn] * tstride[jax]]
+                        if tt2[jdrxn] <= tt1[jdrxn]:
+                            order[jdrxn] = 2
+                            fdu[jdrxn] = drxns[jdrxn] * (
+                                -3 * tt0 + 4 * tt1[jdrxn] - tt2[jdrxn]
+                            ) * 0.5 * inv_h[jax]
+                            continue
+                    order[jdrxn] = 1
+                    fdu[jdrxn] = drxns[jdrxn] * (tt1[jdrxn] - tt0) * inv_h[jax]
+                # Backward operator if fdu[0] > -fdu[1], else forward.
+                jdrxn = 0 if fdu[0] > -fdu[1] else 1
+                highest = max(highest, order[jdrxn])
+                if order[jdrxn] == 2:
+                    a += 2.25 * inv_h2[jax]
+                    b += (6 * tt2[jdrxn] - 24 * tt1[jdrxn]) * 0.25 * inv_h2[jax]
+                    c += (
+                               tt2[jdrxn] * tt2[jdrxn]
+                        -  8 * tt2[jdrxn] * tt1[jdrxn]
+                        + 16 * tt1[jdrxn] * tt1[jdrxn]
+                    ) * 0.25 * inv_h2[jax]
+                elif order[jdrxn] == 1:
+                    a += inv_h2[jax]
+                    b -= 2 * tt1[jdrxn] * inv_h2[jax]
+                    c += tt1[jdrxn] * tt1[jdrxn] * inv_h2[jax]
+            if a == 0:
+                count_a += 1
+                continue
+            if highest == 2:
+                count_second += 1
+            c -= 1 / (vv[idx[0], idx[1], 0] * vv[idx[0], idx[1], 0])
+            if b * b < 4 * a * c:
+                # Negative discriminant: set it to zero, as in _march.
+                new = -b / (2 * a)
+                count_b += 1
+            else:
+                new = (-b + sqrt(b * b - 4 * a * c)) / (2 * a)
+            if new < tt0:
+                count_accepted += 1
+                ttp[t] = new
+                if state[p] == FAR:
+                    trial._push(idx[0], idx[1], 0)
+                    unknown[idx[0], idx[1], 0] = False
+                    state[p] = TRIAL
+                else:
+                    trial._update(idx[0], idx[1], 0)
+
+    _count_updates(
+        stats, count_evaluated, count_second, count_a, count_b, count_accepted
+    )
+
+
+cdef inline void _count_updates(
+        SolverStats*   stats,
+        long long      evaluated,
+        long long      second_order,
+        long long      degenerate,
+        long long      clamped,
+        long long      accepted
+) noexcept nogil:
+    """
+    Add the counts of stencil evaluations of a call to a marching
+    kernel to *stats*, unless it is NULL.
+    """
+    if stats == NULL:
+        return
+    stats.stencil_evaluations += evaluated
+    stats.first_order_updates += evaluated - second_order - degenerate
+    stats.second_order_updates += second_order
+    stats.degenerate_updates += degenerate
+    stats.discriminant_clamps += clamped
+    stats.accepted_updates += accepted
+
+
+@cython.initializedcheck(False)
+cdef inline constants.REAL_t _bilinear(
+        constants.REAL_t[:,:]     values,
+        constants.REAL_t*         point,
+        constants.REAL_t*         min_coords,
+        constants.REAL_t*         node_intervals
+) noexcept nogil:
+    """
+    Bilinear interpolation of *values* at *point*, or NaN outside the
+    grid.
+    """
+    cdef Py_ssize_t                           iax
+    cdef Py_ssize_t[2]                        ii
+    cdef constants.REAL_t                     f0, f1
+    cdef constants.REAL_t[2]                  delta, idx
+
+    for iax in range(2):
+        idx[iax] = (point[iax] - min_coords[iax]) / node_intervals[iax]
+        if not (0 <= idx[iax] <= values.shape[iax] - 1):
+            return (NAN)
+        ii[iax] = min(<Py_ssize_t> idx[iax], values.shape[iax] - 2)
+        delta[iax] = idx[iax] - ii[iax]
+    f0 = values[ii[0], ii[1]] + (values[ii[0]+1, ii[1]] - values[ii[0], ii[1]]) * delta[0]
+    f1 = values[ii[0], ii[1]+1] + (values[ii[0]+1, ii[1]+1] - values[ii[0], ii[1]+1]) * delta[0]
+    return (f0 + (f1 - f0) * delta[1])
+
+
+# Arrays and geometry of the grid swept by _sweep, as raw pointers so
+# that the nodes of a hyperplane can be updated in parallel without
+# acquiring memoryviews. Strides are in elements.
+cdef struct SweepGrid:
+    constants.REAL_t*    tt
+    constants.REAL_t*    vv
+    constants.BOOL_t*    unknown
+    Py_ssize_t[3]        tstride, vstride, ustride
+    Py_ssize_t[3]        npts
+    constants.WORK_t[3]  inv_h2
+
+
+# Outcomes of the updates of a row of a hyperplane.
+cdef struct SweepCounts:
+    Py_ssize_t           evaluated, clamped, decreased, changed
+
+
+@cython.initializedcheck(False)
+cdef Py_ssize_t _sweep(
+        constants.REAL_t[:,:,:]   tt,
+        constants.REAL_t[:,:,:]   vv,
+        constants.REAL_t*         node_intervals,
+        constants.BOOL_t[:,:,:]   unknown,
+        Py_ssize_t*               max_idx,
+        constants.REAL_t          tolerance,
+        Py_ssize_t                max_iterations,
+        SolverStats*              stats
+) noexcept nogil:
+    """
+    Solve for the traveltimes of the nodes in *Unknown* with the Fast
+    Sweeping Method, keeping the other nodes fixed.
+
+    Each iteration sweeps the grid in every combination of axis
+    directions (axes with a single node are not swept). A sweep visits
+    the hyperplanes i1 + i2 + i3 = level in order; as the neighbours of
+    a node all lie on the previous or next hyperplane, the nodes of a
+    hyperplane are updated in parallel with the result of a sequential
+    Gauss-Seidel sweep.
+
+    Returns the number of iterations, or -1 if a traveltime still
+    decreased by more than *tolerance* in the last of *max_iterations*.
+    The updates are counted in *stats* unless it is NULL.
+    """
+    cdef Py_ssize_t                           i, iax, iteration, level, nlevels
+    cdef Py_ssize_t                           lo, hi, nchanged, row_size, sweep
+    cdef Py_ssize_t                           nevaluated = 0, nclamped = 0
+    cdef Py_ssize_t                           ndecreased = 0, nsweeps = 0
+    cdef Py_ssize_t                           result = -1
+    cdef Py_ssize_t[3]                        flip
+    cdef bint                                 skip
+    cdef SweepGrid                            grid
+    cdef SweepCounts                          counts
+
+    grid.tt = &tt[0, 0, 0]
+    grid.vv = &vv[0, 0, 0]
+    grid.unknown = &unknown[0, 0, 0]
+    for iax in range(3):
+        grid.tstride[iax] = tt.strides[iax] // sizeof(constants.REAL_t)
+        grid.vstride[iax] = vv.strides[iax] // sizeof(constants.REAL_t)
+        grid.ustride[iax] = unknown.strides[iax] // sizeof(constants.BOOL_t)
+        grid.npts[iax] = max_idx[iax]
+        grid.inv_h2[iax] = 1 / (node_intervals[iax] * node_intervals[iax])
+    nlevels = max_idx[0] + max_idx[1] + max_idx[2] - 2
+    # Upper bound on the number of nodes in a row of a hyperplane.
+    row_size = min(max_idx[1], max_idx[2])
+
+    for iteration in range(max_iterations):
+        nchanged = 0
+        for sweep in range(8):
+            skip = False
+            for iax in range(3):
+                flip[iax] = (sweep >> iax) & 1
+                skip = skip or (flip[iax] and max_idx[iax] == 1)
+            if skip:
+                continue
+            nsweeps += 1
+            for level in range(nlevels):
+                lo = max(0, level - (max_idx[1] - 1) - (max_idx[2] - 1))
+                hi = min(max_idx[0] - 1, level)
+                if (hi - lo + 1) * row_size >= SWEEP_MIN_PARALLEL_NODES:
+                    for i in prange(lo, hi + 1, schedule="static"):
+                        counts = _sweep_row(&grid, flip, i, level, tolerance)
+                        nevaluated += counts.evaluated
+                        nclamped += counts.clamped
+                        ndecreased += counts.decreased
+                        nchanged += counts.changed
+                else:
+                    for i in range(lo, hi + 1):
+                        counts = _sweep_row(&grid, flip, i, level, tolerance)
+                        nevaluated += counts.evaluated
+                        nclamped += counts.clamped
+                        ndecreased += counts.decreased
+                        nchanged += counts.changed
+        if nchanged == 0:
+            result = iteration + 1
+            break
+
+    if stats != NULL:
+        stats.sweeps += nsweeps
+        stats.stencil_evaluations += nevaluated
+        stats.first_order_updates += nevaluated
+        stats.discriminant_clamps += nclamped
+        stats.accepted_updates += ndecreased
+
+    return (result)
+
+
+cdef inline SweepCounts _sweep_row(
+        SweepGrid*                grid,
+        Py_ssize_t*               flip,
+        Py_ssize_t                i,
+        Py_ssize_t                level,
+        constants.REAL_t          tolerance
+) noexcept nogil:
+    """
+    Update the nodes (i, j, level - i - j) of a hyperplane, in the
+    directions of a sweep, and count the outcomes.
+    """
+    cdef Py_ssize_t                           j, k
+    cdef int                                  flags
+    cdef Py_ssize_t[3]                        idx
+    cdef SweepCounts                          counts = [0, 0, 0, 0]
+    cdef Py_ssize_t*                          npts = grid.npts
+
+    idx[0] = npts[0] - 1 - i if flip[0] else i
+    for j in range(
+        max(0, level - i - (npts[2] - 1)),
+        min(npts[1] - 1, level - i) + 1
+    ):
+        k = level - i - j
+        idx[1] = npts[1] - 1 - j if flip[1] else j
+        idx[2] = npts[2] - 1 - k if flip[2] else k
+        flags = _sweep_node(grid, idx, tolerance)
+        counts.evaluated += (flags & SWEEP_EVALUATED) != 0
+        counts.clamped += (flags & SWEEP_CLAMPED) != 0
+        counts.decreased += (flags & SWEEP_DECREASED) != 0
+        counts.changed += (flags & SWEEP_CHANGED) != 0
+
+    return (counts)
+
+
+@cython.cdivision(True)
+cdef inline int _sweep_node(
+        SweepGrid*                grid,
+        Py_ssize_t*               idx,
+        constants.REAL_t          tolerance
+) noexcept nogil:
+    """
+    Update the traveltime of a node with the first-order Godunov
+    upwind scheme; return SWEEP_* flags of the outcome (0 if the node
+    is not evaluated).
+    """
+    cdef Py_ssize_t                           iax, m, n = 0, t
+    cdef int                                  flags
+    cdef constants.WORK_t                     a, b, c, disc, new, old, u, v
+    cdef constants.WORK_t[3]                  upwind, inv_h2
+
+    if not grid.unknown[
+          idx[0] * grid.ustride[0]
+        + idx[1] * grid.ustride[1]
+        + idx[2] * grid.ustride[2]
+    ]:
+        return (0)
+    v = grid.vv[
+          idx[0] * grid.vstride[0]
+        + idx[1] * grid.vstride[1]
+        + idx[2] * grid.vstride[2]
+    ]
+    if not v > 0:
+        return (0)
+    t = (
+          idx[0] * grid.tstride[0]
+        + idx[1] * grid.tstride[1]
+        + idx[2] * grid.tstride[2]
+    )
+
+    # Smallest neighbouring traveltime along each axis, sorted.
+    for iax in range(3):
+        if grid.npts[iax] == 1:
+            continue
+        u = INFINITY
+        if idx[iax] > 0:
+            u = min(u, grid.tt[t - grid.tstride[iax]])
+        if idx[iax] < grid.npts[iax] - 1:
+            u = min(u, grid.tt[t + grid.tstride[iax]])
+        if not u < INFINITY:
+            continue
+        m = n
+        while m > 0 and upwind[m - 1] > u:
+            upwind[m], inv_h2[m] = upwind[m - 1], inv_h2[m - 1]
+            m -= 1
+        upwind[m], inv_h2[m] = u, grid.inv_h2[iax]
+        n += 1
+    if n == 0:
+        return (0)
+
+    # Solve sum((new - upwind[m])**2 * inv_h2[m]) = 1 / v**2 over the
+    # fewest upwind axes whose solution exceeds the next upwind value.
+    a, b, c = 0, 0, -1 / (v * v)
+    for m in range(n):
+        a += inv_h2[m]
+        b += upwind[m] * inv_h2[m]
+        c += upwind[m] * upwind[m] * inv_h2[m]
+        disc = b * b - a * c
+        new = (b + sqrt(max(disc, 0))) / a
+        if m == n - 1 or new <= upwind[m + 1]:
+            break
+    flags = SWEEP_EVALUATED | (SWEEP_CLAMPED if disc < 0 else 0)
+
+    # Compare at the precision values are stored at, or rounding can
+    # keep a float32 build from ever converging.
+    new = <constants.REAL_t>new
+    old = grid.tt[t]
+    if not new < old:
+        return (flags)
+    grid.tt[t] = new
+    flags |= SWEEP_DECREASED
+    if old - new > tolerance:
+        flags |= SWEEP_CHANGED
+    return (flags)
+
+
+def _warn_not_converged(max_iterations):
+    warnings.warn(
+        f"The fast sweeping method did not converge in {max_iterations} "
+        "iterations; increase max_sweep_iterations.",
+        RuntimeWarning
+    )
+
+
+@cython.initializedcheck(False)
+cdef void _restart_from_baseline(
+        constants.REAL_t[:,:,:]   tt,
+        constants.BOOL_t[:,:,:]   known,
+        constants.BOOL_t[:,:,:]   unknown,
+        heapq.Heap                trial,
+        constants.REAL_t[:,:,:]   baseline,
+        constants.BOOL_t[:,:,:]   changed,
+        Py_ssize_t*               max_idx,
+        constants.BOOL_t*         iax_isperiodic,
+        constants.BOOL_t*         fixed
+) noexcept nogil:
+    """
+    Turn the initial conditions in *tt*, *known*, *unknown*, and
+    *trial* into those of an incremental re-solve.
+
+    Nodes whose *baseline* traveltime is below tau, the earliest
+    baseline arrival at a *changed* node or its neighbours, cannot
+    depend on the changed velocities: they become *Known* with their
+    baseline values. Those bordering the remaining nodes are put back
+    into *Trial* so that marching restarts the wavefront from them,
+    and flagged in *fixed* (an array of the grid's size, in C order)
+    so that the kernels never update them: they only become *Known*
+    when popped, in the order a full solve would pop them.
+    Initial *Trial* nodes arriving after tau stay in *Trial*.
+    """
+    cdef Py_ssize_t                           i, i1, i2, i3, iax, idrxn
+    cdef Py_ssize_t[3]                        nbr
+    cdef bint                                 on_boundary
+    cdef constants.REAL_t                     tau = INFINITY
+    cdef heapq.Index3D                        node
+    cdef cpp_vector[heapq.Index3D]            keys, restart, boundary
+
+    for i1 in range(max_idx[0]):
+        for i2 in range(max_idx[1]):
+            for i3 in range(max_idx[2]):
+                if not changed[i1, i2, i3]:
+                    continue
+                if baseline[i1, i2, i3] < tau:
+                    tau = baseline[i1, i2, i3]
+                for iax in range(3):
+                    for idrxn in range(2):
+                        nbr[0], nbr[1], nbr[2] = i1, i2, i3
+                        nbr[iax] = _wrap(
+                            nbr[iax] + 2 * idrxn - 1, max_idx[iax], iax_isperiodic[iax]
+                        )
+                        if (
+                            stencil(nbr[0], nbr[1], nbr[2], max_idx[0], max_idx[1], max_idx[2])
+                            and baseline[nbr[0], nbr[1], nbr[2]] < tau
+                        ):
+                            tau = baseline[nbr[0], nbr[1], nbr[2]]
+
+    # Keep only the initial Trial nodes that arrive after tau.
+    keys = trial._keys()
+    for i in range(keys.size()):
+        node = keys[i]
+        if not baseline[node.i1, node.i2, node.i3] < tau:
+            restart.push_back(node)
+    trial._clear()
+
+    for i1 in range(max_idx[0]):
+        for i2 in range(max_idx[1]):
+            for i3 in range(max_idx[2]):
+                if known[i1, i2, i3] or not baseline[i1, i2, i3] < tau:
+                    continue
+                tt[i1, i2, i3] = baseline[i1, i2, i3]
+                known[i1, i2, i3] = True
+                unknown[i1, i2, i3] = False
+
+    for i1 in range(max_idx[0]):
+        for i2 in range(max_idx[1]):
+            for i3 in range(max_idx[2]):
+                if not baseline[i1, i2, i3] < tau:
+                    continue
+                on_boundary = False
+                for iax in range(3):
+                    for idrxn in range(2):
+                        nbr[0], nbr[1], nbr[2] = i1, i2, i3
+                        nbr[iax] = _wrap(
+                            nbr[iax] + 2 * idrxn - 1, max_idx[iax], iax_isperiodic[iax]
+                        )
+                        if (
+                            stencil(nbr[0], nbr[1], nbr[2], max_idx[0], max_idx[1], max_idx[2])
+                            and not known[nbr[0], nbr[1], nbr[2]]
+                        ):
+                            on_boundary = True
+                if on_boundary:
+                    node.i1, node.i2, node.i3 = i1, i2, i3
+                    boundary.push_back(node)
+
+    memset(fixed, False, max_idx[0] * max_idx[1] * max_idx[2] * sizeof(constants.BOOL_t))
+    for i in range(boundary.size()):
+        node = boundary[i]
+        known[node.i1, node.i2, node.i3] = False
+        fixed[(node.i1 * max_idx[1] + node.i2) * max_idx[2] + node.i3] = True
+        trial._push(node.i1, node.i2, node.i3)
+    for i in range(restart.size()):
+        node = restart[i]
+        trial._push(node.i1, node.i2, node.i3)
+
+
+cdef inline Py_ssize_t _wrap(
+        Py_ssize_t idx, Py_ssize_t max_idx, constants.BOOL_t isperiodic
+) noexcept nogil:
+    if isperiodic:
+        return ((idx + max_idx) % max_idx)
+    return (idx)
+
+
 cdef inline bint stencil(
         Py_ssize_t idx0, Py_ssize_t idx1, Py_ssize_t idx2,
         Py_ssize_t max_idx0, Py_ssize_t max_idx1, Py_ssize_t max_idx2
-):
+) noexcept nogil:
     return (
             (idx0 >= 0)
         and (idx0 < max_idx0)
@@ -0,0 +1,134 @@
+import numpy as np
+import os
+import pykonal
+import tempfile
+import unittest
+
+
+# Tolerance of comparisons between sums taken in different orders, at
+# the precision of the build.
+RTOL = 1e-10 if pykonal.constants.DTYPE_REAL == np.float64 else 1e-5
+VELOCITY = 2.0
+STATIONS = {
+    ("XX", "ST00", "P"): (0, 0, 0),
+    ("XX", "ST01", "P"): (19, 0, 4),
+    ("XX", "ST02", "P"): (0, 14, 9),
+    ("XX", "ST03", "P"): (19, 14, 0),
+    ("XX", "ST04", "P"): (10, 7, 9),
+}
+
+
+def traveltime_field(station, npts=(20, 15, 10)):
+    # Straight-ray traveltimes from *station* in a uniform medium.
+    field = pykonal.fields.ScalarField3D(coord_sys="cartesian")
+    field.min_coords = 0, 0, 0
+    field.node_intervals = 1, 1, 1
+    field.npts = npts
+    field.values = np.linalg.norm(field.nodes - np.array(station), axis=-1) / VELOCITY
+    return (field)
+
+
+class EQLocatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "traveltimes.h5")
+        with pykonal.inventory.TraveltimeInventory(self.path, mode="w") as inventory:
+            for key, station in STATIONS.items():
+                inventory.add(traveltime_field(station), "/".join(key))
+            inventory.add(traveltime_field((0, 0, 0), (8, 8, 8)), "YY/ODD/S")
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+    def arrivals(self, hypocenter, keys=STATIONS):
+        # Exact arrival times of an event at *hypocenter*.
+        return ({
+            key: hypocenter[3] + np.linalg.norm(
+                np.array(hypocenter[:3]) - STATIONS[key]
+            ) / VELOCITY
+            for key in keys
+        })
+
+
+    def test_batch(self):
+        locator = pykonal.locate.EQLocator(self.path, coord_sys="cartesian")
+        locator.add_arrivals(self.arrivals((6.3, 4.1, 2.7, 10.0)))
+        with self.assertRaises(ValueError):
+            locator.rms_batch(np.zeros((1, 4), dtype=pykonal.constants.DTYPE_REAL))
+        locator.read_traveltimes()
+        self.assertEqual(locator.traveltime_keys, list(STATIONS))
+
+        hypocenters = np.random.uniform(
+            (0, 0, 0, 8), (19, 14, 9, 12), (50, 4)
+        ).astype(pykonal.constants.DTYPE_REAL)
+        hypocenters[0] = (25, 0, 0, 10)
+        rms = locator.rms_batch(hypocenters)
+        self.assertEqual(rms.shape, (50,))
+        self.assertEqual(rms[0], np.inf)
+        np.testing.assert_allclose(
+            rms[1:],
+            [locator.rms(hypocenter) for hypocenter in hypocenters[1:]],
+            rtol=RTOL
+        )
+
+        locator.add_residual_rvs({
+            key: pykonal.stats.NormalDistribution(0, 0.1) for key in STATIONS
+        })
+        np.testing.assert_allclose(
+            locator.log_likelihood_batch(hypocenters[1:]),
+            [locator.log_likelihood(model) for model in hypocenters[1:]],
+            rtol=RTOL
+        )
+
+        # The arrivals can be any subset of the stacked fields.
+        keys = list(STATIONS)[1:4]
+        locator.clear_arrivals()
+        locator.add_arrivals(self.arrivals((6.3, 4.1, 2.7, 10.0), keys))
+        residuals = locator.residuals(hypocenters[1:])
+        self.assertEqual(residuals.shape, (49, 3))
+        for iarrival, key in enumerate(keys):
+            arrival = pykonal.constants.DTYPE_REAL(locator.arrivals[key])
+            np.testing.assert_array_equal(
+                residuals[:, iarrival],
+                arrival - hypocenters[1:, 3] - locator.traveltimes[key].resample(
+                    hypocenters[1:, :3]
+                )
+            )
+        locator.add_arrivals({("XX", "ST99", "P"): 0.0})
+        with self.assertRaises(ValueError):
+            locator.residuals(hypocenters)
+
+
+    def test_grid_search(self):
+        locator = pykonal.locate.EQLocator(self.path, coord_sys="cartesian")
+        locator.read_traveltimes(keys=list(STATIONS))
+        for hypocenter in ((15.5, 11.2, 7.9, -3.0), (6.3, 4.1, 2.7, 10.0)):
+            locator.clear_arrivals()
+            locator.add_arrivals(self.arrivals(hypocenter))
+            located = locator.grid_search()
+            self.assertEqual(located.dtype, pykonal.constants.DTYPE_REAL)
+            # Trilinear interpolation of the traveltimes limits the
+            # accuracy to a fraction of a node interval.
+            np.testing.assert_allclose(located[:3], hypocenter[:3], atol=0.25)
+            np.testing.assert_allclose(located[3], hypocenter[3], atol=0.1)
+
+        # A subregion is searched over its own grid.
+        locator.read_traveltimes(
+            min_coords=np.array([2, 2, 1], dtype=pykonal.constants.DTYPE_REAL),
+            max_coords=np.array([12, 10, 8], dtype=pykonal.constants.DTYPE_REAL)
+        )
+        self.assertEqual(tuple(locator.traveltimes[("XX", "ST00", "P")].npts), (11, 9, 8))
+        np.testing.assert_allclose(locator.grid_search()[:3], hypocenter[:3], atol=0.25)
+
+        # Fields on different grids are read, but not stacked.
+        locator.read_traveltimes(keys=list(STATIONS) + [("YY", "ODD", "S")])
+        self.assertEqual(len(locator.traveltimes), len(STATIONS) + 1)
+        self.assertEqual(locator.traveltime_keys, [])
+        with self.assertRaises(ValueError):
+            locator.grid_search()
+
+
+if __name__ == "__main__":
+    unittest.main()
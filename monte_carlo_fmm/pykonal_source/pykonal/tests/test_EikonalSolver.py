@@ -6,10 +6,36 @@ import pykonal
 import unittest
 
 
+# Tolerance of comparisons between solutions computed along different
+# paths, at the precision of the build.
+RTOL = 1e-10 if pykonal.constants.DTYPE_REAL == np.float64 else 1e-4
+
+
+def uniform(low, high, size):
+    # Random values at the precision of the build.
+    return (np.random.uniform(low, high, size).astype(pykonal.constants.DTYPE_REAL))
+
+
+def point_source_solver(vv, src_idx=(0, 0, 0), node_intervals=(1, 1, 1), cls=None, **kwargs):
+    if cls is None:
+        solver                    = pykonal.EikonalSolver(coord_sys="cartesian", **kwargs)
+    else:
+        solver                    = cls(**kwargs)
+    solver.velocity.min_coords     = 0, 0, 0
+    solver.velocity.node_intervals = node_intervals
+    solver.velocity.npts           = vv.shape
+    solver.velocity.values         = vv
+    if src_idx is not None:
+        solver.traveltime.values[src_idx] = 0
+        solver.unknown[src_idx]           = False
+        solver.trial.push(*src_idx)
+    return (solver)
+
 
 class EikonalSolverTestCase(unittest.TestCase):
     def setUp(self):
-        pass
+        # Random velocities (see uniform) are reproducible per test.
+        np.random.seed(0)
 
 
     def tearDown(self):
@@ -43,5 +69,517 @@ class EikonalSolverTestCase(unittest.TestCase):
         np.testing.assert_array_almost_equal(uu, solver.uu)
 
 
+    def test_solve_batch(self):
+        for npts in ((32, 24, 1), (12, 10, 8)):
+            vv = uniform(0.5, 2, (4, *npts))
+            solver = point_source_solver(vv[0], src_idx=(1, 2, 0))
+            tt = solver.solve_batch(vv)
+            self.assertEqual(tt.shape, vv.shape)
+            for k in range(vv.shape[0]):
+                expected = point_source_solver(vv[k], src_idx=(1, 2, 0))
+                expected.solve()
+                np.testing.assert_array_equal(tt[k], expected.traveltime.values)
+            # The initial conditions are restored after the batch.
+            self.assertEqual(solver.trial.size, 1)
+            self.assertEqual(solver.traveltime.values[1, 2, 0], 0)
+            self.assertTrue(np.all(np.isinf(solver.traveltime.values[2:])))
+
+
+    def test_solve_incremental(self):
+        # The baseline arrivals bordering the changed region stayed
+        # fixed only by chance with seed 0; they did not with seed 17.
+        for seed in (0, 17):
+            np.random.seed(seed)
+            for npts in ((32, 24, 1), (12, 10, 8)):
+                vv0 = uniform(0.5, 2, npts)
+                solver = point_source_solver(vv0, src_idx=(1, 2, 0))
+                solver.solve()
+                baseline = solver.traveltime.values.copy()
+
+                changed = np.zeros(npts, dtype=bool)
+                changed[6:9, 5:8] = True
+                vv = vv0.copy()
+                vv[changed] *= np.random.uniform(0.5, 1.5, changed.sum())
+
+                expected = point_source_solver(vv, src_idx=(1, 2, 0))
+                expected.solve()
+                solver = point_source_solver(vv, src_idx=(1, 2, 0))
+                solver.solve_incremental(baseline, changed)
+                np.testing.assert_array_equal(
+                    solver.traveltime.values,
+                    expected.traveltime.values
+                )
+
+                solver = point_source_solver(vv, src_idx=(1, 2, 0))
+                tt = solver.solve_batch(
+                    np.stack([vv, vv0]),
+                    baseline,
+                    np.stack([changed, np.zeros_like(changed)])
+                )
+                np.testing.assert_array_equal(tt[0], expected.traveltime.values)
+                np.testing.assert_array_equal(tt[1], baseline)
+
+
+    def test_heap_types(self):
+        values = uniform(0, 1, (6, 5, 4))
+        order = np.argsort(values, axis=None)
+        for heap in (
+            pykonal.heapq.Heap(values),
+            pykonal.heapq.QuaternaryHeap(values),
+            pykonal.heapq.BucketQueue(values, 1e-6)
+        ):
+            for idx in np.ndindex(values.shape):
+                heap.push(*idx)
+            values[0, 0, 0] = -1
+            heap.update(0, 0, 0)
+            self.assertEqual(heap.size, values.size)
+            popped = [heap.pop() for _ in range(values.size)]
+            self.assertEqual(popped[0], (0, 0, 0))
+            self.assertEqual(
+                popped[1:],
+                [np.unravel_index(i, values.shape) for i in order if i != 0]
+            )
+
+        # Non-finite values are popped last instead of being binned.
+        values = np.array([[[np.inf, 1, np.nan, 0.5, 2]]], dtype=pykonal.constants.DTYPE_REAL)
+        heap = pykonal.heapq.BucketQueue(values, 0.1)
+        for idx in np.ndindex(values.shape):
+            heap.push(*idx)
+        self.assertEqual(sorted(heap.keys), list(np.ndindex(values.shape)))
+        popped = [heap.pop() for _ in range(values.size)]
+        self.assertEqual(popped[:3], [(0, 0, 3), (0, 0, 1), (0, 0, 4)])
+        self.assertEqual(sorted(popped[3:]), [(0, 0, 0), (0, 0, 2)])
+        self.assertEqual(heap.size, 0)
+
+        for npts in ((32, 24, 1), (12, 10, 8)):
+            vv = uniform(0.5, 2, (2, *npts))
+            expected = point_source_solver(vv[0], src_idx=(1, 2, 0))
+            expected.solve()
+
+            solver = point_source_solver(vv[0], src_idx=(1, 2, 0), heap_type="quaternary")
+            solver.solve()
+            np.testing.assert_array_equal(
+                solver.traveltime.values,
+                expected.traveltime.values
+            )
+
+            solver = point_source_solver(vv[0], src_idx=(1, 2, 0), heap_type="quaternary")
+            tt = solver.solve_batch(vv)
+            np.testing.assert_array_equal(tt[0], expected.traveltime.values)
+            self.assertEqual(solver.trial.keys, [(1, 2, 0)])
+
+            # The untidy variant converges to the exact ordering as
+            # the bucket width goes to zero.
+            solver = point_source_solver(
+                vv[0], src_idx=(1, 2, 0), heap_type="bucket", bucket_width=1e-6
+            )
+            tt = solver.solve_batch(vv)
+            np.testing.assert_allclose(tt[0], expected.traveltime.values)
+            self.assertEqual(solver.trial.keys, [(1, 2, 0)])
+
+            solver = point_source_solver(vv[0], src_idx=(1, 2, 0), heap_type="bucket")
+            solver.solve()
+            np.testing.assert_allclose(
+                solver.traveltime.values,
+                expected.traveltime.values,
+                rtol=0.1
+            )
+
+
+    def test_initialize_sources(self):
+        values = uniform(0, 1, (6, 5, 4))
+        indices = np.argwhere(np.ones(values.shape, dtype=bool))
+        order = np.argsort(values, axis=None)
+        for heap in (
+            pykonal.heapq.Heap(values),
+            pykonal.heapq.QuaternaryHeap(values),
+            pykonal.heapq.BucketQueue(values, 1e-6)
+        ):
+            heap.push(*indices[0])
+            heap.push_many(indices[1:50])
+            heap.push_many(indices[50:60])
+            heap.push_many(indices[60:])
+            popped = [heap.pop() for _ in range(values.size)]
+            self.assertEqual(
+                popped,
+                [np.unravel_index(i, values.shape) for i in order]
+            )
+
+        vv = uniform(0.5, 2, (30, 25, 12))
+        src_idx = [(1, 2, 3), (20, 5, 7), (10, 20, 0)]
+        src_tt = [0, 1.5, 0.3]
+        expected = []
+        for idx, tt in zip(src_idx, src_tt):
+            solver = point_source_solver(vv, idx)
+            solver.traveltime.values[idx] = tt
+            solver.solve()
+            expected.append(solver.traveltime.values)
+        solver = point_source_solver(vv, None)
+        # Duplicated sources keep their earliest time.
+        solver.initialize_sources(src_idx + [(1, 2, 3)], src_tt + [5])
+        self.assertEqual(solver.trial.size, 3)
+        solver.solve()
+        for idx, tt in zip(src_idx, src_tt):
+            self.assertEqual(solver.traveltime.values[idx], tt)
+        # Fronts from different sources only interact where they meet.
+        np.testing.assert_allclose(
+            solver.traveltime.values,
+            np.minimum.reduce(expected),
+            atol=0.5
+        )
+
+        tt = np.full(vv.shape, np.inf)
+        tt[1, 2, 3] = 0
+        solver = point_source_solver(vv, None)
+        solver.initialize_traveltime(tt)
+        solver.solve()
+        np.testing.assert_array_equal(solver.traveltime.values, expected[0])
+
+        src = np.array([10.3, 20.6, 5.5])
+        solver = point_source_solver(np.ones((32, 32, 16)), None)
+        solver.initialize_point_sources(src)
+        near = ~solver.unknown
+        solver.solve()
+        distance = np.linalg.norm(solver.traveltime.nodes - src, axis=-1)
+        np.testing.assert_allclose(solver.traveltime.values[near], distance[near], rtol=1e-6)
+        np.testing.assert_allclose(solver.traveltime.values, distance, atol=0.5)
+
+
+    def test_reset(self):
+        for heap_type in ("binary", "quaternary", "bucket"):
+            vv = uniform(0.5, 2, (2, 12, 10, 8))
+            solver = point_source_solver(vv[0], (1, 2, 3), heap_type=heap_type)
+            solver.solve()
+            tt = solver.traveltime.values
+            solver.reset(vv[1])
+            self.assertTrue(np.shares_memory(solver.traveltime.values, tt))
+            self.assertTrue(np.all(np.isinf(tt)))
+            self.assertEqual(solver.trial.size, 0)
+            solver.initialize_sources([(4, 5, 6)])
+            solver.solve()
+
+            expected = point_source_solver(
+                vv[1], (4, 5, 6), heap_type=heap_type,
+                bucket_width=solver.trial.bucket_width if heap_type == "bucket" else None
+            )
+            expected.solve()
+            np.testing.assert_array_equal(
+                solver.traveltime.values,
+                expected.traveltime.values
+            )
+            np.testing.assert_array_equal(solver.known, expected.known)
+
+
+    def test_resample(self):
+        solver = point_source_solver(uniform(0.5, 2, (40, 30, 20)), (3, 4, 5))
+        solver.solve()
+        # Enough points to take the parallel path, some outside the grid.
+        points = uniform(-2, 42, (5000, 3))
+        tt = solver.traveltime.resample(points)
+        grad = solver.traveltime.gradient.resample(points)
+        self.assertEqual(grad.shape, points.shape)
+        for i in range(0, len(points), 97):
+            np.testing.assert_array_equal(tt[i], solver.traveltime.value(points[i]))
+            np.testing.assert_array_equal(
+                grad[i],
+                solver.traveltime.gradient.value(points[i])
+            )
+        outside = np.any((points < 0) | (points > [39, 29, 19]), axis=1)
+        self.assertTrue(np.all(np.isnan(tt[outside])))
+        self.assertTrue(np.all(np.isnan(grad[outside])))
+        self.assertFalse(np.any(np.isnan(tt[~outside])))
+
+
+    def test_trace_rays(self):
+        src = np.array([5., 5., 5.])
+        solver = point_source_solver(np.ones((30, 30, 30)), (5, 5, 5))
+        solver.solve()
+        ends = uniform(0, 29, (300, 3))
+        ends[0] = [40, 5, 5]
+        for method in pykonal.fields.RAY_METHODS:
+            rays, npts = solver.trace_rays(ends, method=method)
+            self.assertEqual(rays.shape, (len(ends), npts.max(), 3))
+            self.assertEqual(npts[0], 0)
+            self.assertTrue(np.all(np.isnan(rays[0])))
+            for ray, n, end in zip(rays[1:], npts[1:], ends[1:]):
+                self.assertTrue(np.all(np.isnan(ray[n:])))
+                np.testing.assert_array_equal(ray[n-1], end)
+                self.assertLess(np.linalg.norm(ray[0] - src), 0.1)
+                # Rays in a uniform medium are straight lines.
+                axis = (end - src) / np.linalg.norm(end - src)
+                offset = ray[:n] - src
+                offset -= np.outer(offset @ axis, axis)
+                self.assertLess(np.abs(offset).max(), 1)
+
+        solver = point_source_solver(
+            np.ones((30, 20, 1)), (5, 5, 0), cls=pykonal.EikonalSolver2D
+        )
+        solver.solve()
+        rays, npts = solver.trace_rays(np.array([[25., 15.], [2., 18.]]))
+        self.assertEqual(rays.shape[::2], (2, 2))
+        np.testing.assert_array_equal(rays[1, npts[1]-1], [2, 18])
+        self.assertLess(np.linalg.norm(rays[0, 0] - [5, 5]), 0.1)
+
+
+    def test_gradient_cache(self):
+        solver = point_source_solver(uniform(0.5, 2, (30, 20, 10)), (3, 4, 5))
+        solver.solve()
+        field = solver.traveltime
+        grad = field.gradient
+        self.assertIs(field.gradient, grad)
+        ends = uniform(0, 9, (50, 3))
+        rays, npts = field.trace_rays(ends)
+
+        # Solving again updates the traveltimes in place.
+        solver.reset()
+        solver.initialize_sources([(20, 10, 5)])
+        solver.solve()
+        self.assertIsNot(field.gradient, grad)
+        grad = field.gradient
+        field.values = 2 * field.values
+        self.assertIsNot(field.gradient, grad)
+        np.testing.assert_allclose(field.gradient.values, 2 * grad.values)
+
+        field.values = field.values
+        lazy = field.trace_rays(ends, lazy_gradient=True)
+        eager = field.trace_rays(ends)
+        np.testing.assert_array_equal(lazy[1], eager[1])
+        np.testing.assert_allclose(lazy[0], eager[0], atol=1e-12)
+
+        # One-sided differences on the edges of spherical grids.
+        field = pykonal.fields.ScalarField3D(coord_sys="spherical")
+        field.min_coords = 1, np.pi / 4, 0
+        field.node_intervals = 0.5, np.pi / 20, np.pi / 20
+        field.npts = 8, 11, 9
+        field.values = field.nodes[..., 0]**2
+        np.testing.assert_allclose(
+            field.gradient.values[..., 0],
+            2 * field.nodes[..., 0]
+        )
+        grad = field.gradient
+        field.node_intervals = 0.25, np.pi / 20, np.pi / 20
+        self.assertIsNot(field.gradient, grad)
+
+
+    def test_grid_metrics(self):
+        solver = point_source_solver(uniform(0.5, 2, (12, 10, 8)), None, (0.5, 1, 2))
+        velocity, traveltime = solver.velocity, solver.traveltime
+        norm = velocity.norm
+        # Shared by the fields on a grid, and constant on Cartesian grids.
+        self.assertIs(traveltime.norm, norm)
+        self.assertIs(traveltime.nodes, velocity.nodes)
+        self.assertFalse(norm.flags.writeable)
+        self.assertEqual(norm.strides, (0, 0, 0, norm.itemsize))
+        np.testing.assert_array_equal(norm, np.broadcast_to([0.5, 1, 2], (12, 10, 8, 3)))
+
+        velocity.node_intervals = 1, 1, 1
+        np.testing.assert_array_equal(velocity.norm, 1)
+        np.testing.assert_array_equal(velocity.nodes[-1, -1, -1], [11, 9, 7])
+        np.testing.assert_array_equal(traveltime.norm, norm)
+
+        field = pykonal.fields.ScalarField3D(coord_sys="spherical")
+        field.min_coords = 1, np.pi / 4, 0
+        field.node_intervals = 0.5, np.pi / 20, np.pi / 20
+        field.npts = 8, 11, 9
+        nodes = field.nodes
+        np.testing.assert_allclose(
+            field.norm,
+            np.stack(
+                [
+                    np.full(nodes.shape[:-1], 0.5),
+                    np.pi / 20 * nodes[..., 0],
+                    np.pi / 20 * nodes[..., 0] * np.sin(nodes[..., 1])
+                ],
+                axis=-1
+            ),
+            rtol=RTOL
+        )
+
+
+    def test_fast_path(self):
+        for npts, node_intervals in (
+            ((32, 24, 1), (1, 1, 1)),
+            ((12, 10, 8), (0.3, 1, 2)),
+            ((9, 1, 11), (2, 1, 0.5))
+        ):
+            vv = uniform(0.5, 2, (2, *npts))
+            src_idx = tuple(n // 3 for n in npts)
+            solvers = []
+            for fast_path in (False, True):
+                solver = point_source_solver(vv[0], src_idx, node_intervals)
+                solver.fast_path = fast_path
+                solver.solve()
+                solvers.append(solver)
+            expected, solver = solvers
+            np.testing.assert_allclose(
+                solver.traveltime.values,
+                expected.traveltime.values,
+                rtol=RTOL
+            )
+            np.testing.assert_array_equal(solver.known, expected.known)
+            np.testing.assert_array_equal(solver.unknown, expected.unknown)
+
+            solver = point_source_solver(vv[0], src_idx, node_intervals)
+            tt = solver.solve_batch(vv)
+            np.testing.assert_allclose(tt[0], expected.traveltime.values, rtol=RTOL)
+
+
+    def test_solver_2d(self):
+        for node_intervals in ((1, 1, 1), (0.5, 2, 1)):
+            vv = uniform(0.5, 2, (2, 40, 30, 1))
+            expected = point_source_solver(vv[0], (3, 5, 0), node_intervals)
+            expected.solve()
+            solver = point_source_solver(
+                vv[0], (3, 5, 0), node_intervals, cls=pykonal.EikonalSolver2D
+            )
+            solver.solve()
+            np.testing.assert_array_equal(
+                solver.traveltime.values,
+                expected.traveltime.values
+            )
+            np.testing.assert_array_equal(solver.known, expected.known)
+
+            solver = point_source_solver(
+                vv[0], (3, 5, 0), node_intervals, cls=pykonal.EikonalSolver2D
+            )
+            tt = solver.solve_batch(vv)
+            np.testing.assert_array_equal(tt[0], expected.traveltime.values)
+
+        solver = point_source_solver(np.ones((50, 40, 1)), cls=pykonal.EikonalSolver2D)
+        solver.solve()
+        ray = solver.trace_ray(np.array([30., 20.], dtype=pykonal.constants.DTYPE_REAL))
+        self.assertEqual(ray.shape[1], 2)
+        np.testing.assert_allclose(ray[-1], [30, 20])
+        np.testing.assert_allclose(ray[0], [0, 0], atol=1)
+        # The ray is the straight line back to the source.
+        np.testing.assert_allclose(ray[:, 0] * 20 - ray[:, 1] * 30, 0, atol=20)
+
+        solver = point_source_solver(np.ones((8, 8, 2)), cls=pykonal.EikonalSolver2D)
+        with self.assertRaises(ValueError):
+            solver.solve()
+
+
+    def test_fast_sweeping(self):
+        # A plane wave along an axis is solved exactly.
+        vv = np.full((20, 12, 9), 2.0)
+        solver = point_source_solver(vv, None, (0.5, 1, 1), method="fsm")
+        solver.initialize_sources(
+            np.stack(np.nonzero(np.ones((1, 12, 9))), axis=-1)
+        )
+        solver.solve()
+        np.testing.assert_allclose(
+            solver.traveltime.values,
+            solver.traveltime.nodes[..., 0] / 2
+        )
+
+        for npts, node_intervals, cls in (
+            ((40, 30, 1), (1, 0.5, 1), pykonal.EikonalSolver2D),
+            ((24, 20, 16), (1, 1, 2), None)
+        ):
+            vv = uniform(0.5, 2, (2, *npts))
+            # Obstacles the front has to go around.
+            vv[:, 10:12, :-5] = 0
+            src_idx = (2, 2, 0)
+            expected = point_source_solver(vv[0], src_idx, node_intervals, cls)
+            expected.solve()
+            solver = point_source_solver(
+                vv[0], src_idx, node_intervals, cls, method="fsm"
+            )
+            solver.solve()
+            reached = np.isfinite(expected.traveltime.values)
+            np.testing.assert_array_equal(
+                np.isfinite(solver.traveltime.values),
+                reached
+            )
+            # First-order sweeping vs. second-order marching.
+            np.testing.assert_allclose(
+                solver.traveltime.values[reached],
+                expected.traveltime.values[reached],
+                rtol=0.1,
+                atol=0.5
+            )
+            np.testing.assert_array_equal(solver.known, expected.known)
+            np.testing.assert_array_equal(solver.unknown, expected.unknown)
+            self.assertEqual(solver.trial.size, 0)
+
+            swept = solver.traveltime.values
+            solver = point_source_solver(
+                vv[0], src_idx, node_intervals, cls, method="fsm"
+            )
+            tt = solver.solve_batch(vv)
+            np.testing.assert_array_equal(tt[0], swept)
+
+            solver = point_source_solver(
+                vv[0], src_idx, node_intervals, cls, method="fsm"
+            )
+            solver.max_sweep_iterations = 1
+            with self.assertWarns(RuntimeWarning):
+                solver.solve()
+
+        with self.assertRaises(ValueError):
+            pykonal.EikonalSolver(coord_sys="spherical", method="fsm")
+        with self.assertRaises(ValueError):
+            pykonal.EikonalSolver(method="dijkstra")
+
+
+    def test_solver_stats(self):
+        vv = uniform(0.5, 2, (3, 16, 12, 10))
+        vv[:, 6:8, :-3] = 0
+        for kwargs, fast_path in (
+            ({"heap_type": "binary"}, True),
+            ({"heap_type": "bucket"}, True),
+            ({"heap_type": "quaternary"}, False),
+            ({"method": "fsm"}, True)
+        ):
+            solver = point_source_solver(vv[0], src_idx=(1, 2, 0), **kwargs)
+            solver.solve()
+            self.assertIsNone(solver.stats)
+
+            solver = point_source_solver(vv[0], src_idx=(1, 2, 0), **kwargs)
+            solver.fast_path = fast_path
+            solver.collect_stats = True
+            solver.solve()
+            stats = solver.stats
+            self.assertEqual(stats["solves"], 1)
+            self.assertGreater(stats["stencil_evaluations"], 0)
+            self.assertEqual(
+                stats["stencil_evaluations"],
+                stats["first_order_updates"]
+                + stats["second_order_updates"]
+                + stats["degenerate_updates"]
+            )
+            self.assertLessEqual(
+                stats["accepted_updates"],
+                stats["stencil_evaluations"]
+            )
+            for phase in ("setup", "restart", "propagate", "finalize"):
+                self.assertGreaterEqual(stats[f"time_{phase}"], 0)
+                self.assertLessEqual(stats[f"time_{phase}"], stats["time_total"])
+            if kwargs.get("method") == "fsm":
+                self.assertGreater(stats["sweeps"], 0)
+                self.assertEqual(stats["pops"], 0)
+                continue
+            # Every node reached, but the source pushed before solving,
+            # goes through Trial once.
+            reached = np.isfinite(solver.traveltime.values).sum()
+            self.assertEqual(stats["pops"], reached)
+            self.assertEqual(stats["pushes"], reached - 1)
+            self.assertGreater(stats["second_order_updates"], 0)
+
+            solver = point_source_solver(vv[0], src_idx=(1, 2, 0), **kwargs)
+            solver.fast_path = fast_path
+            solver.collect_stats = True
+            tt = solver.solve_batch(vv)
+            self.assertEqual(solver.stats["solves"], vv.shape[0])
+            self.assertEqual(
+                solver.stats["pops"],
+                np.isfinite(tt).sum()
+            )
+
+            solver.collect_stats = False
+            solver.solve_batch(vv)
+            self.assertIsNone(solver.stats)
+
+
 if __name__ == '__main__':
     nose.main()
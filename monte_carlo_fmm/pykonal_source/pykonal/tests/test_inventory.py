@@ -0,0 +1,100 @@
+import numpy as np
+import os
+import pykonal
+import tempfile
+import unittest
+
+
+def scalar_field(values, min_coords=(0, 0, 0), node_intervals=(1, 1, 1)):
+    field = pykonal.fields.ScalarField3D(coord_sys="cartesian")
+    field.min_coords = min_coords
+    field.node_intervals = node_intervals
+    field.npts = values.shape
+    field.values = values
+    return (field)
+
+
+class TraveltimeInventoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fields = {
+            f"XX/ST{i:02d}/P": scalar_field(np.random.uniform(0, 10, (20, 15, 10)))
+            for i in range(4)
+        }
+        self.fields["YY/ODD/S"] = scalar_field(
+            np.random.uniform(0, 10, (8, 8, 8)),
+            min_coords=(1, 2, 3)
+        )
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+    def check_inventory(self, path, **kwargs):
+        with pykonal.inventory.TraveltimeInventory(path, mode="w", **kwargs) as inventory:
+            for key, field in self.fields.items():
+                inventory.add(field, key)
+
+        min_coords, max_coords = (2.5, 3, 1), (11, 9.5, 4)
+        with pykonal.inventory.TraveltimeInventory(path, mode="r") as inventory:
+            self.assertEqual(inventory.backend, kwargs.get("backend", "hdf5"))
+            self.assertEqual(sorted(inventory.keys()), sorted(self.fields))
+            for key, field in self.fields.items():
+                read = inventory.read(key)
+                np.testing.assert_array_equal(read.values, field.values)
+                np.testing.assert_array_equal(read.min_coords, field.min_coords)
+
+            keys = [key for key in self.fields if key.startswith("XX")]
+            expected = [inventory.read(key, min_coords, max_coords) for key in keys]
+            self.assertEqual(tuple(expected[0].npts), (10, 8, 4))
+            np.testing.assert_array_equal(
+                expected[0].values,
+                self.fields[keys[0]].values[2:12, 3:11, 1:5]
+            )
+            for many in (
+                inventory.read_many(keys, min_coords, max_coords),
+                inventory.read_many(keys + ["YY/ODD/S"], min_coords, max_coords)
+            ):
+                for field, other in zip(many, expected):
+                    np.testing.assert_array_equal(field.values, other.values)
+                    np.testing.assert_array_equal(field.min_coords, other.min_coords)
+                    np.testing.assert_array_equal(field.npts, other.npts)
+        return (inventory)
+
+
+    def test_hdf5(self):
+        path = os.path.join(self.tmpdir.name, "contiguous.h5")
+        self.check_inventory(path)
+
+        path = os.path.join(self.tmpdir.name, "chunked.h5")
+        self.check_inventory(path, chunks=(8, 8, 32), compression="gzip")
+        with pykonal.inventory.TraveltimeInventory(path) as inventory:
+            values = inventory.f5["XX/ST00/P/values"]
+            self.assertEqual(values.chunks, (8, 8, 10))
+            self.assertEqual(values.compression, "gzip")
+            # Fields on a common grid are stacked into one array.
+            fields = inventory.read_many(["XX/ST00/P", "XX/ST01/P"])
+            address = [field.values.__array_interface__["data"][0] for field in fields]
+            self.assertEqual(address[1] - address[0], fields[0].values.nbytes)
+
+
+    def test_npy(self):
+        path = os.path.join(self.tmpdir.name, "inventory")
+        self.check_inventory(path, backend="npy")
+        with pykonal.inventory.TraveltimeInventory(path) as inventory:
+            self.assertEqual(inventory.backend, "npy")
+            field = inventory.read("XX/ST00/P", (2, 2, 2))
+            # Values are a writable, copy-on-write view of the file.
+            self.assertFalse(field.values.flags.owndata)
+            field.values[:] = -1
+            np.testing.assert_array_equal(
+                inventory.read("XX/ST00/P").values,
+                self.fields["XX/ST00/P"].values
+            )
+            with self.assertRaises(ValueError):
+                inventory.add(self.fields["XX/ST00/P"], "XX/ST99/P")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,8 +4,9 @@ setup.py adapted from https://github.com/kennethreitz/setup.py
 import io
 import numpy as np
 import os
+import sys
 #from distutils.core import setup
-from setuptools import setup
+from setuptools import Extension, setup
 from Cython.Build import cythonize
 
 
@@ -18,18 +19,42 @@ author          = "Malcolm C. A. White"
 requires_python = ">=3"
 packages        = ["pykonal"]
 package_data    = {
-    "pykonal": ["data/*", "data/marmousi2/*", "tests/data/*"],
+    "pykonal": ["*.h", "data/*", "data/marmousi2/*", "tests/data/*"],
 }
 required        = ["cython>=0.29.14", "h5py", "numpy", "scipy"]
 extras          = {"tests": ["nose"]}
+# Batched interpolation in pykonal.fields and the fast sweeping method
+# in pykonal.solver run on OpenMP threads where the compiler supports
+# it out of the box (Apple clang does not).
+openmp_flags    = [] if sys.platform in ("darwin", "win32") else ["-fopenmp"]
+# PYKONAL_REAL=float32 builds PyKonal with single-precision fields (see
+# pykonal/real.h). The generated C sources are the same for both
+# precisions, so rebuild with build_ext --force when switching.
+real            = os.environ.get("PYKONAL_REAL", "float64")
+if real not in ("float32", "float64"):
+    raise ValueError("PYKONAL_REAL must be float32 or float64.")
+define_macros   = [("PYKONAL_REAL_FLOAT32", None)] if real == "float32" else []
+
+
+def extension(module, parallel=False):
+    flags = openmp_flags if parallel else []
+    return Extension(
+        f"pykonal.{module}",
+        [f"pykonal/{module}.pyx"],
+        define_macros=define_macros,
+        extra_compile_args=flags,
+        extra_link_args=flags
+    )
+
+
 ext_modules     = cythonize(
     [
-        "pykonal/constants.pyx",
-        "pykonal/fields.pyx",
-        "pykonal/heapq.pyx",
-        "pykonal/locate.pyx",
-        "pykonal/solver.pyx",
-        "pykonal/stats.pyx"
+        extension("constants"),
+        extension("fields", parallel=True),
+        extension("heapq"),
+        extension("locate", parallel=True),
+        extension("solver", parallel=True),
+        extension("stats")
     ],
     compiler_directives={
         "language_level": 3,
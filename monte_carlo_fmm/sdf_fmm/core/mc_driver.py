@@ -1,7 +1,126 @@
+import os
+import threading
+from statistics import NormalDist
+
 import numpy as np
-from .sdf_sampling import sample_sdf
+import pykonal
+from .sdf_sampling import narrow_band, plan_sdf_draws, sample_sdf_from_draw
 from .speed_mapping import sdf_to_speed
 from .solver import setup_solver_from_speed
+from .parallel import batched, ordered_map
+from .running_stats import RunningStats
+
+
+# Each worker thread (or process) keeps the solver of its previous
+# batch and resets it for the next one on the same grid.
+_worker = threading.local()
+
+
+def _batch_solver(speed, src_idx, min_coords, node_intervals, method,
+                  collect_stats=False):
+    """
+    Solver for one batch, reusing this worker's previous solver when
+    its grid matches.
+    """
+    grid = (speed.shape, tuple(min_coords), tuple(node_intervals))
+    solver = getattr(_worker, "solver", None)
+    if solver is not None and _worker.grid != grid:
+        solver = None
+    _worker.grid = grid
+    _worker.solver = setup_solver_from_speed(
+        speed,
+        min_coords=min_coords,
+        node_intervals=node_intervals,
+        src_idx=src_idx,
+        solver=solver,
+        method=method,
+    )
+    _worker.solver.collect_stats = collect_stats
+    return _worker.solver
+
+
+def _traveltime_batch(draws, mean_sdf, std_sdf, modes, correlation,
+                      band, base_speed, baseline, src_idx, min_coords,
+                      node_intervals, method, collect_stats=False):
+    """
+    Solve one batch of Monte Carlo samples, one planned draw per sample.
+
+    Returns the (n, nx, ny, nz) stack of travel-time fields and the
+    solver statistics of the batch (None unless `collect_stats`).
+    """
+    shape_3d = mean_sdf.shape + (1,) if mean_sdf.ndim == 2 else mean_sdf.shape
+
+    # Speeds are stored at the precision of the PyKonal build.
+    speeds = np.empty((len(draws),) + shape_3d,
+                      dtype=pykonal.constants.DTYPE_REAL)
+    for k, draw in enumerate(draws):
+        sdf_k = sample_sdf_from_draw(mean_sdf, std_sdf, draw, modes,
+                                     correlation, band)
+        if band is None:
+            sdf_to_speed(sdf_k, out=speeds[k].reshape(mean_sdf.shape))
+        else:
+            # Only the band differs from the mean-SDF speed.
+            speeds[k] = base_speed
+            speeds[k].reshape(-1)[band] = sdf_to_speed(sdf_k, out=sdf_k)
+
+    solver = _batch_solver(speeds[0], src_idx, min_coords, node_intervals,
+                           method, collect_stats)
+    if baseline is None:
+        T_batch = solver.solve_batch(speeds)
+    else:
+        T_batch = solver.solve_batch(speeds, baseline, speeds != base_speed)
+    return T_batch, solver.stats
+
+
+def _add_solver_stats(total, stats):
+    """
+    Sum the `EikonalSolver.stats` of a batch into the dict `total`.
+    """
+    for name, value in stats.items():
+        total[name] = total.get(name, 0) + value
+
+
+def _narrow_band_speed(mean_sdf, std_sdf, band_threshold, shape):
+    """
+    Band indices and cached mean-SDF speed, or (None, None) if disabled.
+    """
+    if band_threshold is None:
+        return None, None
+    band = narrow_band(std_sdf, band_threshold)
+    base_speed = sdf_to_speed(mean_sdf).reshape(shape)
+    return band, base_speed.astype(pykonal.constants.DTYPE_REAL, copy=False)
+
+
+def _baseline_traveltime(base_speed, incremental, src_idx,
+                         min_coords, node_intervals, method):
+    """
+    Travel times of the mean-SDF speed for incremental re-solves, or None.
+    """
+    if not incremental:
+        return None
+    if base_speed is None:
+        raise ValueError("incremental requires band_threshold.")
+    if method != "fmm":
+        raise ValueError("incremental requires method='fmm'.")
+    solver = setup_solver_from_speed(
+        base_speed,
+        min_coords=min_coords,
+        node_intervals=node_intervals,
+        src_idx=src_idx,
+    )
+    solver.solve()
+    return solver.traveltime.values
+
+
+def _correlation_options(correlation, sampler, node_intervals):
+    """
+    Validate `correlation` and default its grid spacing to node_intervals.
+    """
+    if correlation is None:
+        return None
+    if sampler not in ("iid", "antithetic"):
+        raise ValueError("correlation is only supported with the iid or antithetic sampler.")
+    return {"spacing": tuple(node_intervals), **correlation}
 
 
 def monte_carlo_traveltime(mean_sdf: np.ndarray,
@@ -10,38 +129,204 @@ def monte_carlo_traveltime(mean_sdf: np.ndarray,
                            src_idx=(0, 0, 0),
                            min_coords=(0.0, 0.0, 0.0),
                            node_intervals=(1.0, 1.0, 1.0),
-                           rng_seed=None):
+                           rng_seed=None,
+                           batch_size: int = 1,
+                           n_workers: int = 1,
+                           executor: str = "thread",
+                           sampler: str = "iid",
+                           modes=None,
+                           correlation=None,
+                           band_threshold: float = None,
+                           incremental: bool = False,
+                           method: str = "fmm",
+                           quantile_edges=None,
+                           return_stats: bool = False,
+                           solver_stats: dict = None):
     """
     Monte Carlo evaluation of travel-time field.
+
+    Sample k draws its SDF from its own `SeedSequence(rng_seed)` child
+    stream. `sampler` selects a variance-reduction scheme instead
+    ("antithetic", "sobol" or "lhs", optionally over `modes` low-rank
+    DCT modes per axis; see `plan_sdf_draws`). `correlation` (options
+    for `gaussian_random_field`, spacing defaulting to node_intervals)
+    swaps the per-voxel noise for a spatially correlated field. With
+    `band_threshold`, only voxels whose std exceeds it are perturbed
+    (see `narrow_band`); each sample then starts from the cached speed
+    of mean_sdf and re-maps just the band. `incremental=True` (band
+    only) additionally solves mean_sdf once and re-propagates each
+    sample only downstream of its first changed voxel
+    (`EikonalSolver.solve_incremental`).
+    `method="fsm"` solves each sample with the Fast Sweeping Method
+    instead of the FMM (see `EikonalSolver.method`): first-order
+    accurate, and parallel over OpenMP threads within each solve, so
+    it pairs with few workers; it cannot be combined with
+    `incremental`.
+
+    Samples are solved in batches of `batch_size` realizations with
+    `EikonalSolver.solve_batch`, which reuses one solver workspace for
+    the whole batch. Batches are spread over `n_workers` threads
+    (`executor="thread"`; the solver releases the GIL) or processes
+    (`executor="process"`); `n_workers=None` uses every core.
+
+    Samples are folded into a `RunningStats` accumulator in sample
+    order as batches complete, so memory stays O(grid) and the results
+    are bit-identical for any `n_workers`, `executor` and `batch_size`.
+    Pass `quantile_edges` to also keep a per-voxel quantile sketch, and
+    `return_stats=True` to get the accumulator itself (e.g. to `merge`
+    it with other chunks of a distributed run) instead of
+    (mean_T, var_T).
+
+    Pass a dict as `solver_stats` to have the `EikonalSolver.stats` of
+    every batch (heap operations, updates, quadratic clamps, wall time
+    per phase) summed into it, to diagnose slow or inaccurate worlds.
+    """
+
+    if mean_sdf.ndim == 2:
+        shape_3d = mean_sdf.shape + (1,)
+    else:
+        shape_3d = mean_sdf.shape
+
+    stats = RunningStats(shape_3d, quantile_edges=quantile_edges)
+
+    correlation = _correlation_options(correlation, sampler, node_intervals)
+    band, base_speed = _narrow_band_speed(mean_sdf, std_sdf, band_threshold, shape_3d)
+    baseline = _baseline_traveltime(base_speed, incremental, src_idx,
+                                    min_coords, node_intervals, method)
+    draws = plan_sdf_draws(mean_sdf.shape, num_samples, method=sampler,
+                           rng_seed=rng_seed, modes=modes, band=band)
+    tasks = (
+        (batch, mean_sdf, std_sdf, modes, correlation, band, base_speed,
+         baseline, src_idx, min_coords, node_intervals, method,
+         solver_stats is not None)
+        for batch in batched(draws, batch_size)
+    )
+
+    for T_batch, batch_stats in ordered_map(_traveltime_batch, tasks,
+                                            n_workers=n_workers,
+                                            executor=executor):
+        for T in T_batch:
+            stats.update(T)
+        if solver_stats is not None:
+            _add_solver_stats(solver_stats, batch_stats)
+
+    if return_stats:
+        return stats
+
+    return stats.mean, stats.var()
+
+
+def _ci_converged(stats, roi, z, tol_mean, tol_var):
+    """
+    True once the confidence-interval half-widths z * SE of E[T] (and
+    Var[T], if requested) are within tolerance at every ROI voxel.
+
+    Voxels the front never reaches (non-finite T) are ignored.
+    """
+    mask = roi & np.isfinite(stats.mean)
+    if not mask.any():
+        return True
+    if tol_mean is not None and z * stats.sem()[mask].max() > tol_mean:
+        return False
+    if tol_var is not None and z * stats.var_se()[mask].max() > tol_var:
+        return False
+    return True
+
+
+def monte_carlo_traveltime_adaptive(mean_sdf: np.ndarray,
+                                    std_sdf: np.ndarray,
+                                    tol_mean: float = None,
+                                    tol_var: float = None,
+                                    roi: np.ndarray = None,
+                                    confidence: float = 0.95,
+                                    min_samples: int = 16,
+                                    max_samples: int = 1000,
+                                    check_every: int = None,
+                                    src_idx=(0, 0, 0),
+                                    min_coords=(0.0, 0.0, 0.0),
+                                    node_intervals=(1.0, 1.0, 1.0),
+                                    rng_seed=None,
+                                    batch_size: int = 1,
+                                    n_workers: int = 1,
+                                    executor: str = "thread",
+                                    correlation=None,
+                                    band_threshold: float = None,
+                                    incremental: bool = False,
+                                    method: str = "fmm",
+                                    return_stats: bool = False,
+                                    solver_stats: dict = None):
     """
+    Monte Carlo travel-time field with early stopping.
+
+    Samples are drawn in rounds of `check_every` (default: one batch
+    per worker) until the `confidence` interval half-width of E[T] is
+    <= `tol_mean` and, if given, that of Var[T] is <= `tol_var` at
+    every voxel of `roi` (default: free space, mean_sdf > 0), or until
+    `max_samples` is reached. At least `min_samples` are always drawn.
+
+    Sample k uses the same seed stream as in `monte_carlo_traveltime`,
+    so a run that stops after N samples equals a fixed run with
+    num_samples=N. `correlation`, `band_threshold`, `incremental`,
+    `method` and `solver_stats` are as in `monte_carlo_traveltime`.
+    Only i.i.d. sampling is supported: the standard errors assume
+    independent samples, and QMC point sets cannot be extended round
+    by round.
+
+    Returns:
+        mean_T, var_T, n_samples   (or the RunningStats accumulator if
+                                    return_stats=True; its `count` is
+                                    the number of samples used)
+    """
+
+    if tol_mean is None and tol_var is None:
+        raise ValueError("At least one of tol_mean or tol_var is required.")
 
     if mean_sdf.ndim == 2:
         shape_3d = mean_sdf.shape + (1,)
     else:
         shape_3d = mean_sdf.shape
 
-    rng = np.random.default_rng(rng_seed)
+    if roi is None:
+        roi = mean_sdf > 0.0
+    roi = np.asarray(roi, dtype=bool).reshape(shape_3d)
 
-    sum_T = np.zeros(shape_3d)
-    sum_T2 = np.zeros(shape_3d)
+    if check_every is None:
+        check_every = batch_size * (
+            os.cpu_count() or 1 if n_workers is None else max(n_workers, 1)
+        )
 
-    for k in range(num_samples):
-        sdf_k = sample_sdf(mean_sdf, std_sdf, rng)
-        speed_k = sdf_to_speed(sdf_k)
+    correlation = _correlation_options(correlation, "iid", node_intervals)
+    band, base_speed = _narrow_band_speed(mean_sdf, std_sdf, band_threshold, shape_3d)
+    baseline = _baseline_traveltime(base_speed, incremental, src_idx,
+                                    min_coords, node_intervals, method)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    seq = np.random.SeedSequence(rng_seed)
+    stats = RunningStats(shape_3d, higher_moments=tol_var is not None)
 
-        solver = setup_solver_from_speed(
-            speed_k,
-            min_coords=min_coords,
-            node_intervals=node_intervals,
-            src_idx=src_idx,
+    while stats.count < max_samples:
+        n_new = min(
+            max(check_every, min_samples - stats.count),
+            max_samples - stats.count,
+        )
+        draws = plan_sdf_draws(mean_sdf.shape, n_new, rng_seed=seq, band=band)
+        tasks = (
+            (batch, mean_sdf, std_sdf, None, correlation, band, base_speed,
+             baseline, src_idx, min_coords, node_intervals, method,
+             solver_stats is not None)
+            for batch in batched(draws, batch_size)
         )
-        solver.solve()
+        for T_batch, batch_stats in ordered_map(_traveltime_batch, tasks,
+                                                n_workers=n_workers,
+                                                executor=executor):
+            for T in T_batch:
+                stats.update(T)
+            if solver_stats is not None:
+                _add_solver_stats(solver_stats, batch_stats)
 
-        T = solver.traveltime.values.copy()
-        sum_T += T
-        sum_T2 += T**2
+        if _ci_converged(stats, roi, z, tol_mean, tol_var):
+            break
 
-    mean_T = sum_T / num_samples
-    var_T = sum_T2 / num_samples - mean_T**2
+    if return_stats:
+        return stats
 
-    return mean_T, var_T
+    return stats.mean, stats.var(), stats.count
@@ -1,6 +1,7 @@
 import numpy as np
 from .sdf_sampling import sample_sdf
 from .speed_mapping import sdf_to_speed
+from .running_stats import RunningStats
 
 
 def monte_carlo_speedfield(mean_sdf, std_sdf, num_samples, rng_seed=None):
@@ -15,20 +16,15 @@ def monte_carlo_speedfield(mean_sdf, std_sdf, num_samples, rng_seed=None):
     rng = np.random.default_rng(rng_seed)
 
     nx, ny = mean_sdf.shape
-    sum_S = np.zeros((nx, ny))
-    sum_S2 = np.zeros((nx, ny))
+    stats = RunningStats((nx, ny))
 
     for _ in range(num_samples):
         # Sample SDF realization
         sdf_k = sample_sdf(mean_sdf, std_sdf, rng)
 
-        # Convert to speed
-        S_k = sdf_to_speed(sdf_k)
+        # Convert to speed (in place; the sample is not needed afterwards)
+        S_k = sdf_to_speed(sdf_k, out=sdf_k)
 
-        sum_S  += S_k
-        sum_S2 += S_k**2
+        stats.update(S_k)
 
-    mean_S = sum_S / num_samples
-    var_S  = sum_S2 / num_samples - mean_S**2
-
-    return mean_S, var_S
+    return stats.mean, stats.var()
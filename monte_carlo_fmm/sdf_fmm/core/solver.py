@@ -5,16 +5,38 @@ import pykonal
 def setup_solver_from_speed(speed: np.ndarray,
                             min_coords=(0.0, 0.0, 0.0),
                             node_intervals=(1.0, 1.0, 1.0),
-                            src_idx=(0, 0, 0)) -> pykonal.EikonalSolver:
+                            src_idx=(0, 0, 0),
+                            solver=None,
+                            method: str = "fmm") -> pykonal.EikonalSolver:
     """
     Creates and initializes a PyKonal solver.
+
+    2D grids (a single node along the third axis) get an
+    `EikonalSolver2D`, which propagates with a 4-neighbour stencil.
+    `src_idx` is one (ix, iy, iz) node or an (N, 3) array of source
+    nodes (e.g. a goal set), all solved for in a single pass.
+
+    Passing a `solver` previously set up on the same grid resets and
+    reuses it (`EikonalSolver.reset`) instead of allocating a new one.
+
+    `method` is "fmm" (Fast Marching) or "fsm" (Fast Sweeping, on
+    OpenMP threads); see `EikonalSolver.method`.
     """
     # Expand 2D → 3D for PyKonal
     speed_3d = speed[:, :, None] if speed.ndim == 2 else speed
 
+    if solver is not None:
+        solver.reset(speed_3d)
+        solver.method = method
+        solver.initialize_sources(src_idx)
+        return solver
+
     nx, ny, nz = speed_3d.shape
 
-    solver = pykonal.EikonalSolver(coord_sys="cartesian")
+    if nz == 1:
+        solver = pykonal.EikonalSolver2D(method=method)
+    else:
+        solver = pykonal.EikonalSolver(coord_sys="cartesian", method=method)
 
     solver.velocity.min_coords = min_coords
     solver.velocity.node_intervals = node_intervals
@@ -25,8 +47,6 @@ def setup_solver_from_speed(speed: np.ndarray,
     solver.traveltime.node_intervals = node_intervals
     solver.traveltime.npts = (nx, ny, nz)
 
-    solver.traveltime.values[src_idx] = 0.0
-    solver.unknown[src_idx] = False
-    solver.trial.push(*src_idx)
+    solver.initialize_sources(src_idx)
 
     return solver
@@ -1,29 +1,59 @@
 import numpy as np
 
 
+def _output(sdf, out):
+    """
+    Validate or allocate (as float64) the output buffer of a speed
+    mapping; float32 buffers serve single-precision PyKonal builds.
+    """
+    if out is None:
+        return np.empty(np.shape(sdf), dtype=np.float64)
+    if out.shape != np.shape(sdf) or out.dtype not in (np.float32, np.float64):
+        raise ValueError("out must be a float32 or float64 array with the shape of sdf.")
+    return out
+
+
+def _mask(sdf, mask):
+    """
+    Validate or allocate the boolean scratch mask of a speed mapping.
+    """
+    if mask is None:
+        return np.empty(np.shape(sdf), dtype=bool)
+    if mask.shape != np.shape(sdf) or mask.dtype != bool:
+        raise ValueError("mask must be a boolean array with the shape of sdf.")
+    return mask
+
+
 def sdf_to_speed_smooth(sdf: np.ndarray,
                  base_speed: float = 1.0,
                  d_safe: float = 1.0,
-                 v_min: float = 1e-3) -> np.ndarray:
+                 v_min: float = 1e-3,
+                 out: np.ndarray = None,
+                 mask: np.ndarray = None) -> np.ndarray:
     """
     Placeholder mapping SDF d(q) -> S*(q).
     Replace with your real S* model.
 
     Speed is low inside obstacles and increases smoothly with distance.
-    """
-    speed = np.empty_like(sdf, dtype=np.float64)
-
-    # Inside or touching obstacle
-    inside = sdf <= 0.0
-    speed[inside] = v_min
 
-    # Transition band
-    band = (sdf > 0.0) & (sdf < d_safe)
-    t = np.clip(sdf[band] / d_safe, 0.0, 1.0)
-    speed[band] = v_min + (base_speed - v_min) * t**2
-
-    # Far from obstacles
-    speed[sdf >= d_safe] = base_speed
+    All speed mappings in this module evaluate in place in `out`
+    (allocated if None, and may be `sdf` itself), so per-sample calls
+    with a reused buffer allocate no temporaries. `mask` is an optional
+    boolean scratch array of sdf's shape.
+    """
+    # The far region is taken before `out` may overwrite `sdf`.
+    far = np.greater_equal(sdf, d_safe, out=_mask(sdf, mask))
+    speed = _output(sdf, out)
+
+    # t = clip(d / d_safe, 0, 1) is 0 inside obstacles, so one expression
+    # covers the inside and the transition band. The far region is set to
+    # base_speed exactly, which (base_speed - v_min) + v_min need not be.
+    np.divide(sdf, d_safe, out=speed)
+    np.clip(speed, 0.0, 1.0, out=speed)
+    np.square(speed, out=speed)
+    speed *= base_speed - v_min
+    speed += v_min
+    np.copyto(speed, base_speed, where=far)
 
     return speed
 
@@ -32,6 +62,7 @@ def sdf_to_speed(
     s_const: float = 1.0,
     d_min: float = 0.005,
     d_max: float = 0.8,
+    out: np.ndarray = None,
 ) -> np.ndarray:
     """
     Compute S*(q) from SDF using the original linear clipped formula:
@@ -49,24 +80,25 @@ def sdf_to_speed(
         s_const: Base speed scaling constant (s_const > 0).
         d_min: Minimum distance for clipping.
         d_max: Maximum distance for clipping.
+        out: Optional float32/float64 output buffer (may be `sdf` itself).
 
     Returns:
         speed: S*(q) with same shape as sdf.
     """
 
+    speed = _output(sdf, out)
+
     # Distance to obstacles: 0 inside, positive outside
-    dist = np.maximum(sdf, 0.0)
+    np.maximum(sdf, 0.0, out=speed)
 
     # Clip distance into [d_min, d_max]
-    dist_clipped = np.clip(dist, d_min, d_max)
+    np.clip(speed, d_min, d_max, out=speed)
 
     # Apply S*(q) formula
-    speed = (s_const / d_max) * dist_clipped
+    speed *= s_const / d_max
 
     return speed
 
-import numpy as np
-
 
 def sdf_to_speed_uncertainty_aware(
     sdf_mean: np.ndarray,
@@ -75,7 +107,8 @@ def sdf_to_speed_uncertainty_aware(
     d_min: float = 0.1,
     d_max: float = 1.0,
     lam: float = 2.0,
-    gamma: float = 2.0
+    gamma: float = 2.0,
+    out: np.ndarray = None,
 ) -> np.ndarray:
     """
     Uncertainty-aware S*(q) mapping.
@@ -93,21 +126,31 @@ def sdf_to_speed_uncertainty_aware(
         - Applies nonlinear smoothing for safe speed modulation.
     """
 
-    # 1. Conservative distance (std inflation)
-    d_u = np.maximum(sdf_mean - lam * sdf_std, 0.0)
+    speed = _output(sdf_mean, out)
+
+    # 1. Conservative distance (std inflation). When `out` is sdf_mean,
+    # lam * sdf_std needs its own temporary so sdf_mean is still intact
+    # when it is read.
+    if speed is sdf_mean:
+        speed -= lam * sdf_std
+    else:
+        np.multiply(sdf_std, lam, out=speed)
+        np.subtract(sdf_mean, speed, out=speed)
+    np.maximum(speed, 0.0, out=speed)
 
     # 2. Clip to [d_min, d_max]
-    d_c = np.clip(d_u, d_min, d_max)
+    np.clip(speed, d_min, d_max, out=speed)
 
     # 3. Normalize to [0,1]
-    r = (d_c - d_min) / (d_max - d_min)
-    r = np.clip(r, 0.0, 1.0)
+    speed -= d_min
+    speed /= d_max - d_min
+    np.clip(speed, 0.0, 1.0, out=speed)
 
     # 4. Apply smoothing exponent gamma ≥ 1
-    r_g = r ** gamma
+    speed **= gamma
 
     # 5. Scale final speed
-    speed = s_const * r_g
+    speed *= s_const
 
     return speed
 
@@ -117,7 +160,10 @@ def sdf_to_speed_long_tail(sdf,
                            v_min=1e-3,
                            L_transition=0.5,
                            L_tail=1.0,
-                           k_tail=0.1):
+                           k_tail=0.1,
+                           out=None,
+                           work=None,
+                           mask=None):
     """
     Long-tail speed model that preserves obstacle slowdown but introduces
     small global variation so Monte Carlo uncertainties propagate across
@@ -131,35 +177,53 @@ def sdf_to_speed_long_tail(sdf,
         L_transition : length scale for near-obstacle smoothing
         L_tail : global long-tail decay length scale
         k_tail : amplitude of long-tail modulation
+        out : optional float32/float64 output buffer
+        work : optional float32/float64 scratch array of sdf's shape
+        mask : optional boolean scratch array of sdf's shape
 
     Returns:
         speed field S*(q) with global sensitivity to sdf
     """
-    speed = np.empty_like(sdf, dtype=np.float64)
-
-    # ------------------------------
-    # 1. Inside obstacle
-    # ------------------------------
-    inside = sdf <= 0.0
-    speed[inside] = v_min
+    if work is not None and (work is sdf or work is out):
+        raise ValueError("work must be distinct from sdf and out.")
+    mask = _mask(sdf, mask)
+    work = _output(sdf, work)
 
-    # ------------------------------
-    # 2. Near-obstacle transition region
-    #    Smooth ramp to base speed
-    # ------------------------------
-    band = (sdf > 0.0) & (sdf < d_safe)
-    t = sdf[band] / d_safe
-    speed[band] = v_min + (base_speed - v_min) * (1 - np.exp(-(t / L_transition)**2))
+    # Both branches are evaluated over the whole grid and merged with
+    # one masked copy, which is much faster than masked ufunc loops.
+    # The far region and its speed are taken before `out` may
+    # overwrite `sdf`.
 
     # ------------------------------
     # 3. Far region with long-tail modulation
     # ------------------------------
-    far = sdf >= d_safe
+    far = np.greater_equal(sdf, d_safe, out=mask)
 
     # Long-tail Gaussian dip:
     # base_speed - k * exp(-(d/L_tail)^2)
     # gives global sensitivity without violating physical structure
-    tail = k_tail * np.exp(-(sdf[far] / L_tail)**2)
-    speed[far] = base_speed - tail
+    np.divide(sdf, L_tail, out=work)
+    np.square(work, out=work)
+    np.negative(work, out=work)
+    np.exp(work, out=work)
+    work *= k_tail
+    np.subtract(base_speed, work, out=work)
+
+    # ------------------------------
+    # 1. Inside obstacle and
+    # 2. near-obstacle transition region:
+    #    smooth ramp to base speed, which is v_min at d <= 0
+    # ------------------------------
+    speed = _output(sdf, out)
+    np.maximum(sdf, 0.0, out=speed)
+    speed /= d_safe
+    speed /= L_transition
+    np.square(speed, out=speed)
+    np.negative(speed, out=speed)
+    np.exp(speed, out=speed)
+    np.subtract(1, speed, out=speed)
+    speed *= base_speed - v_min
+    speed += v_min
+    np.copyto(speed, work, where=far)
 
-    return speed
\ No newline at end of file
+    return speed
@@ -13,6 +13,7 @@ from sdf_gen.utils import combine_sdfs
 from core.speed_mapping import sdf_to_speed
 from core.mc_driver import monte_carlo_traveltime
 from core.mc_speedfield import monte_carlo_speedfield
+from core.cache import ResultCache
 
 # Import visualizations
 from viz.plot_fields import (
@@ -30,6 +31,12 @@ from viz.plot_fields import (
 # ----------------------------------------------------------
 if __name__ == "__main__":
 
+    # Monte Carlo results are cached on disk
+    # ($MC_FMM_CACHE_DIR, default ~/.cache/mc_fmm) by a hash of their
+    # inputs, so reruns with unchanged parameters go straight to the
+    # plots.
+    cache = ResultCache()
+
     nx, ny = 64, 64
     map_size = 5.0
 
@@ -65,7 +72,7 @@ if __name__ == "__main__":
     heatmap2d(std_sdf**2, "Custom World: Raw SDF Variance", cmap="magma")
 
     # Speed from mean SDF
-    speed_mean = sdf_to_speed(mean_sdf)
+    speed_mean = cache.cached(sdf_to_speed, mean_sdf)
     plot_speed(speed_mean, "Speed Field S* from Mean SDF")
 
     # ------------------------------------------------------
@@ -75,7 +82,8 @@ if __name__ == "__main__":
 
     print("\nRunning Monte Carlo for speed field S* ...\n")
 
-    mean_S, var_S = monte_carlo_speedfield(
+    mean_S, var_S = cache.cached(
+        monte_carlo_speedfield,
         mean_sdf,
         std_sdf,
         num_samples=num_samples,
@@ -93,7 +101,8 @@ if __name__ == "__main__":
 
     print("\nRunning Monte Carlo FMM ...\n")
 
-    mean_T, var_T = monte_carlo_traveltime(
+    mean_T, var_T = cache.cached(
+        monte_carlo_traveltime,
         mean_sdf,
         std_sdf,
         num_samples=num_samples,
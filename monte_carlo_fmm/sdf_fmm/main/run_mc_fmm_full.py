@@ -6,6 +6,7 @@ from sdf_gen.random_world import generate_world_with_uncertainty
 from core.speed_mapping import sdf_to_speed
 from core.mc_driver import monte_carlo_traveltime
 from core.mc_speedfield import monte_carlo_speedfield
+from core.cache import ResultCache
 from viz.plot_fields import (
     plot_sdf_binary,
     plot_speed,
@@ -22,19 +23,28 @@ from viz.plot_fields import (
 # ----------------------------------------------------------
 if __name__ == "__main__":
 
+    # Worlds and Monte Carlo results are cached on disk
+    # ($MC_FMM_CACHE_DIR, default ~/.cache/mc_fmm) by a hash of their
+    # inputs, so reruns with unchanged parameters go straight to the
+    # plots.
+    cache = ResultCache()
+
     # Grid resolution
     nx, ny = 64, 64
 
     # Number of obstacles per world
     n_obstacles = 1
+    world_seed = 0
 
     print(f"\n=== Generating world with {n_obstacles} obstacles ===\n")
 
     # Generate full world SDF + uncertainty
-    mean_sdf, std_sdf = generate_world_with_uncertainty(
+    mean_sdf, std_sdf = cache.cached(
+        generate_world_with_uncertainty,
         nx, ny,
         n_obstacles=n_obstacles,
-        scale=0.05
+        scale=0.05,
+        np_random_seed=world_seed
     )
 
     # ------------------------------------------------------
@@ -43,7 +53,7 @@ if __name__ == "__main__":
     plot_sdf_binary(mean_sdf, "Mean SDF (Multi-Obstacle World)")
     sdf_variance = std_sdf**2
     heatmap2d(sdf_variance, "Raw SDF Variance (std^2)", cmap="magma")
-    speed_mean = sdf_to_speed(mean_sdf)
+    speed_mean = cache.cached(sdf_to_speed, mean_sdf)
     plot_speed(speed_mean, "Speed Field S*(q) from Mean SDF")
     
     # ------------------------------------------------------
@@ -53,7 +63,8 @@ if __name__ == "__main__":
 
     print(f"\nRunning Monte Carlo for speed field S*(q) with {num_samples} samples...\n")
 
-    mean_S, var_S = monte_carlo_speedfield(
+    mean_S, var_S = cache.cached(
+        monte_carlo_speedfield,
         mean_sdf,
         std_sdf,
         num_samples=num_samples,
@@ -74,7 +85,8 @@ if __name__ == "__main__":
     print(f"Running Monte Carlo FMM with {num_samples} samples...")
     print("This may take a few seconds depending on grid size.")
 
-    mean_T, var_T = monte_carlo_traveltime(
+    mean_T, var_T = cache.cached(
+        monte_carlo_traveltime,
         mean_sdf,
         std_sdf,
         num_samples=num_samples,
@@ -1,30 +1,152 @@
+import threading
+
 import numpy as np
+import pykonal
 from .solver_3d import setup_solver_from_speed_3d
 from .speed_mapping_3d import sdf_to_speed_3d
-from core_3D.sdf_sampling import sample_sdf   # identical in 3D
+from .parallel import batched, ordered_map
+from .running_stats import RunningStats
+from core_3D.sdf_sampling import narrow_band, plan_sdf_draws, sample_sdf_from_draw
+
+
+# Each worker thread (or process) keeps the solver of its previous
+# batch and resets it for the next one on the same grid.
+_worker = threading.local()
+
+
+def _batch_solver_3d(speed, src_idx, method, collect_stats=False):
+    """
+    Solver for one batch, reusing this worker's previous solver when
+    its grid matches.
+    """
+    solver = getattr(_worker, "solver", None)
+    if solver is not None and _worker.shape != speed.shape:
+        solver = None
+    _worker.shape = speed.shape
+    _worker.solver = setup_solver_from_speed_3d(speed, src_idx=src_idx,
+                                                solver=solver, method=method)
+    _worker.solver.collect_stats = collect_stats
+    return _worker.solver
+
+
+def _traveltime_batch_3d(draws, mean_sdf, std_sdf, modes, correlation,
+                         band, base_speed, baseline, src_idx, method,
+                         collect_stats=False):
+    """
+    Solve one batch of MC samples, one planned draw per sample; returns
+    the traveltimes and the solver statistics (None unless
+    `collect_stats`).
+    """
+    # Speeds are stored at the precision of the PyKonal build.
+    speeds = np.empty((len(draws),) + mean_sdf.shape,
+                      dtype=pykonal.constants.DTYPE_REAL)
+    # One scratch mask serves every sample of the batch.
+    mask = np.empty(mean_sdf.shape if band is None else band.shape, dtype=bool)
+    for k, draw in enumerate(draws):
+        sdf_k = sample_sdf_from_draw(mean_sdf, std_sdf, draw, modes,
+                                     correlation, band)
+        if band is None:
+            sdf_to_speed_3d(sdf_k, out=speeds[k], mask=mask)
+        else:
+            # Only the band differs from the mean-SDF speed.
+            speeds[k] = base_speed
+            speeds[k].reshape(-1)[band] = sdf_to_speed_3d(sdf_k, out=sdf_k, mask=mask)
+
+    solver = _batch_solver_3d(speeds[0], src_idx, method, collect_stats)
+    if baseline is None:
+        T_batch = solver.solve_batch(speeds)
+    else:
+        T_batch = solver.solve_batch(speeds, baseline, speeds != base_speed)
+    return T_batch, solver.stats
+
+
+def _add_solver_stats(total, stats):
+    """
+    Sum the EikonalSolver.stats of a batch into the dict `total`.
+    """
+    for name, value in stats.items():
+        total[name] = total.get(name, 0) + value
 
 
 def monte_carlo_traveltime_3d(mean_sdf, std_sdf, num_samples,
-                               src_idx=(0,0,0), rng_seed=None):
+                               src_idx=(0,0,0), rng_seed=None,
+                               batch_size=1, n_workers=1, executor="thread",
+                               sampler="iid", modes=None, correlation=None,
+                               band_threshold=None, incremental=False,
+                               method="fmm", quantile_edges=None,
+                               return_stats=False, solver_stats=None):
+    """
+    Monte Carlo E[T] and Var[T] in 3D.
+
+    Each sample uses its own SeedSequence child stream; batches of
+    `batch_size` samples run on `n_workers` threads or processes and
+    are folded into a RunningStats accumulator in sample order, so
+    results do not depend on the worker count. `return_stats=True`
+    returns the accumulator instead of (mean_T, var_T).
+
+    `sampler` picks "iid", "antithetic", "sobol" or "lhs" draws, the
+    latter two optionally over `modes` low-rank DCT modes per axis
+    (see `plan_sdf_draws`). With "iid" or "antithetic", `correlation`
+    (options for `gaussian_random_field`) swaps the per-voxel noise for
+    a spatially correlated field. `band_threshold` restricts sampling
+    to voxels whose std exceeds it (see `narrow_band`), re-mapping only
+    those on top of the cached speed of mean_sdf. With a band,
+    `incremental=True` solves mean_sdf once and re-propagates each
+    sample only downstream of its first changed voxel
+    (`EikonalSolver.solve_incremental`).
+
+    `method="fsm"` solves with the Fast Sweeping Method instead of the
+    FMM (see `EikonalSolver.method`): first-order accurate and run on
+    OpenMP threads within each solve, so use few workers with it. It
+    cannot be combined with `incremental`.
+
+    A dict passed as `solver_stats` accumulates the EikonalSolver.stats
+    of every batch (heap operations, updates, quadratic clamps, wall
+    time per phase), to diagnose slow or inaccurate worlds.
+    """
 
     nx, ny, nz = mean_sdf.shape
     
-    rng = np.random.default_rng(rng_seed)
-    sum_T = np.zeros((nx, ny, nz))
-    sum_T2 = np.zeros((nx, ny, nz))
+    stats = RunningStats((nx, ny, nz), quantile_edges=quantile_edges)
 
-    for _ in range(num_samples):
-        sdf_k = sample_sdf(mean_sdf, std_sdf, rng)
-        speed_k = sdf_to_speed_3d(sdf_k)
+    if correlation is not None and sampler not in ("iid", "antithetic"):
+        raise ValueError("correlation is only supported with the iid or antithetic sampler.")
 
-        solver = setup_solver_from_speed_3d(speed_k, src_idx=src_idx)
+    if band_threshold is None:
+        band = base_speed = None
+    else:
+        band = narrow_band(std_sdf, band_threshold)
+        base_speed = sdf_to_speed_3d(mean_sdf).astype(
+            pykonal.constants.DTYPE_REAL, copy=False
+        )
+
+    baseline = None
+    if incremental:
+        if band is None:
+            raise ValueError("incremental requires band_threshold.")
+        if method != "fmm":
+            raise ValueError("incremental requires method='fmm'.")
+        solver = setup_solver_from_speed_3d(base_speed, src_idx=src_idx)
         solver.solve()
-        T = solver.traveltime.values.copy()
+        baseline = solver.traveltime.values
+
+    draws = plan_sdf_draws(mean_sdf.shape, num_samples, method=sampler,
+                           rng_seed=rng_seed, modes=modes, band=band)
+    tasks = (
+        (batch, mean_sdf, std_sdf, modes, correlation, band, base_speed,
+         baseline, src_idx, method, solver_stats is not None)
+        for batch in batched(draws, batch_size)
+    )
 
-        sum_T += T
-        sum_T2 += T**2
+    for T_batch, batch_stats in ordered_map(_traveltime_batch_3d, tasks,
+                                            n_workers=n_workers,
+                                            executor=executor):
+        for T in T_batch:
+            stats.update(T)
+        if solver_stats is not None:
+            _add_solver_stats(solver_stats, batch_stats)
 
-    mean_T = sum_T / num_samples
-    var_T = sum_T2 / num_samples - mean_T**2
+    if return_stats:
+        return stats
 
-    return mean_T, var_T
+    return stats.mean, stats.var()
@@ -4,10 +4,19 @@ import pykonal
 
 def setup_solver_from_speed_3d(speed, min_coords=(0,0,0),
                                node_intervals=(1,1,1),
-                               src_idx=(0,0,0)):
+                               src_idx=(0,0,0), solver=None,
+                               method="fmm"):
+    # method is "fmm" (Fast Marching) or "fsm" (Fast Sweeping).
+    if solver is not None:
+        # Reuse a solver set up on the same grid without reallocating.
+        solver.reset(speed)
+        solver.method = method
+        solver.initialize_sources(src_idx)
+        return solver
+
     nx, ny, nz = speed.shape
 
-    solver = pykonal.EikonalSolver(coord_sys="cartesian")
+    solver = pykonal.EikonalSolver(coord_sys="cartesian", method=method)
 
     solver.velocity.min_coords = min_coords
     solver.velocity.node_intervals = node_intervals
@@ -18,8 +27,7 @@ def setup_solver_from_speed_3d(speed, min_coords=(0,0,0),
     solver.traveltime.node_intervals = node_intervals
     solver.traveltime.npts = (nx, ny, nz)
 
-    solver.traveltime.values[src_idx] = 0.0
-    solver.unknown[src_idx] = False
-    solver.trial.push(*src_idx)
+    # src_idx is one (ix, iy, iz) node or an (N, 3) array of nodes.
+    solver.initialize_sources(src_idx)
 
     return solver
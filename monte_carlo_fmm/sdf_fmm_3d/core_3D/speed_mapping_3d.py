@@ -1,14 +1,24 @@
 import numpy as np
 
-def sdf_to_speed_3d(sdf, base_speed=1.0, d_safe=1.0, v_min=1e-3):
-    speed = np.empty_like(sdf)
+def sdf_to_speed_3d(sdf, base_speed=1.0, d_safe=1.0, v_min=1e-3, out=None,
+                    mask=None):
+    # Fused in place: t = clip(sdf / d_safe, 0, 1) is 0 inside obstacles,
+    # so one expression covers the inside and the transition band; beyond
+    # d_safe the speed is set to base_speed exactly, which
+    # (base_speed - v_min) + v_min need not be. `out` may be a reused
+    # float32/float64 buffer of sdf's shape, or sdf itself, and `mask` a
+    # reused boolean buffer of sdf's shape.
+    if mask is None:
+        mask = np.empty(np.shape(sdf), dtype=bool)
+    # Taken before `out` may overwrite `sdf`.
+    outside = np.greater_equal(sdf, d_safe, out=mask)
+    if out is None:
+        out = np.empty_like(sdf)
 
-    inside = sdf <= 0
-    speed[inside] = v_min
-
-    band = (sdf > 0) & (sdf < d_safe)
-    t = np.clip(sdf[band] / d_safe, 0.0, 1.0)
-    speed[band] = v_min + (base_speed - v_min) * t**2
-
-    speed[sdf >= d_safe] = base_speed
-    return speed
+    np.divide(sdf, d_safe, out=out)
+    np.clip(out, 0.0, 1.0, out=out)
+    np.square(out, out=out)
+    out *= base_speed - v_min
+    out += v_min
+    np.copyto(out, base_speed, where=outside)
+    return out
@@ -5,6 +5,7 @@ import numpy as np
 from sdf_generators_3D.world_3d import generate_world_with_uncertainty_3d
 from core_3D.mc_driver_3d import monte_carlo_traveltime_3d
 from core_3D.speed_mapping_3d import sdf_to_speed_3d
+from core_3D.cache import ResultCache
 from viz_3D.plot_3d import plot_sdf_slice
 # Reuse your 2D visualization functions
 from viz_3D.plot_fields import (
@@ -17,11 +18,20 @@ from viz_3D.plot_fields import (
 
 if __name__ == "__main__":
 
+    # Worlds and Monte Carlo results are cached on disk
+    # ($MC_FMM_CACHE_DIR, default ~/.cache/mc_fmm) by a hash of their
+    # inputs, so reruns with unchanged parameters go straight to the
+    # plots.
+    cache = ResultCache()
+
     nx, ny, nz = 64, 64, 32
+    world_seed = 0
 
     # Generate multi-obstacle 3D world with uncertainty
-    mean_sdf, std_sdf = generate_world_with_uncertainty_3d(
-        nx, ny, nz, n_obstacles=4, scale=0.05
+    mean_sdf, std_sdf = cache.cached(
+        generate_world_with_uncertainty_3d,
+        nx, ny, nz, n_obstacles=4, scale=0.05,
+        np_random_seed=world_seed
     )
 
     # --------------------------------------------------------
@@ -36,13 +46,14 @@ if __name__ == "__main__":
     plot_sdf_binary(mean_sdf_2d, title="3D World: Floor SDF Slice (z=0)")
 
     # Speed field at floor level
-    speed_floor = sdf_to_speed_3d(mean_sdf)[:, :, floor]
+    speed_floor = cache.cached(sdf_to_speed_3d, mean_sdf)[:, :, floor]
     plot_speed(speed_floor, "Speed Field S* (Floor Slice)")
 
     # --------------------------------------------------------
     # Monte Carlo FMM in full 3D
     # --------------------------------------------------------
-    mean_T, var_T = monte_carlo_traveltime_3d(
+    mean_T, var_T = cache.cached(
+        monte_carlo_traveltime_3d,
         mean_sdf,
         std_sdf,
         num_samples=20,
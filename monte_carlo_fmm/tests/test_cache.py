@@ -0,0 +1,125 @@
+import numpy as np
+import os
+import sys
+import tempfile
+import unittest
+import warnings
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sdf_fmm.core.cache import ResultCache, cache_key
+
+
+def fields(a, b=2.0, rng_seed=0):
+    return (a * b + rng_seed, a.sum())
+
+
+def noisy(a):
+    return a + np.random.standard_normal(a.shape)
+
+
+class CacheKeyTestCase(unittest.TestCase):
+    def test_defaults(self):
+        a = np.arange(6.0)
+        self.assertEqual(cache_key(fields, a), cache_key(fields, a, 2.0, rng_seed=0))
+        self.assertEqual(cache_key(fields, a), cache_key(fields, a=a, b=2.0))
+        self.assertNotEqual(cache_key(fields, a), cache_key(fields, a, 3.0))
+        self.assertNotEqual(cache_key(fields, a), cache_key(noisy, a))
+
+
+    def test_array_content(self):
+        a = np.arange(6.0)
+        self.assertEqual(cache_key(fields, a), cache_key(fields, a.copy()))
+        self.assertEqual(cache_key(fields, a), cache_key(fields, a[::-1][::-1]))
+        b = a.copy()
+        b[3] += 1e-12
+        self.assertNotEqual(cache_key(fields, a), cache_key(fields, b))
+        self.assertNotEqual(cache_key(fields, a), cache_key(fields, a.reshape(2, 3)))
+        self.assertNotEqual(cache_key(fields, a), cache_key(fields, a.astype(np.float32)))
+        with self.assertRaises(TypeError):
+            cache_key(fields, object())
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.tmpdir.name)
+
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.get("00" * 20))
+        array = np.random.uniform(size=(4, 5)).astype(np.float32)
+        self.cache.put("01" * 20, array)
+        result = self.cache.get("01" * 20)
+        self.assertEqual(result.dtype, np.float32)
+        np.testing.assert_array_equal(result, array)
+
+        self.cache.put("02" * 20, (array, 3.5, 7))
+        result = self.cache.get("02" * 20)
+        self.assertIsInstance(result, tuple)
+        np.testing.assert_array_equal(result[0], array)
+        self.assertEqual(result[1:], (3.5, 7))
+
+        with self.assertRaises(TypeError):
+            self.cache.put("03" * 20, [array])
+        self.assertEqual(len(self.cache.entries()), 2)
+
+
+    def test_cached(self):
+        calls = []
+        def counted(a, rng_seed=0):
+            calls.append(rng_seed)
+            return a * 2
+        a = np.arange(6.0)
+        for i in range(2):
+            np.testing.assert_array_equal(self.cache.cached(counted, a), a * 2)
+        self.assertEqual(calls, [0])
+
+        # Random calls are computed every time and never stored.
+        for fn, kwargs in ((counted, dict(rng_seed=None)), (noisy, {})):
+            results = []
+            for i in range(2):
+                with self.assertWarns(RuntimeWarning):
+                    results.append(self.cache.cached(fn, a, **kwargs))
+        self.assertEqual(calls, [0, None, None])
+        self.assertFalse(np.array_equal(*results))
+        self.assertEqual(len(self.cache.entries()), 1)
+
+        # Seeding the global random state makes them cacheable.
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            first = self.cache.cached(noisy, a, np_random_seed=1)
+            np.testing.assert_array_equal(self.cache.cached(noisy, a, np_random_seed=1), first)
+        self.assertEqual(len(self.cache.entries()), 2)
+
+
+    def test_eviction(self):
+        arrays = [np.full(1000, i, dtype=np.float64) for i in range(4)]
+        keys = [f"{i:02d}" * 20 for i in range(4)]
+        for i, (key, array) in enumerate(zip(keys, arrays)):
+            self.cache.put(key, array)
+            os.utime(self.cache._path(key), (i, i))
+        size = self.cache.entries()[0][1]
+
+        # Reading an entry makes it the most recently used one.
+        self.cache.get(keys[0])
+        self.cache.evict(2 * size)
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNone(self.cache.get(keys[2]))
+        self.assertIsNotNone(self.cache.get(keys[3]))
+        self.assertIsNotNone(self.cache.get(keys[0]))
+
+        self.cache.max_bytes = size
+        self.cache.put(keys[1], arrays[1])
+        self.assertEqual([path for _, _, path in self.cache.entries()], [self.cache._path(keys[1])])
+
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
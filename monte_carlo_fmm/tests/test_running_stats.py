@@ -0,0 +1,94 @@
+import numpy as np
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sdf_fmm.core.running_stats import RunningStats
+
+
+class RunningStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # A large offset exposes the cancellation of sum_x2/N - mean**2.
+        self.xs = 1e6 + rng.standard_gamma(2.0, (200, 4, 3))
+
+
+    def check_moments(self, stats, xs):
+        self.assertEqual(stats.count, len(xs))
+        np.testing.assert_allclose(stats.mean, xs.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(stats.var(), xs.var(axis=0), rtol=1e-8)
+        np.testing.assert_allclose(stats.var(ddof=1), xs.var(axis=0, ddof=1), rtol=1e-8)
+        np.testing.assert_allclose(
+            stats.sem(), xs.std(axis=0, ddof=1) / np.sqrt(len(xs)), rtol=1e-8
+        )
+        np.testing.assert_array_equal(stats.min, xs.min(axis=0))
+        np.testing.assert_array_equal(stats.max, xs.max(axis=0))
+        if stats.higher_moments:
+            dev = xs - xs.mean(axis=0)
+            np.testing.assert_allclose(stats.m3, (dev**3).sum(axis=0), rtol=1e-6)
+            np.testing.assert_allclose(stats.m4, (dev**4).sum(axis=0), rtol=1e-8)
+
+
+    def test_update(self):
+        stats = RunningStats(self.xs.shape[1:], higher_moments=True)
+        self.assertTrue(np.all(np.isnan(stats.var())))
+        for x in self.xs:
+            stats.update(x)
+        self.check_moments(stats, self.xs)
+        with self.assertRaises(ValueError):
+            stats.update(np.zeros(3))
+
+
+    def test_merge(self):
+        # Chunked updates merge into the statistics of a single run.
+        stats = RunningStats(self.xs.shape[1:], higher_moments=True)
+        for chunk in np.array_split(self.xs, [1, 60, 61, 150]):
+            stats.merge(RunningStats(self.xs.shape[1:], higher_moments=True).update_batch(chunk))
+        stats.merge(RunningStats(self.xs.shape[1:], higher_moments=True))
+        self.check_moments(stats, self.xs)
+
+        with self.assertRaises(ValueError):
+            stats.merge(RunningStats((4, 4)))
+        with self.assertRaises(ValueError):
+            stats.merge(RunningStats(self.xs.shape[1:]))
+        with self.assertRaises(ValueError):
+            stats.merge(RunningStats(self.xs.shape[1:], quantile_edges=[0, 1], higher_moments=True))
+
+
+    def test_quantile(self):
+        edges = 1e6 + np.linspace(0, 8, 81)
+        stats = RunningStats(self.xs.shape[1:], quantile_edges=edges)
+        stats.update_batch(self.xs[:100])
+        other = RunningStats(self.xs.shape[1:], quantile_edges=edges)
+        for x in self.xs[100:]:
+            other.update(x)
+        stats.merge(other)
+
+        self.assertEqual(stats.hist.sum(), self.xs.size)
+        np.testing.assert_array_equal(stats.quantile(0.0), self.xs.min(axis=0))
+        np.testing.assert_array_equal(stats.quantile(1.0), self.xs.max(axis=0))
+        # Linear interpolation inside a bin is accurate to its width.
+        for q in (0.1, 0.5, 0.9):
+            np.testing.assert_allclose(
+                stats.quantile(q), np.quantile(self.xs, q, axis=0), atol=0.1, rtol=0
+            )
+        with self.assertRaises(ValueError):
+            stats.quantile(1.5)
+        with self.assertRaises(ValueError):
+            RunningStats((2,), quantile_edges=[1, 0])
+
+
+    def test_var_se(self):
+        stats = RunningStats((), higher_moments=True)
+        xs = np.random.default_rng(1).standard_normal(4000)
+        stats.update_batch(xs)
+        # For a normal distribution, SE(var) = sigma**2 * sqrt(2 / (n - 1)).
+        np.testing.assert_allclose(stats.var_se(), np.sqrt(2 / 3999), rtol=0.1)
+        with self.assertRaises(ValueError):
+            RunningStats(()).var_se()
+
+
+if __name__ == "__main__":
+    unittest.main()
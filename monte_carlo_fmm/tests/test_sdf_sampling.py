@@ -0,0 +1,30 @@
+import numpy as np
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sdf_fmm.core.sdf_sampling import narrow_band, plan_sdf_draws
+
+
+class PlanSDFDrawsTestCase(unittest.TestCase):
+    def test_qmc_dimensions(self):
+        shape = (32, 32, 32)
+        for method in ("sobol", "lhs"):
+            # One dimension per voxel is too many ...
+            with self.assertRaises(ValueError):
+                plan_sdf_draws(shape, 8, method, rng_seed=0)
+            # ... but a low-rank basis or a narrow band is not.
+            draws = plan_sdf_draws(shape, 8, method, rng_seed=0, modes=4)
+            self.assertEqual(len(draws), 8)
+            self.assertEqual(draws[0][2].shape, (64,))
+            std = np.zeros(shape)
+            std[:4] = 1
+            band = narrow_band(std, 0.5)
+            draws = plan_sdf_draws(shape, 8, method, rng_seed=0, band=band)
+            self.assertEqual(draws[0][2].shape, (len(band),))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import numpy as np
+import os
+import sys
+import unittest
+
+# The packages under monte_carlo_fmm/ are imported as namespace
+# packages, so sdf_fmm.core and mc_fmm_3d.core do not collide.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from mc_fmm_3d.core.speed_mapping import sdf_to_speed as sdf_to_speed_mc_3d
+from sdf_fmm.core import speed_mapping
+from sdf_fmm_3d.core_3D.speed_mapping_3d import sdf_to_speed_3d
+
+
+def piecewise_speed(sdf, base_speed, d_safe, v_min):
+    # The region-masked mapping the in-place ones replaced.
+    speed = np.empty_like(sdf, dtype=np.float64)
+    speed[sdf <= 0.0] = v_min
+    band = (sdf > 0.0) & (sdf < d_safe)
+    t = np.clip(sdf[band] / d_safe, 0.0, 1.0)
+    speed[band] = v_min + (base_speed - v_min) * t**2
+    speed[sdf >= d_safe] = base_speed
+    return (speed)
+
+
+class SpeedMappingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.sdf = self.rng.uniform(-1, 3, (16, 12, 8))
+
+
+    def test_smooth(self):
+        mappings = (
+            speed_mapping.sdf_to_speed_smooth,
+            sdf_to_speed_mc_3d,
+            sdf_to_speed_3d
+        )
+        # (base_speed - v_min) + v_min is not base_speed for (0.9, 0.3),
+        # (0.6, 0.07) and a few percent of random pairs.
+        parameters = [(1.0, 1.0, 1e-3), (0.9, 0.5, 0.3), (0.6, 1.5, 0.07)] + [
+            tuple(self.rng.uniform((0.5, 0.2, 1e-4), (5, 2, 0.4)))
+            for i in range(32)
+        ]
+        for base_speed, d_safe, v_min in parameters:
+            expected = piecewise_speed(self.sdf, base_speed, d_safe, v_min)
+            for mapping in mappings:
+                np.testing.assert_array_equal(
+                    mapping(self.sdf, base_speed, d_safe, v_min),
+                    expected
+                )
+                sdf = self.sdf.copy()
+                self.assertIs(mapping(sdf, base_speed, d_safe, v_min, out=sdf), sdf)
+                np.testing.assert_array_equal(sdf, expected)
+
+
+    def test_long_tail(self):
+        expected = speed_mapping.sdf_to_speed_long_tail(self.sdf)
+        sdf = self.sdf.copy()
+        self.assertIs(speed_mapping.sdf_to_speed_long_tail(sdf, out=sdf), sdf)
+        np.testing.assert_array_equal(sdf, expected)
+        with self.assertRaises(ValueError):
+            speed_mapping.sdf_to_speed_long_tail(sdf, out=sdf, work=sdf)
+
+
+    def test_uncertainty_aware(self):
+        sdf_std = self.rng.uniform(0, 0.5, self.sdf.shape)
+        expected = speed_mapping.sdf_to_speed_uncertainty_aware(self.sdf, sdf_std)
+        d = np.clip(np.maximum(self.sdf - 2.0 * sdf_std, 0), 0.1, 1.0)
+        np.testing.assert_allclose(expected, ((d - 0.1) / 0.9) ** 2)
+
+        # `out` may alias either input.
+        sdf_mean = self.sdf.copy()
+        speed_mapping.sdf_to_speed_uncertainty_aware(sdf_mean, sdf_std, out=sdf_mean)
+        np.testing.assert_array_equal(sdf_mean, expected)
+        std = sdf_std.copy()
+        speed_mapping.sdf_to_speed_uncertainty_aware(self.sdf, std, out=std)
+        np.testing.assert_array_equal(std, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()